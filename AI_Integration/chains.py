@@ -0,0 +1,73 @@
+"""
+IEC 61131-3 AI Integration - Chain Helpers
+
+Retrieve-then-answer helpers used for generation/regeneration (the documents
+are stuffed into a {context}/{question} prompt, as a "stuff" RetrievalQA chain
+would) and LLM response cleanup. Importing this module has no side effects (no
+LLM or RAG setup).
+"""
+
+from typing import AsyncIterator, List, Tuple, Any
+
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+
+
+def format_docs(docs: List[Document]) -> str:
+    """Join retrieved documents the same way the "stuff" QA chain does."""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def answer(llm, retriever, prompt: ChatPromptTemplate, query: str) -> str:
+    """
+    Retrieve documents for `query` and answer it with `prompt` (blocking).
+
+    Args:
+        llm: Chat model used to answer
+        retriever: Retriever that provides the {context} documents
+        prompt: Prompt with {context} and {question} placeholders
+        query: Question passed to the retriever and the prompt
+    """
+    docs = retriever.invoke(query)
+    messages = prompt.format_messages(context=format_docs(docs), question=query)
+    return llm.invoke(messages).content
+
+
+async def astream_answer(llm, retriever, prompt: ChatPromptTemplate, query: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of `answer`.
+    
+    Yields:
+        ("retrieval", documents) once, then ("token", text) for every LLM chunk
+    """
+    docs = await retriever.ainvoke(query)
+    yield "retrieval", docs
+    
+    messages = prompt.format_messages(context=format_docs(docs), question=query)
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            yield "token", chunk.content
+
+
+def generate_query(user_query: str) -> str:
+    return f"Generate logic: {user_query}"
+
+
+def regenerate_query(user_query: str, issue: str, generated_code: str) -> str:
+    return (
+        f"Previous user query: {user_query}\n\n"
+        f"Issues in existing code (fix all of them):\n{issue}\n\n"
+        f"Already generated code:\n{generated_code}"
+    )
+
+
+def clean_response(response: str) -> str:
+    """Strip whitespace and markdown code fences from an LLM response."""
+    response = response.strip()
+    if response.startswith("```json"):
+        response = response[7:]
+    if response.startswith("```"):
+        response = response[3:]
+    if response.endswith("```"):
+        response = response[:-3]
+    return response.strip()
@@ -7,17 +7,22 @@ to convert natural language to IEC 61131-3 JSON intermediate representation.
 
 import os
 import glob
+import json
 import logging
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_classic.chains import RetrievalQA
 from dotenv import load_dotenv
 
+try:
+    from .chains import answer, astream_answer, generate_query, regenerate_query, clean_response
+    from .vector_index import PersistentVectorIndex
+except ImportError:  # executed as a script from this folder
+    from chains import answer, astream_answer, generate_query, regenerate_query, clean_response
+    from vector_index import PersistentVectorIndex
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,7 +38,7 @@ You are an IEC 61131-3 JSON bug fixer. Fix the validation errors in the provided
 AVAILABLE DEVICES FROM DATABASE:
 {context}
 
-Error to fix: {question}
+Errors to fix: {question}
 
 STRICT RULES:
 
@@ -42,12 +47,16 @@ STRICT RULES:
    - The "dataType" field contains the EXACT type to use
    - DO NOT invent names - use only what's in the context
 
-2. **COMMON FIXES:**
+2. **FIX EVERY LISTED ERROR IN ONE PASS:**
+   - Each error is prefixed with a JSON pointer (e.g. /0/program/statements/1/condition)
+     to the node that is wrong - fix all of them, not just the first
+
+3. **COMMON FIXES:**
    - "Variable X not found" → Use exact deviceName from context
    - "Type mismatch" → Use exact dataType from context
    - If the error says a variable doesn't exist, check context for correct spelling
 
-3. **OUTPUT FORMAT** - Return ONLY valid JSON:
+4. **OUTPUT FORMAT** - Return ONLY valid JSON:
 
 [{{
   "program": {{
@@ -61,12 +70,12 @@ STRICT RULES:
   }}
 }}]
 
-4. **DATATYPE VALUES:**
+5. **DATATYPE VALUES:**
    - BOOL: TRUE or FALSE
    - INT: integer values within the "range" field
    - REAL: decimal values
 
-5. **IEC 61131-3 SYNTAX:**
+6. **IEC 61131-3 SYNTAX:**
    - Use '=' for equality
    - Use 'AND', 'OR', 'NOT'
    - No ternary operators
@@ -151,8 +160,11 @@ def get_model_name() -> str:
     return os.environ.get("GROQ_MODEL_NAME", "llama-3.1-70b-versatile")
 
 
-def initialize_llm() -> ChatGroq:
-    """Initialize the Groq LLM with error handling."""
+def initialize_llm():
+    """Initialize the Groq LLM (a ChatGroq) with error handling."""
+    # Imported here so importing this module stays cheap
+    from langchain_groq import ChatGroq
+    
     try:
         api_key = get_api_key()
         model_name = get_model_name()
@@ -168,74 +180,194 @@ def initialize_llm() -> ChatGroq:
         raise
 
 
-def load_docs_from_path(folder_path: str) -> list:
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+KB_PATH = Path(__file__).parent / "kb"
+# Placeholder so retrieval still works while the knowledge base is empty
+EMPTY_KB_DOCS = {"__empty__": '{"info": "No device data available"}'}
+
+
+def split_kb_document(doc_id: str, content: str) -> Dict[str, str]:
+    """
+    Split a device list into one document per device.
+    
+    A JSON array of device objects (like variables.json) becomes one compact
+    JSON document per device, keyed "<doc_id>#<deviceName>", so the retriever
+    returns only the relevant devices. Anything else stays a single document.
+    
+    Args:
+        doc_id: Document id of the whole file
+        content: File content
+    
+    Returns:
+        Mapping of document id to document content
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return {doc_id: content}
+    
+    if not isinstance(data, list) or not data or not all(
+        isinstance(item, dict) and item.get("deviceName") for item in data
+    ):
+        return {doc_id: content}
+    
+    docs = {}
+    for item in data:
+        device_id = f"{doc_id}#{str(item['deviceName']).strip()}"
+        # Keep duplicate device names as separate documents
+        key, n = device_id, 1
+        while key in docs:
+            n += 1
+            key = f"{device_id}~{n}"
+        docs[key] = json.dumps(item, ensure_ascii=False)
+    return docs
+
+
+def load_kb_documents(folder_path: str) -> Dict[str, str]:
     """
     Load all JSON documents from a folder for RAG.
     
+    Device lists are split into one document per device (see split_kb_document).
+    
     Args:
         folder_path: Path to the knowledge base folder
     
     Returns:
-        List of document contents as strings
+        Mapping of document id (relative file path, plus "#deviceName" for
+        devices) to document content
     """
     all_files = glob.glob(os.path.join(folder_path, "**/*.json"), recursive=True)
-    docs = []
+    docs = {}
     
-    for f in all_files:
+    for f in sorted(all_files):
         try:
             with open(f, "r", encoding="utf-8") as infile:
                 content = infile.read()
                 if content.strip():
-                    docs.append(content)
+                    doc_id = Path(os.path.relpath(f, folder_path)).as_posix()
+                    docs.update(split_kb_document(doc_id, content))
         except Exception as e:
             logger.warning(f"Failed to read file {f}: {e}")
     
     return docs
 
 
-def initialize_rag() -> tuple:
+def load_docs_from_path(folder_path: str) -> list:
     """
-    Initialize the RAG components (embeddings, vectorstore, retriever).
+    Load all JSON documents from a folder for RAG.
+    
+    Args:
+        folder_path: Path to the knowledge base folder
     
     Returns:
-        Tuple of (vectorstore, retriever)
+        List of document contents as strings
+    """
+    return list(load_kb_documents(folder_path).values())
+
+
+def get_index_dir() -> Path:
+    """Get the directory the vector index is persisted in."""
+    return Path(os.environ.get("RAG_INDEX_DIR", Path(__file__).parent / "kb_index"))
+
+
+def initialize_rag() -> tuple:
     """
-    script_directory = Path(__file__).parent
-    folder_path = script_directory / "kb"
+    Initialize the RAG components (embeddings, persistent vector index, retriever).
     
-    logger.info(f"Loading documents from: {folder_path}")
-    docs = load_docs_from_path(str(folder_path))
+    The index is loaded from disk when available; only knowledge base files
+    whose content changed since it was saved are embedded again.
+    
+    Returns:
+        Tuple of (rag_index, retriever)
+    """
+    logger.info(f"Loading documents from: {KB_PATH}")
+    docs = load_kb_documents(str(KB_PATH))
     
     if not docs:
         logger.warning("No documents found in KB folder!")
-        # Create a minimal document to avoid errors
-        docs = ['{"info": "No device data available"}']
+        docs = EMPTY_KB_DOCS
     
     logger.info(f"Loaded {len(docs)} documents for RAG")
     
-    # Initialize embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    # Initialize embeddings (sentence-transformers is only imported now)
+    from langchain_huggingface import HuggingFaceEmbeddings
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
     
-    # Create vector store
-    vectorstore = FAISS.from_texts(docs, embedding=embeddings)
+    # Load the saved index and bring it up to date with the knowledge base
+    rag_index = PersistentVectorIndex(embeddings, get_index_dir(), model_name=EMBEDDING_MODEL)
+    rag_index.sync(docs)
     
     # Create retriever with configurable k
-    retriever = vectorstore.as_retriever(
-        search_kwargs={"k": int(os.environ.get("RAG_K", 3))}
-    )
+    retriever = rag_index.as_retriever(k=int(os.environ.get("RAG_K", 8)))
     
-    return vectorstore, retriever
+    return rag_index, retriever
 
 
-# Initialize components
-try:
-    llm = initialize_llm()
-    vectorstore, retriever = initialize_rag()
-except Exception as e:
-    logger.error(f"Failed to initialize AI components: {e}")
-    raise
+# Components, created by initialize() on first use
+llm = None
+rag_index = None
+retriever = None
+generate_prompt = None
+regenerate_prompt = None
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def initialize() -> None:
+    """
+    Initialize the LLM, RAG index and prompts (once; safe to call from any thread).
+    
+    Importing this module does no setup, so callers decide when the slow part
+    (embedding model load, index sync) happens. Every public function below
+    calls this first.
+    
+    Raises:
+        Exception: If a component cannot be created (e.g. no Groq API key);
+            the next call tries again
+    """
+    global llm, rag_index, retriever, generate_prompt, regenerate_prompt, _initialized
+    if _initialized:
+        return
+    
+    with _init_lock:
+        if _initialized:
+            return
+        try:
+            llm = initialize_llm()
+            rag_index, retriever = initialize_rag()
+            # Prompts are stateless, so parse the templates once instead of on every request
+            generate_prompt = ChatPromptTemplate.from_template(Generate_System_Instruction)
+            regenerate_prompt = ChatPromptTemplate.from_template(ReGenerate_System_Instruction)
+        except Exception as e:
+            logger.error(f"Failed to initialize AI components: {e}")
+            raise
+        _initialized = True
+
+
+def is_initialized() -> bool:
+    """Whether initialize() has completed."""
+    return _initialized
+
+
+def embed_text(text: str) -> List[float]:
+    """Embed a query with the same model as the RAG index."""
+    initialize()
+    return rag_index.embeddings.embed_query(text)
+
+
+def refresh_knowledge_base() -> bool:
+    """
+    Re-read the knowledge base folder and update the vector index in place.
+    
+    Only new or changed documents are embedded; the retriever keeps working
+    because it reads from the same index.
+    
+    Returns:
+        True if the index changed
+    """
+    initialize()
+    docs = load_kb_documents(str(KB_PATH)) or EMPTY_KB_DOCS
+    return rag_index.sync(docs)
 
 
 def generate_IEC_JSON(user_query: str) -> str:
@@ -252,31 +384,13 @@ def generate_IEC_JSON(user_query: str) -> str:
         Exception: If generation fails
     """
     try:
-        template = Generate_System_Instruction
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=retriever,
-            chain_type_kwargs={"prompt": prompt},
-        )
-        
-        query = f"Generate logic: {user_query}"
         logger.info(f"Generating code for query: {user_query[:100]}...")
+        initialize()
         
-        result = qa_chain.invoke({"query": query})
-        
-        response = result.get("result", "")
+        result = answer(llm, retriever, generate_prompt, generate_query(user_query))
         
         # Clean up response - remove markdown code blocks if present
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        response = response.strip()
+        response = clean_response(result)
         
         logger.info("Code generation completed")
         return response
@@ -292,7 +406,7 @@ def regenerate_IEC_JSON(user_query: str, issue: str, generated_code: str) -> str
     
     Args:
         user_query: Original natural language description
-        issue: Description of the validation error
+        issue: Validation errors, one per line, each prefixed with a JSON pointer
         generated_code: Previously generated code with issues
     
     Returns:
@@ -302,36 +416,13 @@ def regenerate_IEC_JSON(user_query: str, issue: str, generated_code: str) -> str
         Exception: If regeneration fails
     """
     try:
-        template = ReGenerate_System_Instruction
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=retriever,
-            chain_type_kwargs={"prompt": prompt},
-        )
-        
-        query = (
-            f"Previous user query: {user_query}\n\n"
-            f"Issue in existing code: {issue}\n\n"
-            f"Already generated code:\n{generated_code}"
-        )
-        
         logger.info(f"Regenerating code to fix: {issue[:100]}...")
+        initialize()
         
-        result = qa_chain.invoke({"query": query})
-        
-        response = result.get("result", "")
+        result = answer(llm, retriever, regenerate_prompt, regenerate_query(user_query, issue, generated_code))
         
         # Clean up response
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        response = response.strip()
+        response = clean_response(result)
         
         logger.info("Code regeneration completed")
         return response
@@ -339,3 +430,32 @@ def regenerate_IEC_JSON(user_query: str, issue: str, generated_code: str) -> str
     except Exception as e:
         logger.error(f"Error regenerating IEC JSON: {e}", exc_info=True)
         raise
+
+
+async def _astream_response(prompt: ChatPromptTemplate, query: str) -> AsyncIterator[Tuple[str, Any]]:
+    tokens = []
+    async for kind, payload in astream_answer(llm, retriever, prompt, query):
+        if kind == "token":
+            tokens.append(payload)
+        yield kind, payload
+    yield "response", clean_response("".join(tokens))
+
+
+def astream_generate_IEC_JSON(user_query: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of generate_IEC_JSON.
+    
+    Yields:
+        ("retrieval", documents), then ("token", text) per LLM chunk, then
+        ("response", cleaned JSON string)
+    """
+    logger.info(f"Streaming code generation for query: {user_query[:100]}...")
+    initialize()
+    return _astream_response(generate_prompt, generate_query(user_query))
+
+
+def astream_regenerate_IEC_JSON(user_query: str, issue: str, generated_code: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming variant of regenerate_IEC_JSON (same events as astream_generate_IEC_JSON)."""
+    logger.info(f"Streaming regeneration to fix: {issue[:100]}...")
+    initialize()
+    return _astream_response(regenerate_prompt, regenerate_query(user_query, issue, generated_code))
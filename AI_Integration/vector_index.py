@@ -0,0 +1,224 @@
+"""
+IEC 61131-3 AI Integration - Persistent Vector Index
+
+FAISS index for RAG that is saved to disk together with a content-hash manifest.
+On startup the saved index is memory-mapped instead of re-embedding the whole
+knowledge base; afterwards only documents whose content changed are (re-)embedded.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import faiss
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PersistentVectorIndex:
+    """
+    A FAISS vector store keyed by document id, persisted under `index_dir`.
+
+    Files:
+        index.faiss    raw FAISS index (memory-mapped on load)
+        docstore.json  document id / text for every index row, in row order
+        manifest.json  embedding model name and sha256 of every document
+
+    All searches and updates are serialized with a lock; embeddings are
+    computed outside the lock so searches are not blocked by slow encoding.
+    """
+
+    def __init__(self, embeddings, index_dir: Path, model_name: str):
+        self.embeddings = embeddings
+        self.index_dir = Path(index_dir)
+        self.model_name = model_name
+        self._lock = threading.RLock()
+        self._store: Optional[FAISS] = None
+        self._hashes: Dict[str, str] = {}
+        self._mapped = False
+        self._load()
+
+    @property
+    def document_ids(self) -> List[str]:
+        return list(self._hashes)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    # ---------------- Persistence ----------------
+
+    def _load(self):
+        manifest_path = self.index_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("model") != self.model_name:
+                logger.info("Embedding model changed, vector index will be rebuilt")
+                return
+
+            rows = json.loads((self.index_dir / DOCSTORE_FILE).read_text(encoding="utf-8"))
+            index = self._read_index(self.index_dir / INDEX_FILE)
+            if index.ntotal != len(rows):
+                logger.warning("Vector index and docstore are out of sync, index will be rebuilt")
+                return
+
+            docstore = InMemoryDocstore({
+                row["id"]: Document(page_content=row["text"], metadata={"source": row["id"]})
+                for row in rows
+            })
+            self._store = FAISS(
+                embedding_function=self.embeddings,
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id={i: row["id"] for i, row in enumerate(rows)},
+            )
+            self._hashes = dict(manifest.get("docs", {}))
+            logger.info(f"Loaded vector index with {index.ntotal} documents from {self.index_dir}")
+        except Exception as e:
+            logger.warning(f"Could not load vector index from {self.index_dir}, rebuilding: {e}")
+            self._store = None
+            self._hashes = {}
+            self._mapped = False
+
+    def _read_index(self, path: Path):
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", None)
+        if flag is not None:
+            try:
+                index = faiss.read_index(str(path), flag)
+                self._mapped = True
+                return index
+            except RuntimeError as e:
+                logger.debug(f"Memory-mapped load not supported, reading index into memory: {e}")
+        self._mapped = False
+        return faiss.read_index(str(path))
+
+    def _materialize(self):
+        """Replace a memory-mapped (read-only) index with an owned copy before mutating it."""
+        if self._mapped and self._store is not None:
+            self._store.index = faiss.deserialize_index(faiss.serialize_index(self._store.index))
+            self._mapped = False
+
+    def _save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        store = self._store
+        rows = [
+            {"id": doc_id, "text": store.docstore.search(doc_id).page_content}
+            for _, doc_id in sorted(store.index_to_docstore_id.items())
+        ]
+
+        tmp_index = self.index_dir / (INDEX_FILE + ".tmp")
+        faiss.write_index(store.index, str(tmp_index))
+        os.replace(tmp_index, self.index_dir / INDEX_FILE)
+        self._write_json(DOCSTORE_FILE, rows)
+        # manifest last: it is only trusted when written after the data it describes
+        self._write_json(MANIFEST_FILE, {"model": self.model_name, "docs": self._hashes})
+
+    def _write_json(self, name: str, data: Any):
+        tmp = self.index_dir / (name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.index_dir / name)
+
+    # ---------------- Updates ----------------
+
+    def sync(self, docs: Dict[str, str]) -> bool:
+        """
+        Make the index contain exactly `docs` (id -> text).
+
+        Only new or changed documents are embedded; removed ones are deleted.
+
+        Returns:
+            True if the index changed
+        """
+        wanted = {doc_id: content_hash(text) for doc_id, text in docs.items()}
+        stale = [doc_id for doc_id, h in self._hashes.items() if wanted.get(doc_id) != h]
+        changed = {doc_id: docs[doc_id] for doc_id, h in wanted.items() if self._hashes.get(doc_id) != h}
+        return self._apply(changed, stale)
+
+    def upsert(self, docs: Dict[str, str]) -> bool:
+        """Add or replace documents (unchanged content is skipped)."""
+        changed = {doc_id: text for doc_id, text in docs.items()
+                   if self._hashes.get(doc_id) != content_hash(text)}
+        stale = [doc_id for doc_id in changed if doc_id in self._hashes]
+        return self._apply(changed, stale)
+
+    def remove(self, doc_ids: Iterable[str]) -> bool:
+        """Delete documents by id (unknown ids are ignored)."""
+        return self._apply({}, [doc_id for doc_id in doc_ids if doc_id in self._hashes])
+
+    def _apply(self, add: Dict[str, str], remove: List[str]) -> bool:
+        if not add and not remove:
+            return False
+
+        ids = list(add)
+        texts = [add[doc_id] for doc_id in ids]
+        vectors = self.embeddings.embed_documents(texts) if texts else []
+
+        with self._lock:
+            if self._store is None:
+                if not texts:
+                    return False
+                self._store = FAISS.from_embeddings(
+                    list(zip(texts, vectors)), self.embeddings,
+                    metadatas=[{"source": doc_id} for doc_id in ids], ids=ids,
+                )
+            else:
+                self._materialize()
+                if remove:
+                    self._store.delete(remove)
+                if texts:
+                    self._store.add_embeddings(
+                        list(zip(texts, vectors)),
+                        metadatas=[{"source": doc_id} for doc_id in ids], ids=ids,
+                    )
+
+            for doc_id in remove:
+                self._hashes.pop(doc_id, None)
+            for doc_id, text in add.items():
+                self._hashes[doc_id] = content_hash(text)
+
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not persist vector index to {self.index_dir}: {e}")
+
+        logger.info(f"Vector index updated: {len(add)} embedded, {len(remove)} removed, {len(self)} total")
+        return True
+
+    # ---------------- Retrieval ----------------
+
+    def search(self, query: str, k: int) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        with self._lock:
+            if self._store is None:
+                return []
+            return self._store.similarity_search_by_vector(vector, k=k)
+
+    def as_retriever(self, k: int) -> "IndexRetriever":
+        return IndexRetriever(index=self, k=k)
+
+
+class IndexRetriever(BaseRetriever):
+    """Retriever over a PersistentVectorIndex (stays valid across index updates)."""
+
+    index: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.index.search(query, self.k)
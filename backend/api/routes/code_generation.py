@@ -4,11 +4,22 @@ Code Generation Routes
 API endpoints for code generation functionality.
 """
 
+import json
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Any
+from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 
-from ...models import NarrativeRequest, GenerateResponse
-from ...services import generate_code, CodeGenerationError
+from ...models import NarrativeRequest, BatchNarrativeRequest, GenerateResponse, CacheStatsResponse
+from ...services import (
+    agenerate_code,
+    agenerate_batch,
+    agenerate_stream,
+    stream_code,
+    to_sse,
+    code_generation_service,
+    CodeGenerationError,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +27,7 @@ router = APIRouter(prefix="/generate", tags=["Code Generation"])
 
 
 @router.post("-code", response_model=GenerateResponse)
-def generate_code_endpoint(body: NarrativeRequest):
+async def generate_code_endpoint(body: NarrativeRequest):
     """
     Generate IEC 61131-3 Structured Text code from natural language.
     
@@ -27,7 +38,7 @@ def generate_code_endpoint(body: NarrativeRequest):
     4. Generator converts valid JSON to Structured Text
     """
     try:
-        code = generate_code(body.narrative)
+        code = await agenerate_code(body.narrative)
         logger.info("Code generation successful")
         return GenerateResponse(status="ok", code=code)
         
@@ -39,3 +50,61 @@ def generate_code_endpoint(body: NarrativeRequest):
     except Exception as e:
         logger.error(f"Unexpected error in code generation: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
+
+
+@router.post("-code/stream")
+async def generate_code_stream_endpoint(body: NarrativeRequest):
+    """
+    Streaming variant of /generate-code using Server-Sent Events.
+    
+    Emits pipeline stage events as they happen: retrieval, token (LLM output),
+    validation, regeneration, and finally result or error.
+    """
+    async def events():
+        async for event in agenerate_stream(body.narrative):
+            yield to_sse(event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so each stage reaches the browser immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("-code/batch")
+async def generate_code_batch_endpoint(body: BatchNarrativeRequest):
+    """
+    Generate code for many narratives concurrently.
+    
+    Streams one JSON object per line (NDJSON) as each narrative finishes:
+    {"index", "status": "ok", "code"} or {"index", "status": "error", "message", "validation_error"}.
+    """
+    async def results():
+        async for result in agenerate_batch(body.narratives, body.concurrency):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("-code/from-ir")
+def generate_code_from_ir_endpoint(body: Any = Body(...)):
+    """
+    Convert intermediate JSON (as produced by the AI step) straight to Structured Text.
+    
+    No LLM call or device validation is made. The code is streamed as plain
+    text while it is generated, so large IR dumps never need the whole program
+    in memory; a failure after streaming started ends the text with an ST comment.
+    """
+    try:
+        chunks = stream_code(body)
+    except CodeGenerationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
+
+@router.get("-code/cache-stats", response_model=CacheStatsResponse)
+def generate_code_cache_stats():
+    """Hit/miss metrics of the generation cache and request coalescing counters."""
+    return CacheStatsResponse(**code_generation_service.stats())
@@ -4,12 +4,15 @@ Variables Routes
 API endpoints for variable management.
 """
 
-import json
 import logging
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response, Query, UploadFile, File
 
-from ...models import SaveVariablesRequest, StatusResponse
-from ...services import variables_service, VariablesServiceError
+from ...models import SaveVariablesRequest, SyncResultResponse, UploadResultResponse, DuplicatesResponse
+from ...services import (
+    variables_service, VariablesServiceError, MAX_PAGE_SIZE, MAX_SUGGESTIONS, UploadParseError, detect_format, iter_rows,
+    etag_matches,
+)
 from ...core import settings
 
 logger = logging.getLogger(__name__)
@@ -19,11 +22,45 @@ router = APIRouter(prefix="/variables", tags=["Variables"])
 
 @router.get("", response_model=dict)
 @router.get("/", response_model=dict)
-def get_variables():
-    """Get all variables from the database."""
+def get_variables(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    prefix: Optional[str] = None,
+    dataType: Optional[str] = None,
+):
+    """
+    Get variables from the database.
+    
+    Without `limit` all matching variables are returned. With `limit` the
+    result is paged by name; pass `next_cursor` back as `cursor` (or use
+    `offset`). `fields` is a comma-separated projection, `prefix` and
+    `dataType` filter server-side. Responses carry an ETag; send it as
+    If-None-Match to get 304 Not Modified while the table is unchanged.
+    """
+    etag = variables_service.etag(str(request.query_params))
+    if etag and etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     try:
-        variables = variables_service.get_all()
-        return {"status": "ok", "variables": variables}
+        result = variables_service.query(
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            prefix=prefix,
+            data_type=dataType,
+        )
+        if etag:
+            response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return {"status": "ok", **result}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -33,8 +70,28 @@ def get_variables():
         raise HTTPException(status_code=500, detail="Failed to retrieve variables")
 
 
-@router.post("", response_model=StatusResponse)
-@router.post("/", response_model=StatusResponse)
+@router.get("/suggest", response_model=dict)
+def suggest_variables(q: str = Query(..., min_length=1, max_length=100),
+                      limit: int = Query(5, ge=1, le=MAX_SUGGESTIONS)):
+    """
+    Suggest device names for a misspelled or differently written name.
+    
+    Case, spaces, underscores and hyphens are ignored and a few typos are
+    allowed; only the nearest names are returned (empty if none is close).
+    """
+    try:
+        return {"status": "ok", "query": q, "suggestions": variables_service.suggest(q, limit=limit)}
+        
+    except VariablesServiceError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Error suggesting variables: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to suggest variables")
+
+
+@router.post("", response_model=SyncResultResponse)
+@router.post("/", response_model=SyncResultResponse)
 def save_variables(body: SaveVariablesRequest):
     """
     Synchronize variables with the database.
@@ -42,7 +99,7 @@ def save_variables(body: SaveVariablesRequest):
     """
     try:
         result = variables_service.save_all(body.variables)
-        return StatusResponse(**result)
+        return SyncResultResponse(**result)
         
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -52,39 +109,27 @@ def save_variables(body: SaveVariablesRequest):
         raise HTTPException(status_code=500, detail="Failed to save variables")
 
 
-@router.post("/upload", response_model=StatusResponse)
-async def upload_variables_json(file: UploadFile = File(...)):
-    """Upload variables from a JSON file."""
-    # Validate file type
-    if not file.filename.endswith('.json'):
-        raise HTTPException(status_code=400, detail="Only JSON files are allowed")
-    
-    # Read and check size
-    contents = await file.read()
-    if len(contents) > settings.max_upload_size:
-        max_mb = settings.max_upload_size // 1024 // 1024
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {max_mb}MB")
-    
-    # Parse JSON
-    try:
-        variables_list = json.loads(contents.decode("utf-8"))
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file format")
-    
-    # Validate format
-    if not isinstance(variables_list, list):
-        raise HTTPException(status_code=400, detail="JSON must be an array of variables")
+@router.post("/upload", response_model=UploadResultResponse)
+def upload_variables_json(file: UploadFile = File(...)):
+    """
+    Upload variables from a JSON array, NDJSON or CSV file.
     
-    for i, var in enumerate(variables_list):
-        if not isinstance(var, dict):
-            raise HTTPException(status_code=400, detail=f"Item {i} is not a valid object")
-        if 'deviceName' not in var or 'dataType' not in var:
-            raise HTTPException(status_code=400, detail=f"Item {i} missing required fields")
+    The file is parsed, validated and written in batches as it is read;
+    invalid rows are reported in `errors` instead of rejecting the whole file.
+    """
+    # Validate file type
+    fmt = detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Only JSON, NDJSON and CSV files are allowed")
     
-    # Upload
+    # Parse and upload
     try:
-        result = variables_service.upload_from_list(variables_list)
-        return StatusResponse(**result)
+        rows = iter_rows(file.file, fmt, max_size=settings.max_upload_size)
+        result = variables_service.upload_stream(rows)
+        return UploadResultResponse(**result)
+        
+    except UploadParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -94,12 +139,15 @@ async def upload_variables_json(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail="Failed to upload variables")
 
 
-@router.delete("/duplicates", response_model=StatusResponse)
-def remove_duplicates():
-    """Remove duplicate variables (case-insensitive by deviceName)."""
+@router.delete("/duplicates", response_model=DuplicatesResponse)
+def remove_duplicates(dry_run: bool = False):
+    """
+    Remove duplicate variables (case-insensitive by deviceName).
+    With ?dry_run=true only reports what would be removed.
+    """
     try:
-        result = variables_service.remove_duplicates()
-        return StatusResponse(**result)
+        result = variables_service.remove_duplicates(dry_run=dry_run)
+        return DuplicatesResponse(**result)
         
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -0,0 +1,254 @@
+"""
+Bulk Validator for IEC 61131-3 datasets
+
+Streams a JSONL dataset (one {"instruction", "output"} record per line), runs
+the validator and generator on every `output` across all CPU cores and writes
+one result per record to an output JSONL file:
+
+    {"line", "instruction", "ok", "errors": [{"path", "message"}], "code"}
+
+Works fully offline: device variables come from a local JSON file (the same
+format as AI_Integration/kb/templates/variables.json), never from MongoDB.
+
+Usage:
+    python bulk_validate.py assets_Storage/home_automation_dataset.jsonl results.jsonl
+    python bulk_validate.py DATASET OUT --variables my_plant_variables.json --workers 8
+    python bulk_validate.py DATASET OUT --trust-declarations
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from validator import validate_diagnostics, load_device_variables_from_file, usable_cpus, DEFAULT_VARIABLES_FILE
+from generator import generator, GeneratorError
+
+logger = logging.getLogger(__name__)
+
+# Records per task sent to a worker process
+CHUNK_SIZE = 64
+# Records between progress log lines
+PROGRESS_EVERY = 10000
+# Rows shown per histogram
+HISTOGRAM_SIZE = 10
+
+RE_QUOTED = re.compile(r"'[^']*'")
+RE_SUGGESTION = re.compile(r" \(did you mean [^)]*\)$")
+RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+# Per-process state, set by _init_worker
+_device_vars: Dict[str, str] = {}
+_trust_declarations = False
+
+
+def _init_worker(device_vars: Dict[str, str], trust_declarations: bool):
+    global _device_vars, _trust_declarations
+    _device_vars = device_vars
+    _trust_declarations = trust_declarations
+    # Unsupported statement types are already reported per record
+    logging.getLogger("generator").setLevel(logging.ERROR)
+
+
+def declared_variables(blocks: List[Any]) -> Dict[str, str]:
+    """Device table built from the programs' own declarations."""
+    table: Dict[str, str] = {}
+    for block in blocks:
+        prog = block.get("program") if isinstance(block, dict) else None
+        if not isinstance(prog, dict):
+            continue
+        for d in prog.get("declarations", []):
+            if isinstance(d, dict) and isinstance(d.get("name"), str) and isinstance(d.get("datatype"), str):
+                table[d["name"]] = d["datatype"].upper()
+    return table
+
+
+def check_record(line_no: int, line: str) -> Dict[str, Any]:
+    """Validate and generate one dataset line."""
+    result: Dict[str, Any] = {"line": line_no, "instruction": None, "ok": False, "errors": [], "code": None}
+
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        result["errors"].append({"path": "", "message": f"Invalid JSON: {e.msg}"})
+        return result
+    if not isinstance(record, dict) or "output" not in record:
+        result["errors"].append({"path": "", "message": "Record has no 'output'"})
+        return result
+
+    result["instruction"] = record.get("instruction")
+    output = record["output"]
+    # Dataset outputs are usually a single block; the validator takes a list of blocks
+    blocks = output if isinstance(output, list) else [output]
+    device_vars = declared_variables(blocks) if _trust_declarations else _device_vars
+
+    try:
+        errors = validate_diagnostics(blocks, device_vars, workers=1)
+    except Exception as e:
+        # Malformed IR (e.g. a declaration without a name) makes the validator raise
+        errors = [{"path": "", "message": f"Malformed IR: {type(e).__name__}: {e}"}]
+
+    try:
+        result["code"] = generator(output)
+    except GeneratorError as e:
+        errors.append({"path": "", "message": f"Generator error: {e}"})
+
+    result["errors"] = errors
+    result["ok"] = not errors
+    return result
+
+
+def check_chunk(chunk: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    return [check_record(line_no, line) for line_no, line in chunk]
+
+
+def read_chunks(lines: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, str]]]:
+    """Group non-blank lines into (line number, text) chunks."""
+    chunk: List[Tuple[int, str]] = []
+    for line_no, line in enumerate(lines, start=1):
+        if line.strip():
+            chunk.append((line_no, line))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_results(chunks: Iterable[List[Tuple[int, str]]], workers: int,
+                 device_vars: Dict[str, str], trust_declarations: bool) -> Iterator[Dict[str, Any]]:
+    """
+    Check every record, yielding results in input order.
+
+    At most 2 chunks per worker are in flight, so memory stays bounded however
+    large the dataset is.
+    """
+    if workers <= 1:
+        _init_worker(device_vars, trust_declarations)
+        for chunk in chunks:
+            yield from check_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(device_vars, trust_declarations)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(check_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def error_category(message: str) -> str:
+    """Message with names and numbers masked, so similar errors group together."""
+    first_line = RE_SUGGESTION.sub("", message.splitlines()[0])
+    return RE_NUMBER.sub("N", RE_QUOTED.sub("'…'", first_line))
+
+
+def error_field(path: str) -> str:
+    """Last non-index JSON pointer segment (e.g. condition, datatype, target)."""
+    for part in reversed(path.split("/")):
+        if part and not part.isdigit():
+            return part
+    return "(record)"
+
+
+def run(input_path: Path, output_path: Path, variables_path: Optional[Path] = None,
+        workers: Optional[int] = None, trust_declarations: bool = False) -> Dict[str, Any]:
+    """
+    Validate a JSONL dataset and write per-record results.
+
+    Returns:
+        Summary with record counts, throughput and error histograms
+    """
+    device_vars: Dict[str, str] = {}
+    if not trust_declarations:
+        device_vars = load_device_variables_from_file(variables_path)
+        if not device_vars:
+            raise SystemExit(f"No device variables loaded from {variables_path or DEFAULT_VARIABLES_FILE}")
+    workers = workers or usable_cpus()
+
+    total = passed = 0
+    categories: Counter = Counter()
+    fields: Counter = Counter()
+    start = time.perf_counter()
+
+    with open(input_path, "r", encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as dst:
+        for result in iter_results(read_chunks(src), workers, device_vars, trust_declarations):
+            dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+            total += 1
+            if result["ok"]:
+                passed += 1
+            for error in result["errors"]:
+                categories[error_category(error["message"])] += 1
+                fields[error_field(error["path"])] += 1
+            if total % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{total} records checked ({total / elapsed:.0f} records/s)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "records": total,
+        "passed": passed,
+        "failed": total - passed,
+        "seconds": elapsed,
+        "records_per_second": total / elapsed if elapsed else 0.0,
+        "workers": workers,
+        "errors_by_category": categories,
+        "errors_by_field": fields,
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    records = summary["records"]
+    pass_rate = summary["passed"] / records * 100 if records else 0.0
+    print(f"records : {records}")
+    print(f"passed  : {summary['passed']} ({pass_rate:.1f}%)")
+    print(f"failed  : {summary['failed']}")
+    print(f"time    : {summary['seconds']:.2f} s with {summary['workers']} worker(s) "
+          f"({summary['records_per_second']:.0f} records/s)")
+
+    for title, counter in (("Errors by category", summary["errors_by_category"]),
+                           ("Errors by field", summary["errors_by_field"])):
+        if not counter:
+            continue
+        print(f"\n{title}:")
+        for label, count in counter.most_common(HISTOGRAM_SIZE):
+            print(f"{count:>8}  {label}")
+
+
+def main():
+    """Entry point for script execution."""
+    parser = argparse.ArgumentParser(description="Validate and generate ST for every record of a JSONL dataset.")
+    parser.add_argument("input", type=Path, help="JSONL dataset with an 'output' IR per record")
+    parser.add_argument("output", type=Path, help="JSONL file for per-record results")
+    parser.add_argument("--variables", type=Path, default=None,
+                        help=f"Device variables JSON (default: {DEFAULT_VARIABLES_FILE})")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--trust-declarations", action="store_true",
+                        help="Use each record's own declarations as its device table "
+                             "(checks syntax and types only, no device matching)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("validator").setLevel(logging.WARNING)
+    logging.getLogger("generator").setLevel(logging.ERROR)
+
+    summary = run(args.input, args.output, args.variables, args.workers, args.trust_declarations)
+    print_summary(summary)
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+# Only run when executed directly, not when imported
+if __name__ == "__main__":
+    main()
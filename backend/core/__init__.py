@@ -4,3 +4,5 @@ Core module exports
 
 from .config import settings, get_settings
 from .database import db_manager, get_collection, init_database, close_database
+from .registry import device_registry, DeviceRegistry
+from .ai_stack import ai_stack, AIStack, AIStackUnavailable
@@ -0,0 +1,150 @@
+"""
+AI Stack Handle
+
+Process-wide, lazily initialized access to the AI integration module
+(Groq LLM, embedding model, RAG index, chains).
+
+Importing AI_Integration.main and building its components takes tens of
+seconds, so it never happens on the import or startup path: `start_warming()`
+runs it in a background thread at startup, and `get()` / `aget()` wait for it
+on first use. Everything that does not need the LLM (health, variables) is
+served while the stack is still warming, or even if it failed to start.
+"""
+
+import time
+import asyncio
+import logging
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+AI_MODULE = "AI_Integration.main"
+
+# Warm-up states
+COLD = "cold"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class AIStackUnavailable(RuntimeError):
+    """Raised when the AI stack could not be initialized (or is not ready in time)."""
+
+
+class AIStack:
+    """
+    Lazily imported and initialized AI integration module.
+
+    The state moves cold → warming → ready, or → failed if initialization
+    raises (e.g. no Groq API key). A failed stack is retried on the next
+    `start_warming()` / `get()`.
+    """
+
+    def __init__(self, module_name: str = AI_MODULE):
+        self._module_name = module_name
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._module: Optional[ModuleType] = None
+        self._state = COLD
+        self._error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._warmup_seconds: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        return self._state == READY
+
+    @property
+    def is_started(self) -> bool:
+        """True once warm-up was started (warming, ready or failed)."""
+        return self._state != COLD
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Current state for the readiness endpoint.
+
+        `warmup_seconds` is the total warm-up time once ready, and the time
+        spent so far while warming.
+        """
+        seconds = self._warmup_seconds
+        if self._state == WARMING and self._started_at is not None:
+            seconds = round(time.monotonic() - self._started_at, 1)
+        return {"state": self._state, "error": self._error, "warmup_seconds": seconds}
+
+    def start_warming(self) -> bool:
+        """
+        Start initializing in a background thread (no-op if warming or ready).
+
+        Returns:
+            True if a warm-up thread was started
+        """
+        with self._lock:
+            if self._state in (WARMING, READY):
+                return False
+            self._state = WARMING
+            self._error = None
+            self._ready.clear()
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._warm, name="ai-stack-warmup", daemon=True)
+            self._thread.start()
+        logger.info("Warming up AI stack in the background")
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> ModuleType:
+        """
+        The initialized AI module, starting or waiting for warm-up as needed.
+
+        Args:
+            timeout: Max seconds to wait for a warm-up in progress (None waits)
+
+        Raises:
+            AIStackUnavailable: If initialization failed or did not finish in time
+        """
+        module = self._module
+        if module is not None:
+            return module
+
+        if self._state in (COLD, FAILED):
+            self.start_warming()
+        if not self._ready.wait(timeout):
+            raise AIStackUnavailable("AI stack is still warming up")
+        if self._module is None:
+            raise AIStackUnavailable(f"AI stack failed to initialize: {self._error}")
+        return self._module
+
+    async def aget(self, timeout: Optional[float] = None) -> ModuleType:
+        """Async `get()`; waiting for warm-up happens off the event loop."""
+        module = self._module
+        if module is not None:
+            return module
+        return await asyncio.to_thread(self.get, timeout)
+
+    def _warm(self):
+        try:
+            module = importlib.import_module(self._module_name)
+            module.initialize()
+        except Exception as e:
+            with self._lock:
+                self._state = FAILED
+                self._error = str(e) or type(e).__name__
+            logger.error(f"AI stack failed to initialize: {e}")
+        else:
+            with self._lock:
+                self._module = module
+                self._state = READY
+                self._warmup_seconds = round(time.monotonic() - self._started_at, 2)
+            logger.info(f"AI stack ready after {self._warmup_seconds}s")
+        finally:
+            self._ready.set()
+
+
+# Global AI stack handle
+ai_stack = AIStack()
@@ -35,13 +35,23 @@ class Settings(BaseModel):
     )
     
     # API Configuration
-    max_upload_size: int = Field(5 * 1024 * 1024, description="Max upload size in bytes")
+    max_upload_size: int = Field(100 * 1024 * 1024, description="Max upload size in bytes (uploads are streamed)")
     request_timeout: int = Field(30, description="Request timeout in seconds")
     
     # AI Configuration
     groq_api_key: Optional[str] = Field(None, description="Groq API key")
     groq_model_name: str = Field("llama-3.1-70b-versatile", description="Groq model name")
-    rag_k: int = Field(3, description="RAG retriever k value")
+    rag_k: int = Field(8, description="RAG retriever k value (devices per prompt)")
+    generation_concurrency: int = Field(4, description="Max concurrent generations per batch request")
+    ai_warmup: bool = Field(True, description="Initialize the AI stack in the background at startup")
+    fast_path: bool = Field(True, description="Answer simple narratives with rule-based templates (no LLM call)")
+    fast_path_confidence: float = Field(0.9, description="Min template match confidence to skip the LLM")
+    validation_workers: int = Field(0, description="Validator processes per large IR (0 = by CPU count and IR size)")
+    
+    # Generation cache (0 entries disables it; 0 similarity disables the embedding tier)
+    generation_cache_size: int = Field(512, description="Max cached generations")
+    generation_cache_ttl: int = Field(3600, description="Cached generation lifetime in seconds")
+    generation_cache_similarity: float = Field(0.0, description="Min cosine similarity for a near-duplicate hit")
     
     # Logging
     log_level: str = Field("INFO", description="Logging level")
@@ -89,10 +99,18 @@ def get_settings() -> Settings:
         db_name=os.getenv("DB_NAME", "iec_code_generator"),
         collection_name=os.getenv("COLLECTION_NAME", "variables"),
         allowed_origins=os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173"),
-        max_upload_size=int(os.getenv("MAX_UPLOAD_SIZE", 5 * 1024 * 1024)),
+        max_upload_size=int(os.getenv("MAX_UPLOAD_SIZE", 100 * 1024 * 1024)),
         groq_api_key=os.getenv("GROQ_API_KEY") or os.getenv("GROQ_API_KEY2"),
         groq_model_name=os.getenv("GROQ_MODEL_NAME", "llama-3.1-70b-versatile"),
-        rag_k=int(os.getenv("RAG_K", 3)),
+        rag_k=int(os.getenv("RAG_K", 8)),
+        generation_concurrency=int(os.getenv("GENERATION_CONCURRENCY", 4)),
+        ai_warmup=os.getenv("AI_WARMUP", "true").lower() not in ("0", "false", "no"),
+        fast_path=os.getenv("FAST_PATH", "true").lower() not in ("0", "false", "no"),
+        fast_path_confidence=float(os.getenv("FAST_PATH_CONFIDENCE", 0.9)),
+        validation_workers=int(os.getenv("VALIDATION_WORKERS", 0)),
+        generation_cache_size=int(os.getenv("GENERATION_CACHE_SIZE", 512)),
+        generation_cache_ttl=int(os.getenv("GENERATION_CACHE_TTL", 3600)),
+        generation_cache_similarity=float(os.getenv("GENERATION_CACHE_SIMILARITY", 0)),
         log_level=os.getenv("LOG_LEVEL", "INFO"),
     )
     
@@ -0,0 +1,159 @@
+"""
+Device Variable Registry
+
+Process-wide, in-memory cache of device name → datatype.
+Loaded from MongoDB once and refreshed only when the variables collection changes.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from .database import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceRegistry:
+    """
+    Caches the device variable table for the validator hot path.
+
+    The table is loaded lazily on first use. Writers (VariablesService) call
+    `invalidate()` after mutating the collection; when the deployment supports
+    change streams, `start_watching()` also picks up writes made by other
+    processes. Every invalidation bumps `version`, which callers can use as a
+    cache key for anything derived from the device table, and notifies the
+    listeners registered with `add_listener()`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Optional[Dict[str, str]] = None
+        self._version = 0
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._listeners: List[Callable[[int], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._types is not None
+
+    def get_all(self) -> Dict[str, str]:
+        """
+        Get the device name → datatype mapping (treat as read-only).
+
+        Returns:
+            Mapping of device names to upper-cased datatypes; empty if the
+            database is unavailable (empty results are not cached)
+        """
+        types = self._types
+        if types is not None:
+            return types
+
+        with self._lock:
+            if self._types is None:
+                loaded = self._load()
+                if not loaded:
+                    return loaded
+                self._types = loaded
+            return self._types
+
+    async def aget_all(self) -> Dict[str, str]:
+        """Async `get_all()`; a cold load runs in the default executor, off the event loop."""
+        types = self._types
+        if types is not None:
+            return types
+        return await asyncio.to_thread(self.get_all)
+
+    def invalidate(self):
+        """Drop the cached table; the next `get_all()` reloads it."""
+        with self._lock:
+            self._types = None
+            self._version += 1
+            version = self._version
+        logger.debug(f"Device registry invalidated (version {version})")
+
+        for listener in list(self._listeners):
+            try:
+                listener(version)
+            except Exception as e:
+                logger.warning(f"Device registry listener failed: {e}")
+
+    def add_listener(self, callback: Callable[[int], None]):
+        """
+        Call `callback(version)` after every invalidation.
+
+        Listeners run on the invalidating thread (a request handler or the
+        change stream watcher), so they should hand slow work off elsewhere.
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _load(self) -> Dict[str, str]:
+        collection = get_collection()
+        if collection is None:
+            return {}
+
+        types: Dict[str, str] = {}
+        try:
+            cursor = collection.find({}, {"deviceName": 1, "dataType": 1, "_id": 0})
+            for item in cursor:
+                name = item.get("deviceName")
+                datatype = item.get("dataType")
+                if name and datatype:
+                    types[name.strip()] = datatype.upper()
+        except PyMongoError as e:
+            logger.warning(f"Could not load device variables from database: {e}")
+            return {}
+
+        logger.info(f"Loaded {len(types)} device variables into registry")
+        return types
+
+    def start_watching(self) -> bool:
+        """
+        Invalidate on every change to the collection using a MongoDB change stream.
+
+        Change streams need a replica set (e.g. Atlas); on a standalone server the
+        watcher exits and only in-process invalidation is used.
+
+        Returns:
+            True if a watcher thread was started
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return True
+        collection = get_collection()
+        if collection is None:
+            return False
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(collection,), name="device-registry-watch", daemon=True
+        )
+        self._watcher.start()
+        return True
+
+    def stop_watching(self):
+        """Stop the change stream watcher (if running)."""
+        self._stop_watching.set()
+        self._watcher = None
+
+    def _watch(self, collection):
+        try:
+            with collection.watch(max_await_time_ms=1000) as stream:
+                logger.info("Watching variables collection for changes")
+                while not self._stop_watching.is_set() and stream.alive:
+                    if stream.try_next() is not None:
+                        self.invalidate()
+        except PyMongoError as e:
+            logger.info(f"Change streams unavailable, relying on in-process invalidation: {e}")
+
+
+# Global registry instance
+device_registry = DeviceRegistry()
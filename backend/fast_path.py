@@ -0,0 +1,231 @@
+"""
+Rule-Based Fast Path
+
+Deterministic intent matcher for simple narratives, tried before the LLM.
+Handles the patterns that make up most traffic:
+
+    turn on the fan / switch Fan2 off / deactivate the alarm
+    set Fan2 to 3
+    turn on the tv if motion_detected = true else keep it off
+    keep the fan on if humidity < 40, otherwise turn it off
+    if motion_detected turn on tv else off
+
+Device phrases are resolved against the device table (exactly, then through
+the name index), and every match gets a confidence: 1.0 when all devices are
+named exactly, less for case/spacing variants and typos. The IR is checked
+with the validator before it is returned, and anything that does not match
+a template exactly is left to the LLM.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from validator import validate_diagnostics, RE_INT, RE_REAL
+from name_index import index_for
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Confidence of a device written with other case / spacing, and the loss per typo
+KEY_MATCH_CONFIDENCE = 0.95
+TYPO_PENALTY = 0.15
+# Longer narratives are never simple enough for a template
+MAX_NARRATIVE_LENGTH = 200
+
+ON_VERBS = ("activate", "start", "enable", "open")
+OFF_VERBS = ("deactivate", "stop", "disable", "close")
+VERBS = "|".join(ON_VERBS + OFF_VERBS)
+ARTICLE = r"(?:the\s+)?"
+
+# (template, pattern) for one action; `device` may be "it" in an else branch
+RE_ACTIONS: List[Tuple[str, "re.Pattern"]] = [
+    ("switch", re.compile(rf"(?:turn|switch|power)\s+(?P<state>on|off)\s+{ARTICLE}(?P<device>.+)", re.I)),
+    ("switch", re.compile(rf"(?:turn|switch|power|keep)\s+{ARTICLE}(?P<device>.+?)\s+(?P<state>on|off)", re.I)),
+    ("switch", re.compile(rf"(?P<verb>{VERBS})\s+{ARTICLE}(?P<device>.+)", re.I)),
+    ("set", re.compile(rf"(?:set|change)\s+{ARTICLE}(?P<device>.+?)\s+to\s+(?P<value>\S+)", re.I)),
+]
+ACTION_START = rf"(?:turn|switch|power|keep|set|change|{VERBS})\b"
+
+# "<action> if <condition>[,] else <action>" and "if <condition>[,| then] <action>[,] else <action>"
+ELSE = r"(?:\s*,\s*|\s+)(?:else|otherwise)\s*,?\s+(?P<otherwise>.+)"
+RE_ACTION_FIRST = re.compile(rf"(?P<action>.+?)\s+(?:if|when|whenever)\s+(?P<condition>.+?)(?:{ELSE})?", re.I)
+RE_CONDITION_FIRST = re.compile(
+    rf"(?:if|when|whenever)\s+(?P<condition>.+?)(?:\s*,\s*|\s+then\s+|\s+)"
+    rf"(?P<action>{ACTION_START}.+?)(?:{ELSE})?",
+    re.I,
+)
+# Else branch about the same device: "keep it off", "turn it off", "off"
+RE_SHORT_ELSE = re.compile(r"(?:(?:keep|turn|switch|leave)\s+)?(?:it\s+)?(?P<state>on|off)(?:\s+it)?", re.I)
+
+SYMBOL_OPS = {">=": ">=", "<=": "<=", "<>": "<>", "!=": "<>", "==": "=", "=": "=", ">": ">", "<": "<"}
+WORD_OPS = {
+    "is above": ">", "is greater than": ">", "is more than": ">", "is higher than": ">", "exceeds": ">",
+    "is below": "<", "is less than": "<", "is lower than": "<",
+    "is at least": ">=", "is at most": "<=",
+    "is not": "<>", "is equal to": "=", "equals": "=", "is": "=",
+}
+RE_COMPARISON = re.compile(
+    r"(?P<left>.+?)(?:\s*(?P<symbol>" + "|".join(re.escape(op) for op in SYMBOL_OPS) + r")\s*"
+    r"|\s+(?P<words>" + "|".join(sorted((w.replace(" ", r"\s+") for w in WORD_OPS), key=len, reverse=True))
+    + r")\s+)(?P<right>.+)",
+    re.I,
+)
+RE_CLOCK = re.compile(r"(?P<h>[01]?\d|2[0-3]):(?P<m>[0-5]\d)")
+BOOL_WORDS = {"true": "TRUE", "on": "TRUE", "false": "FALSE", "off": "FALSE"}
+
+
+@dataclass(frozen=True)
+class FastPathMatch:
+    """IR for a narrative matched by a template, with the matcher's confidence (0..1)."""
+    intermediate: List[Dict[str, Any]]
+    confidence: float
+    template: str
+
+
+class _NoMatch(Exception):
+    """The narrative does not fit a template (or names an unknown device)."""
+
+
+class _Matcher:
+    """Matches the clauses of one narrative against the device table, tracking confidence."""
+
+    def __init__(self, device_vars: Dict[str, str]):
+        self.device_vars = device_vars
+        self.confidence = 1.0
+        self.used: Dict[str, str] = {}
+
+    def device(self, phrase: str) -> str:
+        """Device name for a phrase such as "the living room light"."""
+        phrase = re.sub(r"^the\s+", "", phrase.strip(), flags=re.I)
+        if phrase in self.device_vars:
+            name, confidence = phrase, 1.0
+        else:
+            matches = index_for(self.device_vars).lookup(phrase, limit=2)
+            if len(matches) != 1:
+                raise _NoMatch(f"no single device for '{phrase}'")
+            name, distance = matches[0]
+            confidence = KEY_MATCH_CONFIDENCE - TYPO_PENALTY * distance
+        self.confidence = min(self.confidence, confidence)
+        self.used[name] = self.device_vars[name]
+        return name
+
+    def literal(self, text: str, datatype: str) -> str:
+        """IEC literal for a value written in a narrative, for a device of `datatype`."""
+        text = text.strip()
+        if datatype == "BOOL":
+            if text.lower() not in BOOL_WORDS:
+                raise _NoMatch(f"'{text}' is not a BOOL value")
+            return BOOL_WORDS[text.lower()]
+        if RE_INT.fullmatch(text) or RE_REAL.fullmatch(text):
+            return text
+        clock = RE_CLOCK.fullmatch(text)
+        if clock and datatype in ("TIME_OF_DAY", "TOD"):
+            return f"TOD#{int(clock['h']):02d}:{clock['m']}:00"
+        if clock and datatype == "TIME":
+            return f"T#{int(clock['h'])}H{int(clock['m'])}M"
+        raise _NoMatch(f"'{text}' is not a {datatype} value")
+
+    def action(self, text: str, it: Optional[str] = None) -> Tuple[str, str, str]:
+        """(template, target device, expression) for "turn on the fan", "set Fan2 to 3", ..."""
+        if it is not None:
+            short = RE_SHORT_ELSE.fullmatch(text)
+            if short:
+                return "switch", it, BOOL_WORDS[short["state"].lower()]
+
+        for template, pattern in RE_ACTIONS:
+            found = pattern.fullmatch(text)
+            if not found:
+                continue
+            if it is not None and found["device"].lower() == "it":
+                target = it
+            else:
+                target = self.device(found["device"])
+            datatype = self.device_vars[target]
+            if template == "set":
+                return template, target, self.literal(found["value"], datatype)
+            if datatype != "BOOL":
+                raise _NoMatch(f"'{target}' is {datatype}, not an on/off device")
+            verb = found.groupdict().get("verb")
+            on = verb.lower() in ON_VERBS if verb else found["state"].lower() == "on"
+            return template, target, "TRUE" if on else "FALSE"
+        raise _NoMatch(f"no action in '{text}'")
+
+    def condition(self, text: str) -> str:
+        """Validator-ready condition for "temperature > 30", "motion_detected", ..."""
+        comparison = RE_COMPARISON.fullmatch(text)
+        if comparison:
+            left = self.device(comparison["left"])
+            if comparison["symbol"]:
+                op = SYMBOL_OPS[comparison["symbol"]]
+            else:
+                op = WORD_OPS[" ".join(comparison["words"].lower().split())]
+            try:
+                right = self.literal(comparison["right"], self.device_vars[left])
+            except _NoMatch:
+                right = self.device(comparison["right"])
+            return f"{left} {op} {right}"
+
+        device = self.device(text)
+        if self.device_vars[device] != "BOOL":
+            raise _NoMatch(f"'{device}' is not a BOOL condition")
+        return device
+
+
+def _program(target: str, declarations: Dict[str, str], statement: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Single-program IR declaring the devices used, named after the target ("FanControl")."""
+    name = "".join(part[:1].upper() + part[1:] for part in re.split(r"[^A-Za-z0-9]+", target) if part)
+    if not name or name[0].isdigit():
+        name = f"Device{name}"
+    return [{"program": {
+        "name": f"{name}Control",
+        "declarations": [{"type": "VAR", "name": n, "datatype": t} for n, t in declarations.items()],
+        "statements": [statement],
+    }}]
+
+
+def match_narrative(narrative: str, device_vars: Dict[str, str]) -> Optional[FastPathMatch]:
+    """
+    IR for a simple narrative, or None if it needs the LLM.
+
+    Args:
+        narrative: Natural language description
+        device_vars: Device name -> datatype table
+
+    Returns:
+        The validated IR with its confidence and template name, or None if no
+        template matches, a device cannot be resolved unambiguously or the IR
+        does not validate
+    """
+    text = " ".join(narrative.split()).rstrip(".!").strip()
+    if not text or not device_vars or len(text) > MAX_NARRATIVE_LENGTH:
+        return None
+
+    matcher = _Matcher(device_vars)
+    try:
+        conditional = RE_CONDITION_FIRST.fullmatch(text) or RE_ACTION_FIRST.fullmatch(text)
+        if conditional:
+            _, target, expression = matcher.action(conditional["action"])
+            statement: Dict[str, Any] = {
+                "type": "if",
+                "condition": matcher.condition(conditional["condition"]),
+                "then": [{"type": "assignment", "target": target, "expression": expression}],
+            }
+            if conditional["otherwise"]:
+                _, other, other_expression = matcher.action(conditional["otherwise"], it=target)
+                statement["else"] = [{"type": "assignment", "target": other, "expression": other_expression}]
+            template = "conditional"
+        else:
+            template, target, expression = matcher.action(text)
+            statement = {"type": "assignment", "target": target, "expression": expression}
+    except _NoMatch as e:
+        logger.debug(f"Fast path: no match ({e})")
+        return None
+
+    intermediate = _program(target, matcher.used, statement)
+    diagnostics = validate_diagnostics(intermediate, device_vars, workers=1)
+    if diagnostics:
+        logger.debug(f"Fast path: matched IR does not validate ({diagnostics[0]['message']})")
+        return None
+    return FastPathMatch(intermediate, round(matcher.confidence, 2), template)
@@ -85,7 +85,7 @@ def fetch_variables() -> List[Dict[str, Any]]:
     try:
         with DatabaseConnection(MONGO_URI, DB_NAME, COLLECTION_NAME) as collection:
             # Fetch all variables, excluding internal MongoDB fields
-            variables = list(collection.find({}, {"_id": 0, "id": 0}))
+            variables = list(collection.find({}, {"_id": 0, "id": 0, "deviceNameKey": 0}))
             
             # Clean up any remaining internal fields
             cleaned_variables = []
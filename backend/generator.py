@@ -8,13 +8,26 @@ Supports programs, function blocks, and functions.
 import json
 import re
 import logging
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 INDENT = "    "
 
+RE_IDENTIFIER = re.compile(r'^[A-Za-z_]\w*(?:[\.\[][\w\]\.]+)*$')
+RE_EXPRESSION = re.compile(r'[\s\+\-\*\/\(\)]')
+RE_STRUCT = re.compile(r'^\s*STRUCT\s*\(\s*(.+)\s*\)\s*$', flags=re.IGNORECASE)
+RE_STRUCT_FIELD = re.compile(r'^([\w]+)\s*:\s*(.+)$')
+
+# TIME, DATE, DATE_AND_TIME and TIME_OF_DAY literals are emitted verbatim
+TYPED_LITERAL_PREFIXES = ("T#", "TIME#", "D#", "DATE#", "DT#", "DATE_AND_TIME#", "TOD#", "TIME_OF_DAY#")
+# Distinct string literals whose ST form is cached
+LITERAL_CACHE_SIZE = 4096
+# Approximate size of the chunks yielded by iter_st()
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class GeneratorError(Exception):
     """Custom exception for generator errors."""
@@ -28,7 +41,20 @@ def st_bool(val: bool) -> str:
 
 def is_identifier(s: str) -> bool:
     """Check if string is a valid ST identifier."""
-    return re.match(r'^[A-Za-z_]\w*(?:[\.\[][\w\]\.]+)*$', s) is not None
+    return RE_IDENTIFIER.match(s) is not None
+
+
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def string_to_st(val: str) -> str:
+    """
+    Convert a string value to ST (classification is cached per distinct string).
+    
+    Typed literals (T#, D#, DT#, TOD#, ...), identifiers and expressions are
+    emitted as-is; anything else becomes a string literal.
+    """
+    if val.startswith(TYPED_LITERAL_PREFIXES) or is_identifier(val) or RE_EXPRESSION.search(val):
+        return val
+    return f'"{val}"'
 
 
 def value_to_st(val: Any) -> str:
@@ -40,26 +66,7 @@ def value_to_st(val: Any) -> str:
     if isinstance(val, (int, float)):
         return str(val)
     if isinstance(val, str):
-        # Time literals
-        if val.startswith("T#") or val.startswith("TIME#"):
-            return val
-        # Date literals
-        if val.startswith("D#") or val.startswith("DATE#"):
-            return val
-        # DateTime literals
-        if val.startswith("DT#") or val.startswith("DATE_AND_TIME#"):
-            return val
-        # TOD literals
-        if val.startswith("TOD#") or val.startswith("TIME_OF_DAY#"):
-            return val
-        # Identifiers
-        if is_identifier(val):
-            return val
-        # Expressions with operators
-        if re.search(r'[\s\+\-\*\/\(\)]', val):
-            return val
-        # String literals
-        return f'"{val}"'
+        return string_to_st(val)
     # For arrays/dicts, dump as JSON (rare for simple ST)
     return json.dumps(val)
 
@@ -79,7 +86,7 @@ def parse_struct_datatype(datatype: str) -> Optional[List[Dict[str, str]]]:
     Returns:
         List of field dictionaries: [{name, datatype}, ...]
     """
-    m = re.match(r'^\s*STRUCT\s*\(\s*(.+)\s*\)\s*$', datatype, flags=re.IGNORECASE)
+    m = RE_STRUCT.match(datatype)
     if not m:
         return None
     inner = m.group(1)
@@ -87,7 +94,7 @@ def parse_struct_datatype(datatype: str) -> Optional[List[Dict[str, str]]]:
     parts = [p.strip() for p in inner.split(';') if p.strip()]
     fields = []
     for p in parts:
-        mm = re.match(r'^([\w]+)\s*:\s*(.+)$', p)
+        mm = RE_STRUCT_FIELD.match(p)
         if mm:
             fname = mm.group(1)
             ftype = mm.group(2).strip()
@@ -135,151 +142,247 @@ def emit_var_block(declarations: List[Dict[str, Any]]) -> List[str]:
     return lines
 
 
-def convert_statement(stmt: Dict[str, Any], level: int = 0) -> List[str]:
+class STWriter:
     """
-    Convert one statement JSON to ST lines.
+    Output buffer for generated ST.
+    
+    Every line is written once, already indented to its final column, so nested
+    blocks are never re-copied or re-prefixed per nesting level. Lines are kept
+    in `lines`, or passed on newline-separated to `write` when a sink is given.
+    """
+    
+    def __init__(self, write: Optional[Callable[[str], Any]] = None):
+        self.lines: List[str] = []
+        self._write = write
+        self._newline = False
+    
+    def line(self, text: str, indent: int = 0):
+        """Append one line indented by `indent` levels (empty lines stay empty)."""
+        if text and indent:
+            text = INDENT * indent + text
+        if self._write is None:
+            self.lines.append(text)
+        else:
+            self._write("\n" + text if self._newline else text)
+            self._newline = True
+    
+    def separator(self, text: str):
+        """Write raw text between two top-level units (sink mode only)."""
+        self._write(text)
+        self._newline = False
+    
+    def getvalue(self) -> str:
+        return "\n".join(self.lines)
+
+
+# IR statement type -> emitter, see register_statement()
+StatementEmitter = Callable[[STWriter, Dict[str, Any], int, int], None]
+STATEMENT_EMITTERS: Dict[str, StatementEmitter] = {}
+
+
+def register_statement(stmt_type: str) -> Callable[[StatementEmitter], StatementEmitter]:
+    """
+    Decorator registering the emitter for an IR statement type.
+    
+    The emitter is called as `emitter(out, stmt, level, indent)` and writes the
+    statement with `out.line(text, indent)`. Nested statements are written with
+    `emit_block(out, stmts, level + 1, indent + level + 1)`. Registering an
+    existing type replaces its emitter.
+    
+    Example:
+        @register_statement("comment")
+        def emit_comment(out, stmt, level, indent):
+            out.line(f"(* {stmt.get('text', '')} *)", indent)
+    """
+    def decorator(emitter: StatementEmitter) -> StatementEmitter:
+        STATEMENT_EMITTERS[stmt_type] = emitter
+        return emitter
+    return decorator
+
+
+def emit_statement(out: STWriter, stmt: Dict[str, Any], level: int = 0, indent: int = 0):
+    """
+    Write one statement JSON as ST lines.
     
     Args:
+        out: Writer to append to
         stmt: Statement dictionary with 'type' key
-        level: Indentation level
-    
-    Returns:
-        List of ST code lines
+        level: Nesting level; nested blocks are indented `level + 1` relative to
+            their parent statement (CASE branches `level + 2`)
+        indent: Absolute indentation of the statement itself
     """
     t = stmt.get("type")
-    lines: List[str] = []
-
-    if t == "assignment":
-        target = stmt.get("target", "")
-        expr = stmt.get("expression", "")
-        if not target:
-            logger.warning("Assignment statement missing target")
-            lines.append("(* ERROR: Assignment missing target *)")
-        else:
-            lines.append(f"{target} := {expr};")
-
-    elif t == "if":
-        cond = stmt.get("condition", "TRUE")
-        lines.append(f"IF {cond} THEN")
-        # Then block
-        for s in stmt.get("then", []):
-            lines += indent_lines(convert_statement(s, level+1), level+1)
-        # Else-if blocks (if present)
-        for elif_block in stmt.get("elsif", []):
-            elif_cond = elif_block.get("condition", "TRUE")
-            lines.append(f"ELSIF {elif_cond} THEN")
-            for s in elif_block.get("then", []):
-                lines += indent_lines(convert_statement(s, level+1), level+1)
-        # Else block
-        else_block = stmt.get("else")
-        if else_block:
-            lines.append("ELSE")
-            for s in else_block:
-                lines += indent_lines(convert_statement(s, level+1), level+1)
-        lines.append("END_IF;")
-
-    elif t == "case":
-        selector = stmt.get("selector", "0")
-        lines.append(f"CASE {selector} OF")
-        for c in stmt.get("cases", []):
-            val = c.get("value")
-            # Value may be string or number
-            val_repr = value_to_st(val) if not isinstance(val, (int, float)) else str(val)
-            lines.append(f"{INDENT}{val_repr}:")
-            for s in c.get("statements", []):
-                lines += indent_lines(convert_statement(s, level+2), level+2)
-        # Else clause
-        else_stmts = stmt.get("else")
-        if else_stmts:
-            lines.append("ELSE")
-            for s in else_stmts:
-                lines += indent_lines(convert_statement(s, level+1), level+1)
-        lines.append("END_CASE;")
-
-    elif t == "for":
-        it = stmt.get("iterator", "i")
-        frm = stmt.get("from", 0)
-        to = stmt.get("to", 0)
-        by = stmt.get("by", None)
-        by_part = f" BY {by}" if by is not None else ""
-        lines.append(f"FOR {it} := {frm} TO {to}{by_part} DO")
-        for s in stmt.get("body", []):
-            lines += indent_lines(convert_statement(s, level+1), level+1)
-        lines.append("END_FOR;")
-
-    elif t == "while":
-        cond = stmt.get("condition", "TRUE")
-        lines.append(f"WHILE {cond} DO")
-        for s in stmt.get("body", []):
-            lines += indent_lines(convert_statement(s, level+1), level+1)
-        lines.append("END_WHILE;")
-
-    elif t == "repeat":
-        lines.append("REPEAT")
-        for s in stmt.get("body", []):
-            lines += indent_lines(convert_statement(s, level+1), level+1)
-        until = stmt.get("until", "TRUE")
-        lines.append(f"UNTIL {until}")
-        lines.append("END_REPEAT;")
-
-    elif t == "functionCall":
-        name = stmt.get("name", "UnknownFunction")
-        args = stmt.get("arguments", [])
-        args_str = ", ".join(str(arg) for arg in args)
-        lines.append(f"{name}({args_str});")
-
-    elif t == "fbCall":
-        # Function block call with named parameters
-        name = stmt.get("name", "UnknownFB")
-        inputs = stmt.get("inputs", {})
-        outputs = stmt.get("outputs", {})
-        
-        call_parts = []
-        if isinstance(inputs, dict):
-            for k, v in inputs.items():
-                call_parts.append(f"{k} := {value_to_st(v)}")
-        
-        call_text = ", ".join(call_parts)
-        lines.append(f"{name}({call_text});")
-        
-        # Add output mappings as comments if present
-        if outputs and isinstance(outputs, dict):
-            out_comment = ", ".join(f"{k} => {v}" for k, v in outputs.items())
-            lines.append(f"(* outputs: {out_comment} *)")
-
-    elif t == "return":
-        # Return statement (for functions)
-        expr = stmt.get("expression")
-        if expr:
-            lines.append(f"(* Return value set via function name assignment *)")
-        else:
-            lines.append("RETURN;")
+    emitter = STATEMENT_EMITTERS.get(t) if isinstance(t, str) else None
+    if emitter is None:
+        # Unknown/unsupported node type
+        logger.warning(f"Unsupported statement type: {t}")
+        out.line(f"(* Unsupported statement type: {t} *)", indent)
+        return
+    emitter(out, stmt, level, indent)
 
-    elif t == "exit":
-        lines.append("EXIT;")
 
-    elif t == "continue":
-        lines.append("CONTINUE;")
+def emit_block(out: STWriter, stmts: List[Dict[str, Any]], level: int, indent: int):
+    """Write nested statements at `level`, all at absolute indentation `indent`."""
+    for s in stmts:
+        emit_statement(out, s, level, indent)
+
 
+@register_statement("assignment")
+def emit_assignment(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    target = stmt.get("target", "")
+    expr = stmt.get("expression", "")
+    if not target:
+        logger.warning("Assignment statement missing target")
+        out.line("(* ERROR: Assignment missing target *)", indent)
     else:
-        # Unknown/unsupported node type
-        logger.warning(f"Unsupported statement type: {t}")
-        lines.append(f"(* Unsupported statement type: {t} *)")
+        out.line(f"{target} := {expr};", indent)
+
+
+@register_statement("if")
+def emit_if(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    cond = stmt.get("condition", "TRUE")
+    inner = indent + level + 1
+    out.line(f"IF {cond} THEN", indent)
+    # Then block
+    emit_block(out, stmt.get("then", []), level+1, inner)
+    # Else-if blocks (if present)
+    for elif_block in stmt.get("elsif", []):
+        elif_cond = elif_block.get("condition", "TRUE")
+        out.line(f"ELSIF {elif_cond} THEN", indent)
+        emit_block(out, elif_block.get("then", []), level+1, inner)
+    # Else block
+    else_block = stmt.get("else")
+    if else_block:
+        out.line("ELSE", indent)
+        emit_block(out, else_block, level+1, inner)
+    out.line("END_IF;", indent)
+
+
+@register_statement("case")
+def emit_case(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    selector = stmt.get("selector", "0")
+    out.line(f"CASE {selector} OF", indent)
+    for c in stmt.get("cases", []):
+        val = c.get("value")
+        # Value may be string or number
+        val_repr = value_to_st(val) if not isinstance(val, (int, float)) else str(val)
+        out.line(f"{val_repr}:", indent + 1)
+        emit_block(out, c.get("statements", []), level+2, indent + level + 2)
+    # Else clause
+    else_stmts = stmt.get("else")
+    if else_stmts:
+        out.line("ELSE", indent)
+        emit_block(out, else_stmts, level+1, indent + level + 1)
+    out.line("END_CASE;", indent)
+
+
+@register_statement("for")
+def emit_for(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    it = stmt.get("iterator", "i")
+    frm = stmt.get("from", 0)
+    to = stmt.get("to", 0)
+    by = stmt.get("by", None)
+    by_part = f" BY {by}" if by is not None else ""
+    out.line(f"FOR {it} := {frm} TO {to}{by_part} DO", indent)
+    emit_block(out, stmt.get("body", []), level+1, indent + level + 1)
+    out.line("END_FOR;", indent)
+
+
+@register_statement("while")
+def emit_while(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    cond = stmt.get("condition", "TRUE")
+    out.line(f"WHILE {cond} DO", indent)
+    emit_block(out, stmt.get("body", []), level+1, indent + level + 1)
+    out.line("END_WHILE;", indent)
+
+
+@register_statement("repeat")
+def emit_repeat(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    out.line("REPEAT", indent)
+    emit_block(out, stmt.get("body", []), level+1, indent + level + 1)
+    until = stmt.get("until", "TRUE")
+    out.line(f"UNTIL {until}", indent)
+    out.line("END_REPEAT;", indent)
+
+
+@register_statement("functionCall")
+def emit_function_call(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    name = stmt.get("name", "UnknownFunction")
+    args = stmt.get("arguments", [])
+    args_str = ", ".join(str(arg) for arg in args)
+    out.line(f"{name}({args_str});", indent)
+
+
+@register_statement("fbCall")
+def emit_fb_call(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    # Function block call with named parameters
+    name = stmt.get("name", "UnknownFB")
+    inputs = stmt.get("inputs", {})
+    outputs = stmt.get("outputs", {})
+    
+    call_parts = []
+    if isinstance(inputs, dict):
+        for k, v in inputs.items():
+            call_parts.append(f"{k} := {value_to_st(v)}")
+    
+    call_text = ", ".join(call_parts)
+    out.line(f"{name}({call_text});", indent)
+    
+    # Add output mappings as comments if present
+    if outputs and isinstance(outputs, dict):
+        out_comment = ", ".join(f"{k} => {v}" for k, v in outputs.items())
+        out.line(f"(* outputs: {out_comment} *)", indent)
+
+
+@register_statement("return")
+def emit_return(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    # Return statement (for functions)
+    expr = stmt.get("expression")
+    if expr:
+        out.line(f"(* Return value set via function name assignment *)", indent)
+    else:
+        out.line("RETURN;", indent)
 
-    return lines
+
+@register_statement("exit")
+def emit_exit(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    out.line("EXIT;", indent)
+
+
+@register_statement("continue")
+def emit_continue(out: STWriter, stmt: Dict[str, Any], level: int, indent: int):
+    out.line("CONTINUE;", indent)
+
+
+def convert_statement(stmt: Dict[str, Any], level: int = 0) -> List[str]:
+    """
+    Convert one statement JSON to ST lines.
+    
+    Args:
+        stmt: Statement dictionary with 'type' key
+        level: Indentation level
+    
+    Returns:
+        List of ST code lines
+    """
+    out = STWriter()
+    emit_statement(out, stmt, level)
+    return out.lines
 
 
 def convert_statements(stmts: List[Dict[str, Any]], level: int = 0) -> List[str]:
     """Convert a list of statements to ST lines."""
-    out: List[str] = []
+    out = STWriter()
     for s in stmts:
-        out += indent_lines(convert_statement(s, level), level)
-    return out
+        emit_statement(out, s, level, level)
+    return out.lines
 
 
-def convert_program(obj: Dict[str, Any]) -> str:
+def emit_program(out: STWriter, obj: Dict[str, Any]) -> Iterator[None]:
     """
-    Convert a 'program' JSON object to IEC 61131-3 PROGRAM ... END_PROGRAM block.
+    Write a 'program' JSON object as an IEC 61131-3 PROGRAM ... END_PROGRAM block.
+    
+    Yields after every body statement so callers can flush the output.
     """
     prog = obj.get("program")
     if not prog:
@@ -289,28 +392,27 @@ def convert_program(obj: Dict[str, Any]) -> str:
     declarations = prog.get("declarations", [])
     statements = prog.get("statements", [])
 
-    lines: List[str] = []
-    lines.append(f"PROGRAM {name}")
+    out.line(f"PROGRAM {name}")
     
     # VAR block
-    var_lines = emit_var_block(declarations)
-    if var_lines:
-        lines += indent_lines(var_lines, 0)
-    lines.append("")  # Blank line between declarations and body
+    for ln in emit_var_block(declarations):
+        out.line(ln)
+    out.line("")  # Blank line between declarations and body
 
     # Body statements
-    if statements:
-        for s in statements:
-            lines += convert_statement(s, 0)
+    for s in statements:
+        emit_statement(out, s)
+        yield
     
-    lines.append("")
-    lines.append("END_PROGRAM")
-    return "\n".join(lines)
+    out.line("")
+    out.line("END_PROGRAM")
 
 
-def convert_function_block(obj: Dict[str, Any]) -> str:
+def emit_function_block(out: STWriter, obj: Dict[str, Any]) -> Iterator[None]:
     """
-    Convert a 'functionBlock' JSON object to IEC 61131-3 FUNCTION_BLOCK ... END_FUNCTION_BLOCK.
+    Write a 'functionBlock' JSON object as IEC 61131-3 FUNCTION_BLOCK ... END_FUNCTION_BLOCK.
+    
+    Yields after every body statement so callers can flush the output.
     """
     fb = obj.get("functionBlock")
     if not fb:
@@ -322,54 +424,55 @@ def convert_function_block(obj: Dict[str, Any]) -> str:
     locals_ = fb.get("locals", [])
     body = fb.get("body", [])
 
-    lines: List[str] = []
-    lines.append(f"FUNCTION_BLOCK {name}")
+    out.line(f"FUNCTION_BLOCK {name}")
 
     # VAR_INPUT
     if inputs:
-        lines.append("VAR_INPUT")
+        out.line("VAR_INPUT")
         for inp in inputs:
             inp_name = inp.get("name", "unknown")
             inp_type = inp.get("datatype", "ANY")
-            lines.append(f"{INDENT}{inp_name} : {inp_type};")
-        lines.append("END_VAR")
+            out.line(f"{INDENT}{inp_name} : {inp_type};")
+        out.line("END_VAR")
 
     # VAR_OUTPUT
     if outputs:
-        lines.append("VAR_OUTPUT")
+        out.line("VAR_OUTPUT")
         for outp in outputs:
             out_name = outp.get("name", "unknown")
             out_type = outp.get("datatype", "ANY")
-            lines.append(f"{INDENT}{out_name} : {out_type};")
-        lines.append("END_VAR")
+            out.line(f"{INDENT}{out_name} : {out_type};")
+        out.line("END_VAR")
 
     # VAR (locals)
     if locals_:
-        lines.append("VAR")
+        out.line("VAR")
         for loc in locals_:
             loc_name = loc.get("name", "unknown")
             loc_type = loc.get("datatype", "ANY")
             init = loc.get("initialValue")
             if init is not None:
-                lines.append(f"{INDENT}{loc_name} : {loc_type} := {value_to_st(init)};")
+                out.line(f"{INDENT}{loc_name} : {loc_type} := {value_to_st(init)};")
             else:
-                lines.append(f"{INDENT}{loc_name} : {loc_type};")
-        lines.append("END_VAR")
+                out.line(f"{INDENT}{loc_name} : {loc_type};")
+        out.line("END_VAR")
 
-    lines.append("")
+    out.line("")
 
     # Body statements
     for s in body:
-        lines += convert_statement(s, 0)
+        emit_statement(out, s)
+        yield
 
-    lines.append("")
-    lines.append("END_FUNCTION_BLOCK")
-    return "\n".join(lines)
+    out.line("")
+    out.line("END_FUNCTION_BLOCK")
 
 
-def convert_function(obj: Dict[str, Any]) -> str:
+def emit_function(out: STWriter, obj: Dict[str, Any]) -> Iterator[None]:
     """
-    Convert a 'function' JSON object to IEC 61131-3 FUNCTION ... END_FUNCTION block.
+    Write a 'function' JSON object as an IEC 61131-3 FUNCTION ... END_FUNCTION block.
+    
+    Yields after every body statement so callers can flush the output.
     
     Note: 'return' statements in body are converted to:
         FunctionName := expression;
@@ -385,96 +488,145 @@ def convert_function(obj: Dict[str, Any]) -> str:
     locals_ = fn.get("locals", [])
     body = fn.get("body", [])
 
-    lines: List[str] = []
-    lines.append(f"FUNCTION {name} : {return_type}")
+    out.line(f"FUNCTION {name} : {return_type}")
 
     # VAR_INPUT
     if inputs:
-        lines.append("VAR_INPUT")
+        out.line("VAR_INPUT")
         for inp in inputs:
             inp_name = inp.get("name", "unknown")
             inp_type = inp.get("datatype", "ANY")
-            lines.append(f"{INDENT}{inp_name} : {inp_type};")
-        lines.append("END_VAR")
+            out.line(f"{INDENT}{inp_name} : {inp_type};")
+        out.line("END_VAR")
 
     # VAR (locals)
     if locals_:
-        lines.append("VAR")
+        out.line("VAR")
         for loc in locals_:
             loc_name = loc.get("name", "unknown")
             loc_type = loc.get("datatype", "ANY")
             init = loc.get("initialValue")
             if init is not None:
-                lines.append(f"{INDENT}{loc_name} : {loc_type} := {value_to_st(init)};")
+                out.line(f"{INDENT}{loc_name} : {loc_type} := {value_to_st(init)};")
             else:
-                lines.append(f"{INDENT}{loc_name} : {loc_type};")
-        lines.append("END_VAR")
+                out.line(f"{INDENT}{loc_name} : {loc_type};")
+        out.line("END_VAR")
 
-    lines.append("")  # Blank line before body
+    out.line("")  # Blank line before body
 
     # Body statements (with special handling for "return")
     for s in body:
         if s.get("type") == "return":
             expr = s.get("expression", "0")
             # Assign to function name and emit RETURN
-            lines.append(f"{name} := {expr};")
-            lines.append("RETURN;")
+            out.line(f"{name} := {expr};")
+            out.line("RETURN;")
         else:
-            lines += convert_statement(s, 0)
+            emit_statement(out, s)
+        yield
 
-    lines.append("")
-    lines.append("END_FUNCTION")
-    return "\n".join(lines)
+    out.line("")
+    out.line("END_FUNCTION")
 
 
-def convert_top(obj: Any) -> str:
+def _emit_all(emitter: Callable[..., Iterator[None]], obj: Dict[str, Any]) -> str:
+    out = STWriter()
+    for _ in emitter(out, obj):
+        pass
+    return out.getvalue()
+
+
+def convert_program(obj: Dict[str, Any]) -> str:
     """
-    Convert top-level JSON object(s) to ST code.
-    
-    Args:
-        obj: Can be:
-            - dict with 'program'
-            - dict with 'functionBlock'
-            - dict with 'function'
-            - list of such dicts
+    Convert a 'program' JSON object to IEC 61131-3 PROGRAM ... END_PROGRAM block.
+    """
+    return _emit_all(emit_program, obj)
+
+
+def convert_function_block(obj: Dict[str, Any]) -> str:
+    """
+    Convert a 'functionBlock' JSON object to IEC 61131-3 FUNCTION_BLOCK ... END_FUNCTION_BLOCK.
+    """
+    return _emit_all(emit_function_block, obj)
+
+
+def convert_function(obj: Dict[str, Any]) -> str:
+    """
+    Convert a 'function' JSON object to IEC 61131-3 FUNCTION ... END_FUNCTION block.
+    """
+    return _emit_all(emit_function, obj)
+
+
+def emit_top(out: STWriter, obj: Any) -> Iterator[None]:
+    """
+    Write top-level JSON object(s) as ST code into a sink-mode writer.
     
-    Returns:
-        Generated ST code as string
+    Units (and list elements) are separated by a blank line. Yields after every
+    body statement so callers can flush the output.
     
     Raises:
-        GeneratorError: If input format is invalid
+        GeneratorError: If input format is invalid (possibly after earlier
+            units were already written)
     """
-    outputs = []
-    
     if isinstance(obj, list):
-        for element in obj:
-            outputs.append(convert_top(element))
-        return "\n\n".join(outputs)
+        for i, element in enumerate(obj):
+            if i:
+                out.separator("\n\n")
+            yield from emit_top(out, element)
+        return
 
     if isinstance(obj, dict):
+        units = []
         if "program" in obj:
-            outputs.append(convert_program(obj))
+            units.append((emit_program, obj))
         if "functionBlock" in obj:
-            outputs.append(convert_function_block(obj))
+            units.append((emit_function_block, obj))
         if "function" in obj:
-            outputs.append(convert_function(obj))
+            units.append((emit_function, obj))
         
         # Handle unwrapped objects (user may pass without wrapper key)
         if "name" in obj and "declarations" in obj and "statements" in obj:
-            outputs.append(convert_program({"program": obj}))
+            units.append((emit_program, {"program": obj}))
         if "name" in obj and "returnType" in obj and "body" in obj:
-            outputs.append(convert_function({"function": obj}))
+            units.append((emit_function, {"function": obj}))
         
-        if not outputs:
+        if not units:
             raise GeneratorError(
                 f"Input dict doesn't look like a program/functionBlock/function. "
                 f"Keys: {', '.join(obj.keys())}"
             )
-        return "\n\n".join(outputs)
+        for i, (emitter, unit) in enumerate(units):
+            if i:
+                out.separator("\n\n")
+            yield from emitter(out, unit)
+        return
 
     raise GeneratorError(f"Unsupported top-level JSON type: {type(obj)}")
 
 
+def convert_top(obj: Any) -> str:
+    """
+    Convert top-level JSON object(s) to ST code.
+    
+    Args:
+        obj: Can be:
+            - dict with 'program'
+            - dict with 'functionBlock'
+            - dict with 'function'
+            - list of such dicts
+    
+    Returns:
+        Generated ST code as string
+    
+    Raises:
+        GeneratorError: If input format is invalid
+    """
+    parts: List[str] = []
+    for _ in emit_top(STWriter(parts.append), obj):
+        pass
+    return "".join(parts)
+
+
 def generator(data: Any) -> str:
     """
     Main entry point for code generation.
@@ -496,3 +648,68 @@ def generator(data: Any) -> str:
     except Exception as e:
         logger.error(f"Error converting JSON to ST: {e}", exc_info=True)
         raise GeneratorError(f"Failed to generate code: {e}")
+
+
+def iter_st(data: Any, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Generate code incrementally, for very large programs.
+    
+    Output is produced statement by statement and yielded in chunks of roughly
+    `chunk_size` characters, so memory is bounded by one top-level statement
+    instead of the whole program. `"".join(iter_st(data)) == generator(data)`.
+    
+    Args:
+        data: JSON data representing the intermediate code
+        chunk_size: Minimum characters per yielded chunk (the last may be shorter)
+    
+    Yields:
+        Chunks of IEC 61131-3 Structured Text code
+    
+    Raises:
+        GeneratorError: If generation fails (chunks may already have been yielded)
+    """
+    parts: List[str] = []
+    size = 0
+    
+    def write(text: str):
+        nonlocal size
+        parts.append(text)
+        size += len(text)
+    
+    try:
+        for _ in emit_top(STWriter(write), data):
+            if size >= chunk_size:
+                chunk = "".join(parts)
+                parts.clear()
+                size = 0
+                yield chunk
+    except GeneratorError:
+        raise
+    except Exception as e:
+        logger.error(f"Error converting JSON to ST: {e}", exc_info=True)
+        raise GeneratorError(f"Failed to generate code: {e}")
+    
+    if parts:
+        yield "".join(parts)
+
+
+def write_st(data: Any, fp: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+    """
+    Generate code into a text file-like object.
+    
+    Args:
+        data: JSON data representing the intermediate code
+        fp: Object with a write(str) method
+        chunk_size: Characters per write (see iter_st)
+    
+    Returns:
+        Number of characters written
+    
+    Raises:
+        GeneratorError: If generation fails (partial output may have been written)
+    """
+    written = 0
+    for chunk in iter_st(data, chunk_size):
+        fp.write(chunk)
+        written += len(chunk)
+    return written
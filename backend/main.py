@@ -11,7 +11,7 @@ import os
 import json
 import re
 from contextlib import asynccontextmanager
-from typing import List, Optional
+from typing import Any, List, Optional
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -20,27 +20,41 @@ from dotenv import load_dotenv
 root_env = Path(__file__).parent.parent / ".env"
 load_dotenv(root_env)
 
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, Query, UploadFile, File, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
 # Import core modules
-from core import settings, init_database, close_database, get_collection, db_manager
+from core import settings, init_database, close_database, get_collection, db_manager, device_registry, ai_stack
 from models import (
     NarrativeRequest, 
+    BatchNarrativeRequest,
     Variable, 
     SaveVariablesRequest, 
     GenerateResponse,
     HealthResponse,
+    ReadinessResponse,
+    CacheStatsResponse,
 )
 from services import (
-    generate_code as generate_code_service,
+    agenerate_code as generate_code_service,
+    agenerate_batch,
+    agenerate_stream,
+    stream_code,
+    to_sse,
+    code_generation_service,
     CodeGenerationError,
     variables_service,
     VariablesServiceError,
+    etag_matches,
+    MAX_PAGE_SIZE,
+    MAX_SUGGESTIONS,
+    UploadParseError,
+    detect_format,
+    iter_rows,
 )
 
 # Configure logging
@@ -57,8 +71,14 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting IEC 61131-3 Code Generator API")
     init_database()
+    variables_service.ensure_indexes()
+    device_registry.start_watching()
+    # The LLM / embedding stack loads in the background; other endpoints serve meanwhile
+    if settings.ai_warmup:
+        ai_stack.start_warming()
     yield
     # Shutdown
+    device_registry.stop_watching()
     close_database()
     logger.info("Shutdown complete")
 
@@ -78,6 +98,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -106,12 +127,33 @@ def health_check():
     )
 
 
+@app.get("/ready", response_model=ReadinessResponse)
+def readiness_check(response: Response):
+    """
+    Readiness of the AI stack (LLM, embeddings, RAG index).
+    
+    Returns 200 once code generation can be served without waiting and 503
+    while the stack is cold, warming up or failed to initialize. Variables
+    and health endpoints do not depend on it.
+    """
+    ai = ai_stack.status()
+    if not ai_stack.is_ready:
+        response.status_code = 503
+    return ReadinessResponse(
+        status="ok" if ai_stack.is_ready else "unavailable",
+        ai_state=ai["state"],
+        ai_error=ai["error"],
+        warmup_seconds=ai["warmup_seconds"],
+        database_connected=db_manager.is_connected,
+    )
+
+
 # ============================================================================
 # Code Generation Endpoints
 # ============================================================================
 
 @app.post("/generate-code", response_model=GenerateResponse)
-def generate_code(body: NarrativeRequest):
+async def generate_code(body: NarrativeRequest):
     """
     Generate IEC 61131-3 Structured Text code from natural language.
     
@@ -122,7 +164,7 @@ def generate_code(body: NarrativeRequest):
     4. Generator converts valid JSON to Structured Text
     """
     try:
-        code = generate_code_service(body.narrative)
+        code = await generate_code_service(body.narrative)
         logger.info("Code generation successful")
         return GenerateResponse(status="ok", code=code)
         
@@ -136,16 +178,108 @@ def generate_code(body: NarrativeRequest):
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+@app.post("/generate-code/stream")
+async def generate_code_stream(body: NarrativeRequest):
+    """
+    Streaming variant of /generate-code using Server-Sent Events.
+    
+    Emits pipeline stage events as they happen: retrieval, token (LLM output),
+    validation, regeneration, and finally result or error.
+    """
+    async def events():
+        async for event in agenerate_stream(body.narrative):
+            yield to_sse(event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so each stage reaches the browser immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/generate-code/batch")
+async def generate_code_batch(body: BatchNarrativeRequest):
+    """
+    Generate code for many narratives concurrently.
+    
+    Streams one JSON object per line (NDJSON) as each narrative finishes:
+    {"index", "status": "ok", "code"} or {"index", "status": "error", "message", "validation_error"}.
+    """
+    async def results():
+        async for result in agenerate_batch(body.narratives, body.concurrency):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/generate-code/from-ir")
+def generate_code_from_ir(body: Any = Body(...)):
+    """
+    Convert intermediate JSON (as produced by the AI step) straight to Structured Text.
+    
+    No LLM call or device validation is made. The code is streamed as plain
+    text while it is generated, so large IR dumps never need the whole program
+    in memory; a failure after streaming started ends the text with an ST comment.
+    """
+    try:
+        chunks = stream_code(body)
+    except CodeGenerationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
+
+@app.get("/generate-code/cache-stats", response_model=CacheStatsResponse)
+def generate_code_cache_stats():
+    """Hit/miss metrics of the generation cache and request coalescing counters."""
+    return CacheStatsResponse(**code_generation_service.stats())
+
+
 # ============================================================================
 # Variables Management Endpoints
 # ============================================================================
 
 @app.get("/get-variables")
-def get_variables():
-    """Get all variables from the database."""
+def get_variables(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    prefix: Optional[str] = None,
+    dataType: Optional[str] = None,
+):
+    """
+    Get variables from the database.
+    
+    Without `limit` all matching variables are returned. With `limit` the
+    result is paged by name; pass `next_cursor` back as `cursor` (or use
+    `offset`). `fields` is a comma-separated projection, `prefix` and
+    `dataType` filter server-side. Responses carry an ETag; send it as
+    If-None-Match to get 304 Not Modified while the table is unchanged.
+    """
+    etag = variables_service.etag(str(request.query_params))
+    if etag and etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     try:
-        variables = variables_service.get_all()
-        return {"status": "ok", "variables": variables}
+        result = variables_service.query(
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            prefix=prefix,
+            data_type=dataType,
+        )
+        if etag:
+            response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return {"status": "ok", **result}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -155,6 +289,26 @@ def get_variables():
         raise HTTPException(status_code=500, detail="Failed to retrieve variables")
 
 
+@app.get("/variables/suggest")
+def suggest_variables(q: str = Query(..., min_length=1, max_length=100),
+                      limit: int = Query(5, ge=1, le=MAX_SUGGESTIONS)):
+    """
+    Suggest device names for a misspelled or differently written name.
+    
+    Case, spaces, underscores and hyphens are ignored and a few typos are
+    allowed; only the nearest names are returned (empty if none is close).
+    """
+    try:
+        return {"status": "ok", "query": q, "suggestions": variables_service.suggest(q, limit=limit)}
+        
+    except VariablesServiceError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Error suggesting variables: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to suggest variables")
+
+
 @app.post("/save-variables")
 def save_variables(body: SaveVariablesRequest):
     """
@@ -174,39 +328,27 @@ def save_variables(body: SaveVariablesRequest):
 
 
 @app.post("/upload-variables-json")
-async def upload_variables_json(file: UploadFile = File(...)):
-    """Upload variables from a JSON file."""
-    # Validate file type
-    if not file.filename.endswith('.json'):
-        raise HTTPException(status_code=400, detail="Only JSON files are allowed")
-    
-    # Read and check size
-    contents = await file.read()
-    if len(contents) > settings.max_upload_size:
-        max_mb = settings.max_upload_size // 1024 // 1024
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {max_mb}MB")
-    
-    # Parse JSON
-    try:
-        variables_list = json.loads(contents.decode("utf-8"))
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file format")
-    
-    # Validate format
-    if not isinstance(variables_list, list):
-        raise HTTPException(status_code=400, detail="JSON must be an array of variables")
+def upload_variables_json(file: UploadFile = File(...)):
+    """
+    Upload variables from a JSON array, NDJSON or CSV file.
     
-    for i, var in enumerate(variables_list):
-        if not isinstance(var, dict):
-            raise HTTPException(status_code=400, detail=f"Item {i} is not a valid object")
-        if 'deviceName' not in var or 'dataType' not in var:
-            raise HTTPException(status_code=400, detail=f"Item {i} missing required fields")
+    The file is parsed, validated and written in batches as it is read;
+    invalid rows are reported in `errors` instead of rejecting the whole file.
+    """
+    # Validate file type
+    fmt = detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Only JSON, NDJSON and CSV files are allowed")
     
-    # Upload
+    # Parse and upload
     try:
-        result = variables_service.upload_from_list(variables_list)
+        rows = iter_rows(file.file, fmt, max_size=settings.max_upload_size)
+        result = variables_service.upload_stream(rows)
         return result
         
+    except UploadParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+        
     except VariablesServiceError as e:
         raise HTTPException(status_code=503, detail=str(e))
         
@@ -216,10 +358,13 @@ async def upload_variables_json(file: UploadFile = File(...)):
 
 
 @app.delete("/remove-duplicates")
-def remove_duplicates():
-    """Remove duplicate variables (case-insensitive by deviceName)."""
+def remove_duplicates(dry_run: bool = False):
+    """
+    Remove duplicate variables (case-insensitive by deviceName).
+    With ?dry_run=true only reports what would be removed.
+    """
     try:
-        result = variables_service.remove_duplicates()
+        result = variables_service.remove_duplicates(dry_run=dry_run)
         return result
         
     except VariablesServiceError as e:
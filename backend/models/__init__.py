@@ -4,10 +4,16 @@ Models module exports
 
 from .schemas import (
     NarrativeRequest,
+    BatchNarrativeRequest,
     Variable,
     SaveVariablesRequest,
     GenerateResponse,
     StatusResponse,
+    SyncResultResponse,
+    UploadResultResponse,
+    DuplicatesResponse,
     HealthResponse,
+    ReadinessResponse,
+    CacheStatsResponse,
     VALID_DATA_TYPES,
 )
@@ -27,6 +27,21 @@ class NarrativeRequest(BaseModel):
         return v.strip()
 
 
+class BatchNarrativeRequest(BaseModel):
+    """Request model for batch code generation."""
+    narratives: List[str] = Field(..., min_length=1, max_length=200)
+    concurrency: Optional[int] = Field(None, ge=1, le=16)
+    
+    @validator('narratives', each_item=True)
+    def validate_narrative(cls, v):
+        v = v.strip()
+        if not v:
+            raise ValueError('Narrative cannot be empty')
+        if len(v) > 5000:
+            raise ValueError('Narrative must be at most 5000 characters')
+        return v
+
+
 class Variable(BaseModel):
     """Model for a device variable."""
     deviceName: str = Field(..., min_length=1, max_length=100)
@@ -68,8 +83,53 @@ class StatusResponse(BaseModel):
     message: str
 
 
+class SyncResultResponse(StatusResponse):
+    """Status response of a variables save/upload with write counts."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+class UploadResultResponse(SyncResultResponse):
+    """Result of a streamed upload; `errors` lists rejected rows ({row, message})."""
+    rejected: int = 0
+    errors: List[dict] = []
+
+
+class CacheStatsResponse(BaseModel):
+    """Generation cache metrics; `coalesced` counts requests that joined an identical one in flight."""
+    enabled: bool
+    semantic_enabled: bool
+    size: int
+    max_entries: int
+    hits: int
+    semantic_hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+    coalesced: int = 0
+    in_flight: int = 0
+
+
+class DuplicatesResponse(StatusResponse):
+    """Result of duplicate removal; `duplicates` lists groups for a dry run."""
+    removed: int = 0
+    dry_run: bool = False
+    duplicates: List[dict] = []
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     message: str
     database_connected: bool
+
+
+class ReadinessResponse(BaseModel):
+    """AI stack readiness (cold, warming, ready or failed)."""
+    status: str
+    ai_state: str
+    ai_error: Optional[str] = None
+    warmup_seconds: Optional[float] = None
+    database_connected: bool
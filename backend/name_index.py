@@ -0,0 +1,325 @@
+"""
+Device Name Index
+
+In-memory nearest-name lookup over device names, for "did you mean"
+suggestions and local repair of misspelled variables.
+
+Names are compared on a normalized key (lower case, spaces / underscores /
+hyphens removed), so `Bedroom_fan`, `bedroom fan` and `BedRoom_Fan` are the
+same key and found with a single dict lookup. Misspelled keys are found with
+a trigram index: a key within edit distance d of the query shares at least
+(query trigrams - 3d) trigrams with it, so only keys passing that count (and
+a length window) are compared with the query. Distances are searched from 1
+upwards and the search stops at the first distance with a match, which keeps
+typo lookups well under a millisecond for tens of thousands of devices.
+
+Posting lists are Python ints used as bitsets over key slots, so counting
+shared trigrams for every key at once is a handful of big-integer operations
+instead of a loop over the keys. The index is updated incrementally with
+`sync()`; removed keys free their slot for the next added key. `index_for()`
+never changes an index it has handed out: a new device table gets a synced
+copy, so every lookup only returns names of the caller's own table.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+RE_SEPARATORS = re.compile(r"[\s_\-]+")
+
+
+def name_key(name: str) -> str:
+    """Case-, space- and underscore-insensitive form of a name."""
+    return RE_SEPARATORS.sub("", name).lower()
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance_for(key: str) -> int:
+    """Largest edit distance still treated as a typo of a key this long."""
+    return 1 if len(key) <= 5 else 2 if len(key) <= 12 else 3
+
+
+class _Pattern:
+    """Bit-parallel Levenshtein distance (Myers / Hyyrö) from one fixed string."""
+
+    def __init__(self, pattern: str):
+        self.length = len(pattern)
+        self.peq: Dict[str, int] = {}
+        for i, char in enumerate(pattern):
+            self.peq[char] = self.peq.get(char, 0) | (1 << i)
+        self.mask = (1 << self.length) - 1
+        self.last = 1 << (self.length - 1) if self.length else 0
+
+    def distance(self, text: str) -> int:
+        if not self.length:
+            return len(text)
+        peq, mask, last = self.peq, self.mask, self.last
+        pv, mv, score = mask, 0, self.length
+        for char in text:
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & mask)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = mh | (~(xv | ph) & mask)
+            mv = ph & xv
+        return score
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    return _Pattern(a).distance(b)
+
+
+def _at_least(bitsets: List[int], count: int) -> int:
+    """Bitset of the slots set in at least `count` of `bitsets`."""
+    if count <= 0:
+        return -1
+    # Bit-sliced counter: bit j of every slot's count lives in counters[j]
+    counters: List[int] = []
+    for bits in bitsets:
+        carry = bits
+        for j, counter in enumerate(counters):
+            counters[j] = counter ^ carry
+            carry &= counter
+            if not carry:
+                break
+        else:
+            if carry:
+                counters.append(carry)
+    if count >= 1 << len(counters):
+        return 0
+
+    # Compare every slot's count with `count`, most significant bit first
+    greater, equal = 0, -1
+    for j in reversed(range(len(counters))):
+        if count >> j & 1:
+            equal &= counters[j]
+        else:
+            greater |= equal & counters[j]
+            equal &= ~counters[j]
+    return greater | equal
+
+
+class NameIndex:
+    """Trigram index from normalized keys to the device names that share them."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self._names: Set[str] = set()
+        self._by_key: Dict[str, Set[str]] = {}
+        self._slots: List[Optional[str]] = []          # slot -> key
+        self._slot_of: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._postings: Dict[str, int] = {}            # trigram -> bitset of slots
+        self._lengths: Dict[int, int] = {}             # key length -> bitset of slots
+        self.sync(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def copy(self) -> "NameIndex":
+        """Independent index with the same names (cheaper than re-indexing them)."""
+        clone = NameIndex()
+        with self._lock:
+            clone._names = set(self._names)
+            clone._by_key = {key: set(names) for key, names in self._by_key.items()}
+            clone._slots = list(self._slots)
+            clone._slot_of = dict(self._slot_of)
+            clone._free = list(self._free)
+            clone._postings = dict(self._postings)
+            clone._lengths = dict(self._lengths)
+        return clone
+
+    def add(self, name: str):
+        with self._lock:
+            self._add(name)
+
+    def remove(self, name: str):
+        with self._lock:
+            self._remove(name)
+
+    def sync(self, names: Iterable[str]) -> Tuple[int, int]:
+        """
+        Make the index hold exactly `names`, touching only what changed.
+
+        Returns:
+            (names added, names removed)
+        """
+        wanted = set(names)
+        with self._lock:
+            added = wanted - self._names
+            removed = self._names - wanted
+            for name in removed:
+                self._remove(name)
+            for name in added:
+                self._add(name)
+        return len(added), len(removed)
+
+    def _add(self, name: str):
+        if name in self._names:
+            return
+        self._names.add(name)
+        key = name_key(name)
+        if key in self._by_key:
+            self._by_key[key].add(name)
+            return
+
+        self._by_key[key] = {name}
+        if self._free:
+            slot = self._free.pop()
+            self._slots[slot] = key
+        else:
+            slot = len(self._slots)
+            self._slots.append(key)
+        self._slot_of[key] = slot
+        bit = 1 << slot
+        for gram in trigrams(key):
+            self._postings[gram] = self._postings.get(gram, 0) | bit
+        self._lengths[len(key)] = self._lengths.get(len(key), 0) | bit
+
+    def _remove(self, name: str):
+        if name not in self._names:
+            return
+        self._names.discard(name)
+        key = name_key(name)
+        owners = self._by_key.get(key)
+        if owners is None:
+            return
+        owners.discard(name)
+        if owners:
+            return
+
+        del self._by_key[key]
+        slot = self._slot_of.pop(key)
+        self._slots[slot] = None
+        self._free.append(slot)
+        bit = 1 << slot
+        for gram in trigrams(key):
+            bits = self._postings.get(gram, 0) & ~bit
+            if bits:
+                self._postings[gram] = bits
+            else:
+                self._postings.pop(gram, None)
+        bits = self._lengths.get(len(key), 0) & ~bit
+        if bits:
+            self._lengths[len(key)] = bits
+        else:
+            self._lengths.pop(len(key), None)
+
+    def lookup(self, query: str, limit: int = 5, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Device names nearest to `query`.
+
+        Args:
+            query: Name as written (any case / separators)
+            limit: Max names returned
+            max_distance: Max edit distance between keys (default depends on length)
+
+        Returns:
+            [(device name, edit distance)] for the names at the smallest
+            distance found (all with the same distance), or [] if none is
+            within `max_distance`
+        """
+        key = name_key(query)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = max_distance_for(key)
+
+        with self._lock:
+            exact = self._by_key.get(key)
+            if exact:
+                return [(name, 0) for name in sorted(exact)][:limit]
+
+            grams = trigrams(key)
+            postings = [self._postings[g] for g in grams if g in self._postings]
+            pattern = _Pattern(key)
+            checked = 0
+            # Keys compared at a smaller distance but found farther away, by their distance
+            farther: Dict[int, List[str]] = {}
+            for distance in range(1, max_distance + 1):
+                lengths = 0
+                for length in range(len(key) - distance, len(key) + distance + 1):
+                    lengths |= self._lengths.get(length, 0)
+                # Keys already compared are not compared again
+                candidates = _at_least(postings, len(grams) - 3 * distance) & lengths & ~checked
+                checked |= candidates
+
+                matches = farther.pop(distance, [])
+                while candidates:
+                    low = candidates & -candidates
+                    candidates ^= low
+                    candidate = self._slots[low.bit_length() - 1]
+                    found = pattern.distance(candidate)
+                    if found <= distance:
+                        matches.append(candidate)
+                    elif found <= max_distance:
+                        farther.setdefault(found, []).append(candidate)
+                if matches:
+                    names = sorted(name for candidate in matches for name in self._by_key[candidate])
+                    return [(name, distance) for name in names[:limit]]
+        return []
+
+    def best(self, query: str) -> Optional[str]:
+        """
+        The one device `query` most likely means, or None if there is no
+        match or several names are equally near (ambiguous).
+        """
+        matches = self.lookup(query, limit=2)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            # Several devices differ only in case: prefer the exact spelling
+            exact = [name for name, _ in matches if name == query]
+            return exact[0] if exact else None
+        return matches[0][0]
+
+
+# ---------------- Shared index ----------------
+
+_shared_lock = threading.Lock()
+# (device table, index over its names); the index is never modified once published
+_shared: Optional[Tuple[Dict[str, str], NameIndex]] = None
+
+
+def index_for(device_vars: Dict[str, str]) -> NameIndex:
+    """
+    Index over the names of a device table (treat as read-only).
+
+    The index of the latest table is shared process-wide. When a different
+    table is passed (e.g. the registry reloaded after a variables change), the
+    shared index is copied and the copy synced to it, so only added or removed
+    names are re-indexed and callers still using the previous index keep
+    seeing exactly the names of their table.
+    """
+    global _shared
+    shared = _shared
+    if shared is not None and shared[0] is device_vars:
+        return shared[1]
+    with _shared_lock:
+        shared = _shared
+        if shared is not None and shared[0] is device_vars:
+            return shared[1]
+        index = shared[1].copy() if shared is not None else NameIndex()
+        index.sync(device_vars)
+        _shared = (device_vars, index)
+        return index
+
+
+def suggest(name: str, device_vars: Dict[str, str], limit: int = 3) -> List[str]:
+    """Device names nearest to `name` (for "did you mean" messages)."""
+    return [n for n, _ in index_for(device_vars).lookup(name, limit=limit) if n != name]
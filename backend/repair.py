@@ -0,0 +1,298 @@
+"""
+IEC 61131-3 IR Repair
+
+Deterministic, rule-based fixes for intermediate JSON that failed validation.
+Runs before the IR is sent back to the LLM, so mechanical mistakes cost a few
+milliseconds instead of a regeneration round trip:
+
+- declared names that match a device only up to case, spacing or a small typo
+  are renamed to the device name everywhere in the program
+- declared datatypes are set to the device registry's datatype
+- references to undeclared names are resolved against the declarations and
+  the device table (adding the declaration when needed)
+- C-style operators and lower-case keywords/literals (==, !=, &&, ||, !,
+  true, and, ...) are rewritten in IEC form
+"""
+
+import copy
+import logging
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from validator import normalize_expr, tokenize, ExprSyntaxError, BUILTIN_FB_TYPES, RE_BOOL
+from name_index import NameIndex, index_for
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Words separated by spaces only (no operators), e.g. "living room light"
+RE_SPACED_NAME = re.compile(r"[A-Za-z_]\w*(?: +\w+)+")
+
+# Keywords that make a run of spaced words an expression ("a AND b"), not a name
+KEYWORD_OPS = {"AND", "OR", "NOT", "XOR", "MOD"}
+
+# Tokens of an expression as written, before normalize_expr (string literals
+# are kept whole so nothing inside the quotes is ever rewritten)
+RE_SOURCE_TOKEN = re.compile(r"""
+    (?P<str>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+  | (?P<typed>[A-Za-z_]\w*\#[A-Za-z0-9_:.+\-]+|\d+\#[0-9A-Fa-f_]+)
+  | (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<cop>==|!=|&&|\|\||&|\||(?<![<>=:])!(?!=))
+  | (?P<space>\s+)
+  | (?P<op>.)
+""", re.VERBOSE)
+
+# C-style operators and their IEC spelling (as normalize_expr reads them)
+C_OPERATORS = {"==": "=", "!=": "<>", "&&": "AND", "&": "AND", "||": "OR", "|": "OR", "!": "NOT"}
+
+# Statement keys holding nested statement lists
+BODY_KEYS = ("then", "else", "body")
+
+
+# ---------------- Expression rewriting ----------------
+
+def rewrite_expr(expr: Any, resolve: Callable[[str], Optional[str]]) -> Any:
+    """
+    Canonicalize an expression and rename the variables in it.
+
+    Operators are written as the validator reads them (== to =, && to AND,
+    ...), keywords and BOOL literals are upper-cased and every variable
+    reference (not member fields, not function names) is passed through
+    `resolve`, which returns a replacement name or None to keep it.
+    Edits are made in place on the original text, so string literals and
+    spacing are left exactly as written.
+    Expressions that do not parse are returned unchanged.
+    """
+    if not isinstance(expr, str):
+        return expr
+    words = expr.split()
+    if RE_SPACED_NAME.fullmatch(expr.strip()) and not any(w.upper() in KEYWORD_OPS for w in words):
+        # "living room light": a device name written with spaces, not three variables
+        new = resolve(" ".join(words))
+        if new:
+            return new
+    try:
+        tokenize(normalize_expr(expr))
+    except (ValueError, ExprSyntaxError):
+        return expr
+
+    tokens = [m for m in RE_SOURCE_TOKEN.finditer(expr) if m.lastgroup != "space"]
+    parts: List[str] = []
+    pos = 0
+    for i, m in enumerate(tokens):
+        kind, raw = m.lastgroup, m.group()
+        new = raw
+        if kind == "cop":
+            new = C_OPERATORS[raw]
+            if new.isalpha():
+                # "a&&b" -> "a AND b", "!x" -> "NOT x"
+                if m.start() > 0 and not expr[m.start() - 1].isspace() and expr[m.start() - 1] != "(":
+                    new = " " + new
+                if m.end() < len(expr) and not expr[m.end()].isspace() and expr[m.end()] != ")":
+                    new = new + " "
+        elif kind == "ident":
+            upper = raw.upper()
+            after_dot = i > 0 and tokens[i - 1].group() == "."
+            is_call = i + 1 < len(tokens) and tokens[i + 1].group() == "("
+            if upper in KEYWORD_OPS or RE_BOOL.fullmatch(raw):
+                new = upper
+            elif not (after_dot or is_call):
+                new = resolve(raw) or raw
+        if new != raw:
+            parts.append(expr[pos:m.start()])
+            parts.append(new)
+            pos = m.end()
+    parts.append(expr[pos:])
+    return "".join(parts)
+
+
+# ---------------- Statement walking ----------------
+
+def iter_statements(stmts: Any) -> Iterator[Dict[str, Any]]:
+    """Every statement in a body, nested ones included (depth first)."""
+    if not isinstance(stmts, list):
+        return
+    for stmt in stmts:
+        if not isinstance(stmt, dict):
+            continue
+        yield stmt
+        for key in BODY_KEYS:
+            yield from iter_statements(stmt.get(key))
+        for case in stmt.get("cases", []) or []:
+            if isinstance(case, dict):
+                yield from iter_statements(case.get("statements"))
+
+
+def rewrite_statement(stmt: Dict[str, Any], resolve: Callable[[str], Optional[str]]) -> None:
+    """Rewrite the expressions and variable references of one statement in place."""
+    for key in ("target", "expression", "condition", "until", "selector", "from", "to", "by"):
+        if key in stmt:
+            stmt[key] = rewrite_expr(stmt[key], resolve)
+
+    if isinstance(stmt.get("arguments"), list):
+        stmt["arguments"] = [rewrite_expr(a, resolve) for a in stmt["arguments"]]
+
+    if stmt.get("type") == "fbCall":
+        stmt["name"] = rewrite_expr(stmt.get("name"), resolve)
+        for pins in ("inputs", "outputs"):
+            if isinstance(stmt.get(pins), dict):
+                stmt[pins] = {k: rewrite_expr(v, resolve) for k, v in stmt[pins].items()}
+
+
+# ---------------- Block repair ----------------
+
+class _ProgramRepair:
+    """Repairs one program block in place, recording a message per fix."""
+
+    def __init__(self, prog: Dict[str, Any], device_vars: Dict[str, str], devices: NameIndex,
+                 exempt: Set[str], fixes: List[str]):
+        self.prog = prog
+        self.device_vars = device_vars
+        self.devices = devices
+        self.exempt = exempt
+        self.fixes = fixes
+        self.renames: Dict[str, str] = {}
+        self.declared: Dict[str, Dict[str, Any]] = {}
+
+    def fix(self, message: str):
+        if message not in self.fixes:
+            self.fixes.append(message)
+
+    def repair(self):
+        self.repair_declarations()
+        # FOR iterators are implicitly declared (as INT) by the validator
+        self.exempt |= {s["iterator"] for s in iter_statements(self.prog.get("statements"))
+                        if s.get("type") == "for" and isinstance(s.get("iterator"), str)}
+        for stmt in iter_statements(self.prog.get("statements")):
+            rewrite_statement(stmt, self.resolve)
+
+    def repair_declarations(self):
+        declarations = self.prog.get("declarations")
+        if not isinstance(declarations, list):
+            return
+
+        kept = []
+        for decl in declarations:
+            name = decl.get("name") if isinstance(decl, dict) else None
+            if not isinstance(name, str):
+                kept.append(decl)
+                continue
+
+            if name not in self.device_vars:
+                device = self.devices.best(name)
+                if device:
+                    self.renames[name] = device
+                    self.fix(f"Renamed '{name}' to device '{device}'")
+                    name = decl["name"] = device
+            if name in self.declared:
+                # Two spellings of the same device: keep the first declaration
+                self.fix(f"Removed duplicate declaration of '{name}'")
+                continue
+
+            device_type = self.device_vars.get(name)
+            if device_type and decl.get("datatype") != device_type:
+                self.fix(f"Set datatype of '{name}' to {device_type} (was {decl.get('datatype')})")
+                decl["datatype"] = device_type
+            self.declared[name] = decl
+            kept.append(decl)
+        self.prog["declarations"] = kept
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Replacement for a variable reference, or None to keep it."""
+        if name in self.declared or name in self.exempt:
+            return None
+        if name in self.renames:
+            return self.renames[name]
+
+        for declared in self.declared:
+            if declared.lower() == name.lower():
+                self.renames[name] = declared
+                self.fix(f"Renamed '{name}' to declared '{declared}'")
+                return declared
+
+        device = self.devices.best(name)
+        if device is None:
+            return None
+        if device not in self.declared:
+            decl = {"type": "VAR", "name": device, "datatype": self.device_vars[device]}
+            self.prog.setdefault("declarations", []).append(decl)
+            self.declared[device] = decl
+            self.fix(f"Declared device '{device}' used as '{name}'")
+        elif device != name:
+            self.fix(f"Renamed '{name}' to device '{device}'")
+        self.renames[name] = device
+        return device
+
+
+def _repair_pou(pou: Dict[str, Any], scope_keys: Tuple[str, ...], exempt: Set[str], fixes: List[str]):
+    """Functions / FBs: canonicalize expressions and fix case-only misspellings of local names."""
+    local = {item["name"] for key in scope_keys for item in pou.get(key, []) or []
+             if isinstance(item, dict) and isinstance(item.get("name"), str)}
+    by_lower = {n.lower(): n for n in local}
+    local |= exempt
+    local |= {s["iterator"] for s in iter_statements(pou.get("body"))
+              if s.get("type") == "for" and isinstance(s.get("iterator"), str)}
+
+    def resolve(name: str) -> Optional[str]:
+        if name in local:
+            return None
+        declared = by_lower.get(name.lower())
+        if declared:
+            message = f"Renamed '{name}' to '{declared}' in '{pou.get('name')}'"
+            if message not in fixes:
+                fixes.append(message)
+        return declared
+
+    for stmt in iter_statements(pou.get("body")):
+        rewrite_statement(stmt, resolve)
+
+
+def repair_ir(intermediate: Any, device_vars: Dict[str, str]) -> Tuple[Any, List[str]]:
+    """
+    Apply every deterministic fix to a copy of the intermediate JSON.
+
+    The result is not validated here; callers re-run the validator and keep
+    the repaired IR only if it is better.
+
+    Args:
+        intermediate: List of program/function/functionBlock blocks
+        device_vars: Device name -> datatype table
+
+    Returns:
+        (repaired copy, list of human-readable fix descriptions); the list is
+        empty if nothing was changed
+    """
+    if not isinstance(intermediate, list) or not device_vars:
+        return intermediate, []
+
+    repaired = copy.deepcopy(intermediate)
+    fixes: List[str] = []
+    devices = index_for(device_vars)
+
+    # Names that are never variables: user functions / FB types and built-in FBs
+    exempt = set(BUILTIN_FB_TYPES)
+    for block in repaired:
+        if isinstance(block, dict):
+            for key in ("function", "functionBlock"):
+                pou = block.get(key)
+                if isinstance(pou, dict) and isinstance(pou.get("name"), str):
+                    exempt.add(pou["name"])
+
+    for block in repaired:
+        if not isinstance(block, dict):
+            continue
+        if isinstance(block.get("program"), dict):
+            _ProgramRepair(block["program"], device_vars, devices, set(exempt), fixes).repair()
+        elif isinstance(block.get("functionBlock"), dict):
+            _repair_pou(block["functionBlock"], ("inputs", "outputs", "locals"), exempt, fixes)
+        elif isinstance(block.get("function"), dict):
+            _repair_pou(block["function"], ("inputs",), exempt, fixes)
+
+    # Canonicalized operators / literals are not itemized, but still count as a change
+    if not fixes and repaired != intermediate:
+        fixes.append("Normalized operators and literals to IEC 61131-3 form")
+
+    if fixes:
+        logger.info(f"Local repair applied {len(fixes)} fix(es)")
+    return repaired, fixes
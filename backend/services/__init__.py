@@ -7,10 +7,22 @@ from .code_generation_service import (
     CodeGenerationError,
     code_generation_service,
     generate_code,
+    agenerate_code,
+    agenerate_batch,
+    agenerate_stream,
+    stream_code,
+    to_sse,
 )
 
+from .generation_cache import GenerationCache
+
 from .variables_service import (
     VariablesService,
     VariablesServiceError,
     variables_service,
+    etag_matches,
+    MAX_PAGE_SIZE,
+    MAX_SUGGESTIONS,
 )
+
+from .upload_parser import UploadParseError, RowError, detect_format, iter_rows
@@ -6,21 +6,54 @@ AI generation → Validation → Regeneration (if needed) → Code output
 """
 
 import json
+import random
+import asyncio
 import logging
 import sys
 import os
+import threading
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.errors import PyMongoError
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
-from AI_Integration.main import generate_IEC_JSON, regenerate_IEC_JSON
-from validator import validator as code_validator
-from generator import generator, GeneratorError
+from validator import validate_diagnostics, format_diagnostics, aload_device_variables
+from repair import repair_ir
+from fast_path import match_narrative, FastPathMatch
+from generator import generator, iter_st, GeneratorError
+from fetchvariables import write_variables_to_file, OUTPUT_PATH as VARIABLES_KB_PATH
+from core import device_registry, get_collection, settings, ai_stack
+from .generation_cache import GenerationCache, normalize_narrative
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+# ---------------- AI stack access ----------------
+# The AI module is only loaded by the ai_stack handle (in the background at
+# startup); these wrappers wait for it on first use.
+
+async def astream_generate_IEC_JSON(narrative: str) -> AsyncIterator:
+    ai = await ai_stack.aget()
+    async for item in ai.astream_generate_IEC_JSON(narrative):
+        yield item
+
+
+async def astream_regenerate_IEC_JSON(narrative: str, issues: str, intermediate: str) -> AsyncIterator:
+    ai = await ai_stack.aget()
+    async for item in ai.astream_regenerate_IEC_JSON(narrative, issues, intermediate):
+        yield item
+
+
+def embed_text(text: str) -> List[float]:
+    return ai_stack.get().embed_text(text)
+
+
 class CodeGenerationError(Exception):
     """Exception for code generation errors."""
     def __init__(self, message: str, is_validation_error: bool = False):
@@ -28,16 +61,70 @@ class CodeGenerationError(Exception):
         self.is_validation_error = is_validation_error
 
 
+def is_rate_limited(error: Exception) -> bool:
+    """Check if an LLM error is a rate limit (HTTP 429) response."""
+    if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+        return True
+    return "rate limit" in str(error).lower()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header of a rate limit error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def stream_event(event: str, **data) -> Dict[str, Any]:
+    """Pipeline event as yielded by `CodeGenerationService.agenerate_stream`."""
+    return {"event": event, "data": data}
+
+
+def to_sse(event: Dict[str, Any]) -> str:
+    """Encode a pipeline event as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
 class CodeGenerationService:
     """Service for generating IEC 61131-3 code from natural language."""
     
-    def __init__(self, max_regeneration_attempts: int = 2):
+    def __init__(
+        self,
+        max_regeneration_attempts: int = 2,
+        cache: Optional[GenerationCache] = None,
+        batch_concurrency: int = 4,
+        max_rate_limit_retries: int = 4,
+        backoff_seconds: float = 1.0,
+        local_repair: bool = True,
+        fast_path: bool = True,
+        fast_path_confidence: float = 0.9,
+        validation_workers: Optional[int] = None,
+    ):
         self.max_attempts = max_regeneration_attempts
+        self.cache = cache if cache is not None else GenerationCache(max_entries=0)
+        self.batch_concurrency = batch_concurrency
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.backoff_seconds = backoff_seconds
+        self.local_repair = local_repair
+        self.fast_path = fast_path
+        self.fast_path_confidence = fast_path_confidence
+        self.validation_workers = validation_workers
+        # Identical generations in flight at the same time share one pipeline run
+        self.flights = SingleFlight()
+        # Event loop thread that runs the async pipeline for synchronous callers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
     
     def generate(self, narrative: str) -> str:
         """
         Generate IEC 61131-3 code from natural language.
         
+        Concurrent calls for the same narrative (and device table) share one
+        pipeline run and all receive its result, or the same error.
+        
         Args:
             narrative: Natural language description
         
@@ -47,56 +134,293 @@ class CodeGenerationService:
         Raises:
             CodeGenerationError: If generation fails
         """
-        attempts_remaining = self.max_attempts
+        # The async pipeline is the only implementation; sync callers run it on
+        # the service loop, where their identical requests are coalesced
+        return self._run_sync(self.agenerate(narrative))
+    
+    def _run_sync(self, coro):
+        """Run a coroutine to completion from synchronous code, on the service's own event loop thread."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="generation-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def agenerate(self, narrative: str) -> str:
+        """
+        Async variant of `generate`.
+        
+        LLM calls are awaited and the device table is loaded off the event loop,
+        so a single worker can serve many generations concurrently. Follows the
+        same run as `agenerate_stream` and keeps only its final event, so a
+        plain request and a streamed one for the same narrative share one run.
+        
+        Args:
+            narrative: Natural language description
+        
+        Returns:
+            Generated Structured Text code
+        
+        Raises:
+            CodeGenerationError: If generation fails
+        """
+        async with aclosing(self.agenerate_stream(narrative)) as events:
+            async for event in events:
+                if event["event"] == "result":
+                    return event["data"]["code"]
+                if event["event"] == "error":
+                    raise CodeGenerationError(event["data"]["message"], event["data"]["validation_error"])
+        raise CodeGenerationError("Code generation ended without a result")
+    
+    async def agenerate_batch(
+        self, narratives: List[str], concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate code for many narratives concurrently.
+        
+        At most `concurrency` generations run at once; results are yielded in
+        completion order, not input order. Failures are reported per item and
+        do not stop the batch.
+        
+        Args:
+            narratives: Natural language descriptions
+            concurrency: Max generations in flight (defaults to batch_concurrency)
+        
+        Yields:
+            {"index", "status": "ok", "code"} or
+            {"index", "status": "error", "message", "validation_error"}
+        """
+        limit = asyncio.Semaphore(concurrency or self.batch_concurrency)
+        
+        async def run(index: int, narrative: str) -> Dict[str, Any]:
+            async with limit:
+                try:
+                    code = await self.agenerate(narrative)
+                    return {"index": index, "status": "ok", "code": code}
+                except CodeGenerationError as e:
+                    return {
+                        "index": index, "status": "error",
+                        "message": str(e), "validation_error": e.is_validation_error,
+                    }
+                except Exception as e:
+                    logger.error(f"Unexpected error in batch item {index}: {e}", exc_info=True)
+                    return {
+                        "index": index, "status": "error",
+                        "message": "An unexpected error occurred", "validation_error": False,
+                    }
+        
+        tasks = [asyncio.create_task(run(i, n)) for i, n in enumerate(narratives)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away or the consumer stopped early: drop queued work
+            for task in tasks:
+                task.cancel()
+    
+    def agenerate_stream(self, narrative: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `agenerate` that reports pipeline stages as they happen.
+        
+        Events ({"event": name, "data": {...}}), where `attempt` is 0 for the
+        first generation and N for the Nth regeneration:
+            fast_path     template, confidence (answered by a rule-based template, no LLM call)
+            cache_hit     -
+            retrieval     attempt, documents, sources
+            token         attempt, text (LLM output chunk)
+            repair        attempt, fixes (deterministic fixes applied before validation)
+            validation    attempt, valid, errors ([{"path", "message"}])
+            regeneration  attempt, max_attempts
+            result        code
+            error         message, validation_error
+        
+        The stream always ends with exactly one `result` or `error` event.
+        Identical requests (streamed or not) at the same time share one run; a
+        caller joining late still receives every event from the start.
+        """
+        return self.flights.stream(self._flight_key(narrative), lambda: self._aguarded_events(narrative))
+    
+    async def _aguarded_events(self, narrative: str) -> AsyncIterator[Dict[str, Any]]:
+        """`_agenerate_events` with any failure turned into a final `error` event."""
+        try:
+            async for event in self._agenerate_events(narrative):
+                yield event
+        except CodeGenerationError as e:
+            yield stream_event("error", message=str(e), validation_error=e.is_validation_error)
+        except Exception as e:
+            logger.error(f"Unexpected error in streaming code generation: {e}", exc_info=True)
+            yield stream_event("error", message="An unexpected error occurred", validation_error=False)
+    
+    async def _agenerate_events(self, narrative: str) -> AsyncIterator[Dict[str, Any]]:
+        # Read the version before the table: if the table changes in between, the
+        # result is cached under the older version, which is never served again
+        version = device_registry.version
+        device_vars = await aload_device_variables()
+        matched = self._match_fast_path(narrative, device_vars)
+        if matched is not None:
+            yield stream_event("fast_path", template=matched.template, confidence=matched.confidence)
+            yield stream_event("result", code=self._generate_code(matched.intermediate))
+            return
+        
+        # Exact tier first; the narrative is only embedded after an exact miss
+        vector = None
+        cached = self.cache.get(narrative, version)
+        if cached is None and self.cache.semantic_enabled:
+            vector = await asyncio.to_thread(self.cache.embed_narrative, narrative)
+            cached = self.cache.get_similar(narrative, version, vector)
+        if cached is not None:
+            logger.info("Generation cache hit")
+            yield stream_event("cache_hit")
+            yield stream_event("result", code=self._generate_code(cached))
+            return
         
-        # Step 1: Generate intermediate JSON
         logger.info(f"Generating code for: {narrative[:100]}...")
-        intermediate = self._generate_intermediate(narrative)
+        attempt = 0
+        intermediate = ""
+        try:
+            async for kind, payload in self._astream_with_backoff(astream_generate_IEC_JSON, narrative):
+                if kind == "response":
+                    intermediate = payload
+                else:
+                    yield self._llm_event(kind, payload, attempt)
+        except Exception as e:
+            logger.error(f"AI generation failed: {e}")
+            raise CodeGenerationError(f"AI generation failed: {e}")
         
-        # Step 2: Parse JSON
         intermediate_json = self._parse_json(intermediate)
         
-        # Step 3: Check for "no device found"
         if self._is_no_device_response(intermediate_json):
             raise CodeGenerationError(
                 "No matching device found for your query. Please check the available variables.",
                 is_validation_error=True
             )
         
-        # Step 4: Validate and regenerate if needed
-        validation_result = code_validator(intermediate_json)
+        intermediate_json, diagnostics, fixes = await asyncio.to_thread(self._validate, intermediate_json, device_vars)
+        if fixes:
+            intermediate = json.dumps(intermediate_json)
+            yield stream_event("repair", attempt=attempt, fixes=fixes)
+        yield stream_event("validation", attempt=attempt, valid=not diagnostics, errors=diagnostics)
         
-        while not validation_result[0] and attempts_remaining > 0:
-            attempts_remaining -= 1
-            logger.info(f"Regenerating due to validation errors. Attempts remaining: {attempts_remaining}")
-            logger.debug(f"Validation error: {validation_result[1]}")
+        while diagnostics and attempt < self.max_attempts:
+            attempt += 1
+            issues = format_diagnostics(diagnostics)
+            logger.info(
+                f"Regenerating due to {len(diagnostics)} validation error(s). "
+                f"Attempts remaining: {self.max_attempts - attempt}"
+            )
+            logger.debug(f"Validation errors:\n{issues}")
+            yield stream_event("regeneration", attempt=attempt, max_attempts=self.max_attempts)
             
-            intermediate = regenerate_IEC_JSON(narrative, validation_result[1], intermediate)
+            async for kind, payload in self._astream_with_backoff(
+                astream_regenerate_IEC_JSON, narrative, issues, intermediate
+            ):
+                if kind == "response":
+                    intermediate = payload
+                else:
+                    yield self._llm_event(kind, payload, attempt)
             
             try:
                 intermediate_json = self._parse_json(intermediate)
-            except CodeGenerationError:
+            except CodeGenerationError as e:
+                yield stream_event(
+                    "validation", attempt=attempt, valid=False,
+                    errors=[{"path": "", "message": str(e)}],
+                )
                 continue
             
-            validation_result = code_validator(intermediate_json)
+            intermediate_json, diagnostics, fixes = await asyncio.to_thread(self._validate, intermediate_json, device_vars)
+            if fixes:
+                intermediate = json.dumps(intermediate_json)
+                yield stream_event("repair", attempt=attempt, fixes=fixes)
+            yield stream_event("validation", attempt=attempt, valid=not diagnostics, errors=diagnostics)
         
-        # Step 5: Check final validation
-        if not validation_result[0]:
+        if diagnostics:
             raise CodeGenerationError(
-                validation_result[1],
+                format_diagnostics(diagnostics),
                 is_validation_error=True
             )
         
-        # Step 6: Generate code
-        return self._generate_code(intermediate_json)
+        code = self._generate_code(intermediate_json)
+        self.cache.put(narrative, version, intermediate_json, vector)
+        yield stream_event("result", code=code)
     
-    def _generate_intermediate(self, narrative: str) -> str:
-        """Generate intermediate JSON representation."""
-        try:
-            return generate_IEC_JSON(narrative)
-        except Exception as e:
-            logger.error(f"AI generation failed: {e}")
-            raise CodeGenerationError(f"AI generation failed: {e}")
+    def _llm_event(self, kind: str, payload, attempt: int) -> Dict[str, Any]:
+        if kind == "retrieval":
+            return stream_event(
+                "retrieval", attempt=attempt, documents=len(payload),
+                sources=[doc.metadata.get("source") for doc in payload],
+            )
+        return stream_event("token", attempt=attempt, text=payload)
+    
+    async def _astream_with_backoff(self, func, *args):
+        """
+        Iterate a streaming LLM call, retrying rate-limited calls with exponential backoff and jitter.
+        
+        A call is only retried if it failed before the first token was produced.
+        """
+        delay = self.backoff_seconds
+        for attempt in range(self.max_rate_limit_retries + 1):
+            streamed = False
+            try:
+                async for kind, payload in func(*args):
+                    streamed = streamed or kind == "token"
+                    yield kind, payload
+                return
+            except Exception as e:
+                if streamed or attempt >= self.max_rate_limit_retries or not is_rate_limited(e):
+                    raise
+                wait = retry_after_seconds(e) or delay * (1 + random.random())
+                logger.warning(f"LLM rate limited, retrying in {wait:.1f}s ({attempt + 1}/{self.max_rate_limit_retries})")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, 30.0)
+    
+    def _flight_key(self, narrative: str) -> Tuple[str, int]:
+        """Requests with the same key at the same time are coalesced into one run."""
+        return normalize_narrative(narrative), device_registry.version
+    
+    def stats(self) -> Dict[str, Any]:
+        """Generation cache metrics plus request coalescing counters."""
+        return {**self.cache.stats(), **self.flights.stats()}
+    
+    def _match_fast_path(self, narrative: str, device_vars: Dict[str, str]) -> Optional[FastPathMatch]:
+        """Template IR for a simple narrative, or None to use the LLM (no match or low confidence)."""
+        if not self.fast_path:
+            return None
+        matched = match_narrative(narrative, device_vars)
+        if matched is None:
+            return None
+        if matched.confidence < self.fast_path_confidence:
+            logger.info(f"Fast path match below threshold (confidence {matched.confidence}), using the LLM")
+            return None
+        logger.info(f"Fast path: '{matched.template}' template (confidence {matched.confidence})")
+        return matched
+    
+    def _validate(self, intermediate_json, device_vars: Dict[str, str]) -> Tuple[Any, List[Dict[str, str]], List[str]]:
+        """
+        Validate, and on failure try the local repair pass before any regeneration.
+        
+        CPU-bound (and may use the validator's process pool): async callers run
+        it in a worker thread, off the event loop.
+        
+        The repaired IR is kept only if it has fewer validation errors.
+        
+        Returns:
+            (IR to continue with, its diagnostics, fixes applied by the repair pass)
+        """
+        diagnostics = validate_diagnostics(intermediate_json, device_vars, workers=self.validation_workers)
+        if not diagnostics or not self.local_repair:
+            return intermediate_json, diagnostics, []
+        
+        repaired, fixes = repair_ir(intermediate_json, device_vars)
+        if not fixes:
+            return intermediate_json, diagnostics, []
+        
+        remaining = validate_diagnostics(repaired, device_vars, workers=self.validation_workers)
+        if len(remaining) >= len(diagnostics):
+            return intermediate_json, diagnostics, []
+        
+        logger.info(f"Local repair fixed {len(diagnostics) - len(remaining)} of {len(diagnostics)} validation error(s)")
+        return repaired, remaining, fixes
     
     def _parse_json(self, intermediate: str) -> dict:
         """Parse intermediate JSON."""
@@ -119,12 +443,113 @@ class CodeGenerationService:
         except GeneratorError as e:
             logger.error(f"Code generation failed: {e}")
             raise CodeGenerationError(str(e))
+    
+    def stream_code(self, intermediate_json) -> Iterator[str]:
+        """
+        Convert intermediate JSON to Structured Text in chunks (no LLM call).
+        
+        The first chunk is produced eagerly so malformed input fails before
+        anything is streamed. A failure later in the program is reported as a
+        trailing ST comment, since the response has already started.
+        
+        Raises:
+            CodeGenerationError: If the input cannot be converted (validation error)
+        """
+        chunks = iter_st(intermediate_json)
+        try:
+            first = next(chunks, None)
+        except GeneratorError as e:
+            logger.error(f"Code generation failed: {e}")
+            raise CodeGenerationError(str(e), is_validation_error=True)
+        
+        def stream():
+            if first is not None:
+                yield first
+            try:
+                yield from chunks
+            except GeneratorError as e:
+                logger.error(f"Code generation failed while streaming: {e}")
+                yield f"\n(* ERROR: {e} *)\n"
+        
+        return stream()
 
 
 # Service instance
-code_generation_service = CodeGenerationService()
+code_generation_service = CodeGenerationService(
+    batch_concurrency=settings.generation_concurrency,
+    fast_path=settings.fast_path,
+    fast_path_confidence=settings.fast_path_confidence,
+    validation_workers=settings.validation_workers or None,
+    cache=GenerationCache(
+        max_entries=settings.generation_cache_size,
+        ttl_seconds=settings.generation_cache_ttl,
+        similarity_threshold=settings.generation_cache_similarity,
+        embed=embed_text,
+    )
+)
+
+
+# ---------------- Knowledge base refresh ----------------
+
+# One worker: refreshes run in order and never embed concurrently
+_kb_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-refresh")
+_kb_refresh_pending = threading.Event()
+
+
+def _refresh_knowledge_base():
+    """Write the current device table to the KB and re-embed only what changed."""
+    _kb_refresh_pending.clear()
+    collection = get_collection()
+    if collection is None:
+        return
+    
+    try:
+        variables = [
+            {k: v for k, v in var.items() if not k.startswith('_')}
+            for var in collection.find({}, {"_id": 0, "id": 0, "deviceNameKey": 0})
+        ]
+    except PyMongoError as e:
+        logger.warning(f"Skipping knowledge base refresh, could not read variables: {e}")
+        return
+    
+    try:
+        # A stack that was never started reads the new file when it warms up
+        if write_variables_to_file(variables, VARIABLES_KB_PATH) and ai_stack.is_started:
+            ai_stack.get().refresh_knowledge_base()
+    except Exception as e:
+        logger.error(f"Knowledge base refresh failed: {e}")
+
+
+def _on_devices_changed(version: int):
+    # Bursts of invalidations collapse into a single queued refresh
+    if not _kb_refresh_pending.is_set():
+        _kb_refresh_pending.set()
+        _kb_refresh_executor.submit(_refresh_knowledge_base)
+
+
+device_registry.add_listener(_on_devices_changed)
 
 
 def generate_code(narrative: str) -> str:
     """Convenience function for code generation."""
     return code_generation_service.generate(narrative)
+
+
+async def agenerate_code(narrative: str) -> str:
+    """Convenience function for async code generation."""
+    return await code_generation_service.agenerate(narrative)
+
+
+def stream_code(intermediate_json) -> Iterator[str]:
+    """Convenience function for streaming Structured Text from intermediate JSON."""
+    return code_generation_service.stream_code(intermediate_json)
+
+
+def agenerate_stream(narrative: str) -> AsyncIterator[Dict[str, Any]]:
+    """Convenience function for streaming code generation (pipeline events)."""
+    return code_generation_service.agenerate_stream(narrative)
+
+
+def agenerate_batch(narratives: List[str], concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Convenience function for concurrent batch generation."""
+    return code_generation_service.agenerate_batch(narratives, concurrency)
@@ -0,0 +1,229 @@
+"""
+Generation Cache
+
+Caches validated intermediate JSON per narrative so repeated requests skip
+both the LLM round trip and the validator.
+
+Entries are keyed on the normalized narrative and the device registry
+version; any change to the device table makes older entries unreachable.
+An optional second tier matches near-identical narratives by embedding
+similarity.
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+RE_WHITESPACE = re.compile(r"\s+")
+RE_TRAILING_PUNCT = re.compile(r"[\s.!?;,]+$")
+RE_WORD = re.compile(r"[a-z_][a-z0-9_]*|\d+(?:\.\d+)?")
+
+# Words that flip the meaning of an otherwise identical sentence.
+# Two narratives only match semantically if these (and all numbers) agree.
+POLARITY_WORDS = {
+    "on", "off", "open", "close", "closed", "not", "no", "start", "stop",
+    "enable", "disable", "increase", "decrease", "up", "down", "above", "below",
+    "greater", "less", "more", "true", "false", "and", "or", "min", "max",
+}
+
+
+def normalize_narrative(narrative: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    text = RE_WHITESPACE.sub(" ", narrative.strip().lower())
+    return RE_TRAILING_PUNCT.sub("", text)
+
+
+def narrative_signature(normalized: str) -> Tuple[str, ...]:
+    """Numbers and polarity words of a normalized narrative, in order."""
+    return tuple(
+        w for w in RE_WORD.findall(normalized)
+        if w[0].isdigit() or w in POLARITY_WORDS
+    )
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    signature: Tuple[str, ...]
+    vector: Optional[List[float]] = None
+
+
+class GenerationCache:
+    """
+    TTL + LRU cache of validated intermediate JSON.
+
+    Exact lookups are O(1). The similarity tier (enabled when `embed` is set and
+    `similarity_threshold` > 0) compares the query embedding against every live
+    entry, so it is only consulted after an exact miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.0,
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.embed is not None and self.similarity_threshold > 0
+
+    def embed_narrative(self, narrative: str) -> Optional[List[float]]:
+        """Embedding used by the similarity tier (None when it is disabled or fails)."""
+        if not self.semantic_enabled:
+            return None
+        try:
+            return _unit(self.embed(normalize_narrative(narrative)))
+        except Exception as e:
+            logger.warning(f"Narrative embedding failed, similarity cache skipped: {e}")
+            return None
+
+    def get(self, narrative: str, version: int) -> Optional[Any]:
+        """
+        Look up a cached value by exact (normalized) narrative.
+
+        On a miss with the similarity tier enabled, embed the narrative and
+        call `get_similar()`, so the embedding is only paid for exact misses.
+
+        Args:
+            narrative: Raw narrative
+            version: Device registry version the caller's device table belongs to
+
+        Returns:
+            Cached value or None
+        """
+        if not self.enabled:
+            return None
+        key = normalize_narrative(narrative)
+        now = time.monotonic()
+
+        with self._lock:
+            if not self._check_version(version):
+                self._misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.value
+                del self._entries[key]
+            if not self.semantic_enabled:
+                self._misses += 1
+            return None
+
+    def get_similar(self, narrative: str, version: int, vector: Optional[List[float]]) -> Optional[Any]:
+        """
+        Look up a cached value for a near-identical narrative (after an exact miss).
+
+        Args:
+            narrative: Raw narrative
+            version: Device registry version the caller's device table belongs to
+            vector: Result of `embed_narrative()`; None counts as a miss
+
+        Returns:
+            Cached value or None
+        """
+        if not self.enabled:
+            return None
+        key = normalize_narrative(narrative)
+        now = time.monotonic()
+
+        with self._lock:
+            if vector is not None and self._check_version(version):
+                match = self._nearest(vector, narrative_signature(key), now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self._semantic_hits += 1
+                    return self._entries[match].value
+            self._misses += 1
+            return None
+
+    def put(self, narrative: str, version: int, value: Any, vector: Optional[List[float]] = None):
+        """Store a value (which must not be mutated afterwards)."""
+        if not self.enabled:
+            return
+        key = normalize_narrative(narrative)
+
+        with self._lock:
+            if not self._check_version(version):
+                return
+            self._entries[key] = CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                signature=narrative_signature(key),
+                vector=vector,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._semantic_hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "semantic_enabled": self.semantic_enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (self._hits + self._semantic_hits) / lookups if lookups else 0.0,
+            }
+
+    def _check_version(self, version: int) -> bool:
+        """Drop everything on a newer device table; False for a stale (older) version."""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                logger.debug(f"Device table changed, dropping {len(self._entries)} cached generations")
+            self._entries.clear()
+            self._version = version
+        return True
+
+    def _nearest(self, vector: List[float], signature: Tuple[str, ...], now: float) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry.vector is None or entry.expires_at <= now or entry.signature != signature:
+                continue
+            score = sum(a * b for a, b in zip(vector, entry.vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = sum(x * x for x in vector) ** 0.5
+    return [x / norm for x in vector] if norm else list(vector)
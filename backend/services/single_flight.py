@@ -0,0 +1,120 @@
+"""
+Single-Flight Request Coalescing
+
+Identical requests that arrive while the same work is already running join
+that run instead of starting their own: every caller receives the same
+events, or the same error. Used by the code generation service so that a
+double-submitted form or several operators asking for the same narrative
+(streamed or not) cost one LLM pipeline instead of several.
+
+A run is a shared task, shielded from the cancellation of any single caller;
+the work is only cancelled once every caller has gone away. Its events are
+buffered while it runs, so a caller joining late still receives every event
+from the start.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One in-flight run and the callers following it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.task: Optional[asyncio.Future] = None
+        self.callers = 1
+        # Events so far, and an event set (then replaced) on every change
+        self.events: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Calls that joined a run already in flight, and runs in flight now."""
+        with self._lock:
+            return {"coalesced": self._coalesced, "in_flight": len(self._flights)}
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Iterate `factory()`, or replay and follow the identical stream already in flight.
+
+        Every caller receives every event of the run, in order.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            flight.task = asyncio.ensure_future(self._pump(flight, factory()))
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        try:
+            seen = 0
+            while True:
+                if seen < len(flight.events):
+                    seen += 1
+                    yield flight.events[seen - 1]
+                elif flight.finished:
+                    break
+                else:
+                    await flight.changed.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._leave(flight)
+
+    def _join(self, key: Hashable):
+        """(flight, True) for a new run, or (running flight, False) to join."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.loop is loop and not flight.task.done():
+                flight.callers += 1
+                self._coalesced += 1
+                joined = True
+            else:
+                flight = self._flights[key] = _Flight(loop)
+                joined = False
+        if joined:
+            logger.info("Joined an identical in-flight generation")
+        return flight, not joined
+
+    def _leave(self, flight: _Flight):
+        flight.callers -= 1
+        if flight.callers == 0 and not flight.task.done():
+            # Every caller went away (e.g. clients disconnected): stop the work
+            flight.task.cancel()
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    async def _pump(self, flight: _Flight, events: AsyncIterator[Any]):
+        """Buffer a stream's events for every caller following it."""
+        try:
+            async for event in events:
+                flight.events.append(event)
+                self._notify(flight)
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.finished = True
+            self._notify(flight)
+
+    @staticmethod
+    def _notify(flight: _Flight):
+        changed, flight.changed = flight.changed, asyncio.Event()
+        changed.set()
@@ -0,0 +1,189 @@
+"""
+Variable Upload Parser
+
+Incremental parsers for variable uploads (JSON array, NDJSON, CSV).
+Rows are produced one at a time from a binary file object, so memory stays
+bounded by the largest single row instead of the file size.
+"""
+
+import io
+import csv
+import json
+import logging
+from typing import Any, BinaryIO, Iterator, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# A single JSON array element larger than this is treated as a broken file
+MAX_ELEMENT_SIZE = 1024 * 1024
+JSON_WHITESPACE = " \t\r\n"
+
+UPLOAD_FORMATS = {
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+
+class RowError(NamedTuple):
+    """A row that could not be parsed (the rest of the file still is)."""
+    message: str
+
+
+# (row number starting at 1, parsed value or RowError)
+Row = Tuple[int, Union[Any, RowError]]
+
+
+class UploadParseError(ValueError):
+    """The file cannot be read any further (rows before it were still produced)."""
+    pass
+
+
+class UploadTooLargeError(UploadParseError):
+    pass
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Upload format for a filename, or None if unsupported."""
+    name = (filename or "").lower()
+    for ext, fmt in UPLOAD_FORMATS.items():
+        if name.endswith(ext):
+            return fmt
+    return None
+
+
+class _LimitedReader(io.RawIOBase):
+    """Binary reader that raises UploadTooLargeError once `limit` bytes were read."""
+
+    def __init__(self, raw: BinaryIO, limit: Optional[int]):
+        self.raw = raw
+        self.limit = limit
+        self.total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(len(buffer))
+        self.total += len(data)
+        if self.limit is not None and self.total > self.limit:
+            raise UploadTooLargeError(f"File too large. Maximum size is {self.limit // 1024 // 1024}MB")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def iter_rows(fileobj: BinaryIO, fmt: str, max_size: Optional[int] = None) -> Iterator[Row]:
+    """
+    Parse an uploaded file incrementally.
+
+    Args:
+        fileobj: Binary file object positioned at the start
+        fmt: "json" (array of objects), "ndjson" or "csv" (header row required)
+        max_size: Max bytes to read
+
+    Yields:
+        (row, value) for every row; value is the parsed JSON value (a dict
+        for CSV), or a RowError for a row that could not be parsed
+
+    Raises:
+        UploadParseError: If the rest of the file cannot be parsed
+        UploadTooLargeError: If more than `max_size` bytes are read
+    """
+    reader = io.BufferedReader(_LimitedReader(fileobj, max_size), CHUNK_SIZE)
+    text = io.TextIOWrapper(reader, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "json":
+            yield from _iter_json_array(text)
+        elif fmt == "ndjson":
+            yield from _iter_ndjson(text)
+        elif fmt == "csv":
+            yield from _iter_csv(text)
+        else:
+            raise UploadParseError(f"Unsupported upload format '{fmt}'")
+    except UnicodeDecodeError:
+        raise UploadParseError("File is not valid UTF-8")
+
+
+def _iter_ndjson(text: io.TextIOBase) -> Iterator[Row]:
+    for row, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, RowError(f"Invalid JSON: {e.msg}")
+
+
+def _iter_csv(text: io.TextIOBase) -> Iterator[Row]:
+    records = csv.DictReader(text)
+    if not records.fieldnames:
+        return
+    for record in records:
+        # Header is line 1; line_num counts physical lines of quoted multi-line fields too
+        if None in record:
+            yield records.line_num, RowError("Too many columns")
+            continue
+        yield records.line_num, {k.strip(): (v or "").strip() for k, v in record.items() if k}
+
+
+def _iter_json_array(text: io.TextIOBase) -> Iterator[Row]:
+    """Yield the elements of a top-level JSON array without loading the whole array."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    state = "open"  # open -> first -> (separator -> value)* -> done
+    row = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos >= len(buffer) and not eof:
+            chunk = text.read(CHUNK_SIZE)
+            buffer, pos, eof = chunk, 0, not chunk
+            continue
+        if pos >= len(buffer):
+            break
+
+        char = buffer[pos]
+        if state == "open":
+            if char != "[":
+                raise UploadParseError("JSON must be an array of variables")
+            pos += 1
+            state = "first"
+        elif state == "separator":
+            if char not in ",]":
+                raise UploadParseError(f"Invalid JSON after item {row}: expected ',' or ']'")
+            pos += 1
+            state = "value" if char == "," else "done"
+        elif state == "done":
+            raise UploadParseError("Unexpected data after the end of the JSON array")
+        elif char == "]" and state == "first":
+            pos += 1
+            state = "done"
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # a value ending exactly at the buffer end may continue in the next chunk (numbers)
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise UploadParseError(f"Invalid JSON in item {row + 1}: {e.msg}")
+                if len(buffer) - pos > MAX_ELEMENT_SIZE:
+                    raise UploadParseError(f"Item {row + 1} is larger than {MAX_ELEMENT_SIZE // 1024}KB or not valid JSON")
+                complete = False
+            if not complete:
+                chunk = text.read(CHUNK_SIZE)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+
+            row += 1
+            yield row, value
+            pos = end
+            state = "separator"
+
+    if state == "open":
+        raise UploadParseError("File is empty")
+    if state != "done":
+        raise UploadParseError("JSON array is not closed")
@@ -5,20 +5,79 @@ Handles all variable-related database operations.
 """
 
 import re
+import base64
+import hashlib
 import logging
 import sys
 import os
-from typing import List, Dict, Any, Set
-from pymongo.errors import PyMongoError
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from pydantic import ValidationError
+from bson import ObjectId
+from pymongo import UpdateOne, DeleteMany
+from pymongo.errors import PyMongoError, BulkWriteError, OperationFailure
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
-from core import get_collection
+from core import get_collection, device_registry
 from models import Variable
+from name_index import index_for
+from .upload_parser import UploadParseError, RowError
 
 logger = logging.getLogger(__name__)
 
+# Operations per bulk_write call (bounds request size for very large tag lists)
+BULK_BATCH_SIZE = 1000
+DEVICE_NAME_KEY_INDEX = "deviceNameKey_unique"
+# Max duplicate groups listed in a dry-run report (the count is always exact)
+DRY_RUN_REPORT_LIMIT = 500
+MAX_PAGE_SIZE = 1000
+MAX_SUGGESTIONS = 20
+# Max per-row errors listed in an upload result (the count is always exact)
+UPLOAD_ERROR_LIMIT = 100
+# Fields a client may select with `fields=`
+VARIABLE_FIELDS = ("deviceName", "dataType", "range", "MetaData")
+# Document in the `<collection>_meta` collection counting writes to the table
+VERSION_DOC_ID = "version"
+
+
+def device_name_key(device_name: str) -> str:
+    """Normalized device name used for case-insensitive matching (indexed, unique)."""
+    return device_name.strip().lower()
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """
+    Whether an If-None-Match header matches `etag` (RFC 9110, weak comparison).
+
+    The header is `*` (matches any current representation) or a comma-separated
+    list of entity-tags; each is compared whole, ignoring the W/ weakness prefix.
+    """
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
 
 class VariablesServiceError(Exception):
     """Exception for variable service errors."""
@@ -43,71 +102,243 @@ class VariablesService:
             raise VariablesServiceError("Database connection not available")
         
         try:
-            variables = list(collection.find({}, {"_id": 0}))
+            variables = list(collection.find({}, {"_id": 0, "deviceNameKey": 0}))
             logger.info(f"Retrieved {len(variables)} variables")
             return variables
         except PyMongoError as e:
             logger.error(f"Database error retrieving variables: {e}")
             raise VariablesServiceError("Database error while retrieving variables")
     
-    def save_all(self, variables: List[Variable]) -> Dict[str, Any]:
+    def etag(self, query: str = "") -> Optional[str]:
         """
-        Save/sync variables to the database.
+        Weak ETag for a variables query.
         
-        This performs a full sync: deletes removed items, updates existing, adds new.
+        Built from the write counter stored in MongoDB (bumped by every write
+        through this service, in any process) and the query, so unchanged lists
+        can be answered with 304 Not Modified.
+        
+        Returns:
+            The ETag, or None if the stored version cannot be read
+        """
+        collection = get_collection()
+        if collection is None:
+            return None
+        
+        try:
+            doc = self._meta(collection).find_one({"_id": VERSION_DOC_ID}) or {}
+        except PyMongoError as e:
+            logger.warning(f"Could not read variables version: {e}")
+            return None
+        
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+        return f'W/"{doc.get("epoch", 0)}-{doc.get("version", 0)}-{digest}"'
+    
+    def query(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        fields: Optional[List[str]] = None,
+        prefix: Optional[str] = None,
+        data_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get a filtered, projected page of variables.
+        
+        Without `limit` every matching variable is returned (in storage order).
+        With `limit`, variables are ordered by name (case-insensitive) and
+        `next_cursor` can be passed back as `cursor` to get the next page;
+        `offset` is supported as well but cursors stay cheap on large tables.
         
         Args:
-            variables: List of variables to save
+            limit: Page size (1..MAX_PAGE_SIZE)
+            cursor: `next_cursor` of the previous page
+            offset: Number of variables to skip (ignored with a cursor)
+            fields: Fields to return (subset of VARIABLE_FIELDS)
+            prefix: Case-insensitive device name prefix
+            data_type: Exact data type (case-insensitive)
         
         Returns:
-            Result dictionary with status and message
+            {"variables", "next_cursor", "total"}
         
         Raises:
+            ValueError: For invalid fields or cursor
             VariablesServiceError: If database operation fails
         """
         collection = get_collection()
         if collection is None:
             raise VariablesServiceError("Database connection not available")
         
+        unknown = set(fields or ()) - set(VARIABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        
+        filters: Dict[str, Any] = {}
+        if prefix:
+            # Anchored prefix on the lower-cased key can use the deviceNameKey index
+            filters["deviceNameKey"] = {"$regex": f"^{re.escape(device_name_key(prefix))}"}
+        if data_type:
+            filters["dataType"] = data_type.strip().upper()
+        
+        if fields:
+            projection: Dict[str, int] = {"_id": 0, **{f: 1 for f in fields}}
+            if limit:
+                projection["deviceNameKey"] = 1
+        else:
+            projection = {"_id": 0} if limit else {"_id": 0, "deviceNameKey": 0}
+        
         try:
-            # Get current variables from database
-            db_variables = list(collection.find({}, {"deviceName": 1}))
-            db_device_names: Set[str] = {doc["deviceName"] for doc in db_variables}
-            
-            # Get device names from input
-            frontend_device_names: Set[str] = {var.deviceName for var in variables}
+            total = (
+                collection.count_documents(filters) if filters
+                else collection.estimated_document_count()
+            )
             
-            # Delete removed variables
-            deleted_names = db_device_names - frontend_device_names
-            if deleted_names:
-                result = collection.delete_many({"deviceName": {"$in": list(deleted_names)}})
-                logger.info(f"Deleted {result.deleted_count} variables")
+            if not limit:
+                variables = list(collection.find(filters, projection))
+                return {"variables": variables, "next_cursor": None, "total": total}
             
-            # Upsert all variables
-            updated_count = 0
-            for var in variables:
-                query = {"deviceName": {"$regex": f"^{re.escape(var.deviceName)}$", "$options": "i"}}
-                var_dict = var.dict(exclude={'id'})
-                result = collection.update_one(query, {"$set": var_dict}, upsert=True)
-                if result.modified_count > 0 or result.upserted_id:
-                    updated_count += 1
+            page_filter = filters
+            if cursor:
+                page_filter = {"$and": [filters, {"deviceNameKey": {"$gt": decode_cursor(cursor)}}]}
             
-            logger.info(f"Synchronized {len(variables)} variables ({updated_count} updated)")
-            return {
-                "status": "ok",
-                "message": f"Successfully synchronized {len(variables)} variables."
-            }
+            found = collection.find(page_filter, projection).sort("deviceNameKey", 1)
+            if offset and not cursor:
+                found = found.skip(offset)
+            docs = list(found.limit(limit + 1))
+        except PyMongoError as e:
+            logger.error(f"Database error querying variables: {e}")
+            raise VariablesServiceError("Database error while retrieving variables")
+        
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["deviceNameKey"]) if has_more and docs else None
+        for doc in docs:
+            doc.pop("deviceNameKey", None)
+        
+        return {"variables": docs, "next_cursor": next_cursor, "total": total}
+    
+    def suggest(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Device names nearest to a (possibly misspelled) name.
+        
+        Matching ignores case, spaces, underscores and hyphens, then allows a
+        few typos (edit distance 1-3 depending on length); only the nearest
+        names are returned. Served from an in-memory index over the device
+        registry, which is updated incrementally when the variables change.
+        
+        Args:
+            query: Name as typed
+            limit: Max suggestions (1..MAX_SUGGESTIONS)
+        
+        Returns:
+            [{"deviceName", "dataType", "distance"}], nearest first
+        
+        Raises:
+            VariablesServiceError: If the database is not available
+        """
+        if get_collection() is None:
+            raise VariablesServiceError("Database connection not available")
+        
+        device_vars = device_registry.get_all()
+        matches = index_for(device_vars).lookup(query, limit=limit)
+        return [
+            {"deviceName": name, "dataType": device_vars.get(name), "distance": distance}
+            for name, distance in matches
+        ]
+    
+    def ensure_indexes(self) -> bool:
+        """
+        Backfill `deviceNameKey` and create its unique index.
+        
+        Safe to call on every startup. Fails (returns False) while the collection
+        still holds case-insensitive duplicates; run `remove_duplicates()` first.
+        
+        Returns:
+            True if the unique index exists
+        """
+        collection = get_collection()
+        if collection is None:
+            return False
+        
+        try:
+            backfilled = collection.update_many(
+                {"deviceNameKey": {"$exists": False}, "deviceName": {"$type": "string"}},
+                [{"$set": {"deviceNameKey": {"$toLower": {"$trim": {"input": "$deviceName"}}}}}],
+            )
+            if backfilled.modified_count:
+                logger.info(f"Backfilled deviceNameKey on {backfilled.modified_count} variables")
             
+            collection.create_index(
+                "deviceNameKey",
+                name=DEVICE_NAME_KEY_INDEX,
+                unique=True,
+                partialFilterExpression={"deviceNameKey": {"$type": "string"}},
+            )
+            return True
+        except OperationFailure as e:
+            logger.warning(f"Could not create unique deviceNameKey index (remove duplicates first): {e}")
+            return False
         except PyMongoError as e:
-            logger.error(f"Database error saving variables: {e}")
-            raise VariablesServiceError("Database error while saving variables")
+            logger.error(f"Database error creating indexes: {e}")
+            return False
     
-    def remove_duplicates(self) -> Dict[str, Any]:
+    def save_all(self, variables: List[Variable]) -> Dict[str, Any]:
+        """
+        Save/sync variables to the database.
+        
+        This performs a full sync: deletes removed items, updates existing, adds new.
+        Device names are matched case-insensitively through `deviceNameKey`.
+        
+        Args:
+            variables: List of variables to save
+        
+        Returns:
+            Result dictionary with status, message and inserted/updated/deleted counts
+        
+        Raises:
+            VariablesServiceError: If database operation fails
+        """
+        collection = get_collection()
+        if collection is None:
+            raise VariablesServiceError("Database connection not available")
+        
+        # Last occurrence wins for names that differ only in case
+        docs = self._by_key(var.dict(exclude={'id'}) for var in variables)
+        
+        try:
+            # Everything not in the submitted list is removed
+            deletes = [DeleteMany({"deviceNameKey": {"$nin": list(docs)}})]
+            counts = self._bulk_upsert(collection, docs, deletes, action="saving")
+        finally:
+            # Even a partially applied sync changes the table
+            self._changed(collection)
+        
+        logger.info(
+            f"Synchronized {len(docs)} variables ({counts['inserted']} added, "
+            f"{counts['updated']} updated, {counts['deleted']} deleted)"
+        )
+        return {
+            "status": "ok",
+            "message": (
+                f"Successfully synchronized {len(docs)} variables "
+                f"({counts['inserted']} added, {counts['updated']} updated, {counts['deleted']} deleted)."
+            ),
+            **counts,
+        }
+    
+    def remove_duplicates(self, dry_run: bool = False) -> Dict[str, Any]:
         """
         Remove duplicate variables (case-insensitive by deviceName).
         
+        Duplicates are found by an aggregation on the server; for every name the
+        oldest document (lowest _id) is kept. Deletes are sent in batches.
+        
+        Args:
+            dry_run: Only report what would be removed
+        
         Returns:
-            Result dictionary with status and message
+            Result dictionary with status, message, removed count and (for a
+            dry run) the duplicate groups
         
         Raises:
             VariablesServiceError: If database operation fails
@@ -116,46 +347,82 @@ class VariablesService:
         if collection is None:
             raise VariablesServiceError("Database connection not available")
         
+        pipeline = [
+            {"$match": {"deviceName": {"$type": "string"}}},
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": {"$toLower": {"$trim": {"input": "$deviceName"}}},
+                "ids": {"$push": "$_id"},
+                "names": {"$push": "$deviceName"},
+            }},
+            {"$match": {"ids.1": {"$exists": True}}},
+            {"$project": {
+                "keep": {"$arrayElemAt": ["$names", 0]},
+                "removeIds": {"$slice": ["$ids", 1, {"$size": "$ids"}]},
+                "removeNames": {"$slice": ["$names", 1, {"$size": "$names"}]},
+            }},
+        ]
+        
+        removed_count = 0
+        groups: List[Dict[str, Any]] = []
+        pending: List[Any] = []
+        
         try:
-            # Get all documents
-            all_docs = list(collection.find({}, {"_id": 1, "deviceName": 1}))
-            
-            # Track seen names and duplicates
-            seen_names: Dict[str, bool] = {}
-            ids_to_delete = []
+            for group in collection.aggregate(pipeline, allowDiskUse=True):
+                removed_count += len(group["removeIds"])
+                if dry_run:
+                    if len(groups) < DRY_RUN_REPORT_LIMIT:
+                        groups.append({"deviceName": group["keep"], "duplicates": group["removeNames"]})
+                    continue
+                
+                pending.extend(group["removeIds"])
+                if len(pending) >= BULK_BATCH_SIZE:
+                    collection.delete_many({"_id": {"$in": pending}})
+                    pending = []
             
-            for doc in all_docs:
-                lower_name = doc["deviceName"].lower()
-                if lower_name in seen_names:
-                    ids_to_delete.append(doc["_id"])
-                else:
-                    seen_names[lower_name] = True
-            
-            # Delete duplicates
-            deleted_count = 0
-            if ids_to_delete:
-                result = collection.delete_many({"_id": {"$in": ids_to_delete}})
-                deleted_count = result.deleted_count
-            
-            logger.info(f"Removed {deleted_count} duplicate variables")
-            return {
-                "status": "ok",
-                "message": f"Removed {deleted_count} duplicate(s)."
-            }
+            if pending:
+                collection.delete_many({"_id": {"$in": pending}})
             
         except PyMongoError as e:
             logger.error(f"Database error removing duplicates: {e}")
             raise VariablesServiceError("Database error while removing duplicates")
+        finally:
+            if removed_count and not dry_run:
+                self._changed(collection)
+        
+        if dry_run:
+            logger.info(f"Dry run: {removed_count} duplicate variables would be removed")
+            return {
+                "status": "ok",
+                "message": f"Would remove {removed_count} duplicate(s).",
+                "removed": removed_count,
+                "dry_run": True,
+                "duplicates": groups,
+            }
+        
+        if removed_count:
+            # The unique index cannot be built while duplicates exist
+            self.ensure_indexes()
+        
+        logger.info(f"Removed {removed_count} duplicate variables")
+        return {
+            "status": "ok",
+            "message": f"Removed {removed_count} duplicate(s).",
+            "removed": removed_count,
+            "dry_run": False,
+        }
     
     def upload_from_list(self, variables_list: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Upload variables from a list (e.g., from JSON file).
         
+        Existing variables (matched case-insensitively) are updated, new ones added.
+        
         Args:
             variables_list: List of variable dictionaries
         
         Returns:
-            Result dictionary with status and message
+            Result dictionary with status, message and inserted/updated counts
         
         Raises:
             VariablesServiceError: If database operation fails
@@ -164,25 +431,205 @@ class VariablesService:
         if collection is None:
             raise VariablesServiceError("Database connection not available")
         
+        docs = self._by_key(var for var in variables_list)
+        
         try:
-            saved_count = 0
-            for var in variables_list:
-                collection.update_one(
-                    {"deviceName": var.get("deviceName")},
-                    {"$set": var},
-                    upsert=True
-                )
-                saved_count += 1
-            
-            logger.info(f"Uploaded {saved_count} variables")
-            return {
-                "status": "ok",
-                "message": f"Successfully uploaded {saved_count} variables."
-            }
+            counts = self._bulk_upsert(collection, docs, action="uploading")
+        finally:
+            self._changed(collection)
+        
+        logger.info(
+            f"Uploaded {len(docs)} variables ({counts['inserted']} added, {counts['updated']} updated)"
+        )
+        return {
+            "status": "ok",
+            "message": (
+                f"Successfully uploaded {len(docs)} variables "
+                f"({counts['inserted']} added, {counts['updated']} updated)."
+            ),
+            **counts,
+        }
+    
+    def upload_stream(self, rows: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        """
+        Validate and upload variables as they are parsed, in bounded batches.
+    
+        Invalid rows are reported and skipped instead of rejecting the file;
+        valid rows are written every BULK_BATCH_SIZE rows.
+    
+        Args:
+            rows: (row number, parsed value or RowError) pairs,
+                as produced by `upload_parser.iter_rows`
+    
+        Returns:
+            Result dictionary with status ("ok" or "partial"), message, write
+            counts, `rejected` count and the first UPLOAD_ERROR_LIMIT row errors
+    
+        Raises:
+            VariablesServiceError: If database operation fails
+            UploadParseError: If the file cannot be parsed at all (a file that
+                breaks off later returns a "partial" result for the rows before it)
+        """
+        collection = get_collection()
+        if collection is None:
+            raise VariablesServiceError("Database connection not available")
+    
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        errors: List[Dict[str, Any]] = []
+        rejected = 0
+        accepted = 0
+        batch: Dict[str, Dict[str, Any]] = {}
+    
+        def flush():
+            for key, value in self._bulk_upsert(collection, batch, action="uploading").items():
+                counts[key] += value
+            batch.clear()
+    
+        def reject(row: int, message: str):
+            nonlocal rejected
+            rejected += 1
+            if len(errors) < UPLOAD_ERROR_LIMIT:
+                errors.append({"row": row, "message": message})
+    
+        last_row = 0
+        aborted: Optional[str] = None
+        try:
+            try:
+                for row, value in rows:
+                    last_row = row
+                    if isinstance(value, RowError):
+                        reject(row, value.message)
+                        continue
+                    if not isinstance(value, dict):
+                        reject(row, "Row must be an object")
+                        continue
+                    try:
+                        var = Variable(**value).dict(exclude={"id"})
+                    except ValidationError as e:
+                        reject(row, "; ".join(
+                            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                        ))
+                        continue
+                    
+                    accepted += 1
+                    batch[device_name_key(var["deviceName"])] = var
+                    if len(batch) >= BULK_BATCH_SIZE:
+                        flush()
+            except UploadParseError as e:
+                # Nothing read yet: the file is simply invalid
+                if not accepted and not rejected:
+                    raise
+                aborted = str(e)
+                reject(last_row + 1, aborted)
+            if batch:
+                flush()
+        finally:
+            if accepted:
+                self._changed(collection)
+    
+        written = counts["inserted"] + counts["updated"] + counts["unchanged"]
+        logger.info(
+            f"Uploaded {written} variables ({counts['inserted']} added, "
+            f"{counts['updated']} updated), {rejected} rows rejected"
+        )
+        message = (
+            f"Successfully uploaded {written} variables "
+            f"({counts['inserted']} added, {counts['updated']} updated)."
+        )
+        if rejected:
+            message += f" {rejected} row(s) were rejected."
+        if aborted:
+            message += f" The rest of the file could not be read: {aborted}"
+        return {
+            "status": "partial" if rejected else "ok",
+            "message": message,
+            **counts,
+            "rejected": rejected,
+            "errors": errors,
+        }
+    
+    def _meta(self, collection):
+        """Companion collection holding the variables table's write counter."""
+        return collection.database[f"{collection.name}_meta"]
+    
+    def _changed(self, collection):
+        """
+        Record a write to the variables table.
+        
+        Bumps the stored version (so ETags change for every worker) and
+        invalidates this process's device registry. `epoch` is set once, so a
+        recreated counter never repeats an old ETag.
+        """
+        try:
+            self._meta(collection).update_one(
+                {"_id": VERSION_DOC_ID},
+                {"$inc": {"version": 1}, "$setOnInsert": {"epoch": str(ObjectId())}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.error(f"Could not bump variables version: {e}")
+        device_registry.invalidate()
+    
+    def _by_key(self, variables: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Index variable documents by deviceNameKey (dropping Mongo-internal fields)."""
+        docs: Dict[str, Dict[str, Any]] = {}
+        for var in variables:
+            doc = {k: v for k, v in var.items() if k not in ("_id", "deviceNameKey")}
+            doc["deviceName"] = str(doc["deviceName"]).strip()
+            docs[device_name_key(doc["deviceName"])] = doc
+        return docs
+    
+    def _bulk_upsert(
+        self, collection, docs: Dict[str, Dict[str, Any]], extra_ops: List = None, action: str = "saving"
+    ) -> Dict[str, int]:
+        """
+        Upsert `docs` (keyed by deviceNameKey) with unordered bulk writes.
+        
+        Args:
+            collection: Variables collection
+            docs: Variable documents keyed by deviceNameKey
+            extra_ops: Operations to run in the same bulk write (e.g. deletes)
+            action: Verb used in error messages ("saving", "uploading")
+        
+        Returns:
+            inserted/updated/unchanged/deleted counts
+        
+        Raises:
+            VariablesServiceError: If database operation fails
+        """
+        ops = list(extra_ops or [])
+        ops.extend(
+            UpdateOne({"deviceNameKey": key}, {"$set": {**doc, "deviceNameKey": key}}, upsert=True)
+            for key, doc in docs.items()
+        )
+        
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        
+        def add(inserted: int, matched: int, modified: int, deleted: int):
+            counts["inserted"] += inserted
+            counts["updated"] += modified
+            counts["unchanged"] += matched - modified
+            counts["deleted"] += deleted
+        
+        try:
+            for i in range(0, len(ops), BULK_BATCH_SIZE):
+                result = collection.bulk_write(ops[i:i + BULK_BATCH_SIZE], ordered=False)
+                add(result.upserted_count, result.matched_count, result.modified_count, result.deleted_count)
+            return counts
             
+        except BulkWriteError as e:
+            details = e.details
+            add(details.get("nUpserted", 0), details.get("nMatched", 0),
+                details.get("nModified", 0), details.get("nRemoved", 0))
+            failed = len(details.get("writeErrors", []))
+            logger.error(f"Bulk write failed for {failed} variables: {details.get('writeErrors', [])[:3]}")
+            raise VariablesServiceError(
+                f"Database error: {failed} variable(s) could not be saved "
+                f"({counts['inserted']} added, {counts['updated']} updated, {counts['deleted']} deleted)"
+            )
         except PyMongoError as e:
-            logger.error(f"Database error uploading variables: {e}")
-            raise VariablesServiceError("Database error while uploading variables")
+            logger.error(f"Database error writing variables: {e}")
+            raise VariablesServiceError(f"Database error while {action} variables")
 
 
 # Service instance
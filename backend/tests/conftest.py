@@ -0,0 +1,228 @@
+"""
+Test configuration.
+
+Backend modules import each other as top-level modules (`from validator import
+...`), as main.py runs them; the backend directory is put on the path here.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import importlib
+import re
+from types import SimpleNamespace
+
+import pytest
+from pymongo import DeleteMany, UpdateOne
+
+
+MISSING = object()
+
+
+def _get(doc, path):
+    """Value at a dotted path ("ids.1" indexes into arrays), or MISSING."""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return MISSING
+    return value
+
+
+def _expr(doc, expr):
+    """Evaluate the subset of aggregation expressions the services use."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_expr(doc, e) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    (op, arg), = expr.items()
+    if op == "$trim":
+        return _expr(doc, arg["input"]).strip()
+    arg = _expr(doc, arg)
+    return {
+        "$toLower": lambda: arg.lower(),
+        "$size": lambda: len(arg),
+        "$arrayElemAt": lambda: arg[0][arg[1]],
+        "$slice": lambda: arg[0][arg[1]:arg[1] + arg[2]],
+    }[op]()
+
+
+def _matches(doc, filters):
+    """Evaluate the subset of MongoDB query operators the services use."""
+    for key, cond in filters.items():
+        if key == "$and":
+            if not all(_matches(doc, f) for f in cond):
+                return False
+            continue
+        found = _get(doc, key)
+        value = None if found is MISSING else found
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            ok = {
+                "$regex": lambda: isinstance(value, str) and re.search(arg, value) is not None,
+                "$gt": lambda: value is not None and value > arg,
+                "$in": lambda: value in arg,
+                "$nin": lambda: value not in arg,
+                "$exists": lambda: (found is not MISSING) == arg,
+                "$type": lambda: isinstance(value, str),
+            }[op]()
+            if not ok:
+                return False
+    return True
+
+
+def _project(doc, projection):
+    if any(v for k, v in projection.items() if k != "_id"):
+        return {k: doc[k] for k, v in projection.items() if v and k in doc}
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for a pymongo collection (only what the services call).
+
+    `database` is shared between collections created from one FakeDatabase,
+    so a second "process" can write the same data. `writes` counts bulk_write
+    calls.
+    """
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+        self.writes = 0
+        self.indexes = {}
+        self._next_id = 1
+
+    def insert(self, **doc):
+        doc.setdefault("_id", self._next_id)
+        self._next_id += 1
+        self.docs.append(doc)
+
+    def find(self, filters=None, projection=None):
+        found = [doc for doc in self.docs if _matches(doc, filters or {})]
+        return FakeCursor([_project(doc, projection or {}) for doc in found])
+
+    def find_one(self, filters):
+        return next(iter(self.find(filters)), None)
+
+    def count_documents(self, filters):
+        return len(self.find(filters).docs)
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def update_one(self, filters, update, upsert=False):
+        doc = self.find_one(filters)
+        if doc is not None:
+            doc = next(d for d in self.docs if d["_id"] == doc["_id"])
+        elif upsert:
+            self.insert(**{k: v for k, v in filters.items() if not isinstance(v, dict)})
+            doc = self.docs[-1]
+            doc.update(update.get("$setOnInsert", {}))
+        else:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        doc.update(update.get("$set", {}))
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+        return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+
+    def update_many(self, filters, pipeline):
+        matched = [doc for doc in self.docs if _matches(doc, filters)]
+        for doc in matched:
+            for stage in pipeline:
+                doc.update({k: _expr(doc, e) for k, e in stage["$set"].items()})
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    def create_index(self, key, name=None, **options):
+        self.indexes[name or key] = options
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        docs = [dict(doc) for doc in self.docs]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [doc for doc in docs if _matches(doc, arg)]
+            elif op == "$sort":
+                for key, direction in reversed(list(arg.items())):
+                    docs.sort(key=lambda d: d[key], reverse=direction < 0)
+            elif op == "$group":
+                groups = {}
+                for doc in docs:
+                    group = groups.setdefault(_expr(doc, arg["_id"]), {})
+                    for field, acc in arg.items():
+                        if field != "_id":
+                            group.setdefault(field, []).append(_expr(doc, acc["$push"]))
+                docs = [{"_id": key, **fields} for key, fields in groups.items()]
+            elif op == "$project":
+                docs = [{"_id": doc["_id"], **{k: _expr(doc, e) for k, e in arg.items()}} for doc in docs]
+        return iter(docs)
+
+    def delete_many(self, filters):
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not _matches(doc, filters)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    def bulk_write(self, ops, ordered=True):
+        self.writes += 1
+        counts = dict(upserted_count=0, matched_count=0, modified_count=0, deleted_count=0)
+        for op in ops:
+            if isinstance(op, DeleteMany):
+                counts["deleted_count"] += self.delete_many(op._filter).deleted_count
+            elif isinstance(op, UpdateOne):
+                doc = self.find_one(op._filter)
+                if doc is None:
+                    counts["upserted_count"] += 1
+                else:
+                    counts["matched_count"] += 1
+                    new = dict(doc, **op._doc["$set"])
+                    counts["modified_count"] += new != doc
+                self.update_one(op._filter, op._doc, upsert=op._upsert)
+        return SimpleNamespace(**counts)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(self, name)
+        return self[name]
+
+
+@pytest.fixture
+def variables_db(monkeypatch):
+    """An empty fake variables collection wired into the variables service."""
+    # services re-exports the `variables_service` instance under the module's name
+    variables_service = importlib.import_module("services.variables_service")
+
+    collection = FakeDatabase()["variables"]
+    monkeypatch.setattr(variables_service, "get_collection", lambda: collection)
+    return collection
@@ -0,0 +1,211 @@
+"""
+Code generation service tests with a scripted LLM: request coalescing and the
+generation cache. The AI stack and the device table are replaced by fakes.
+"""
+
+import asyncio
+import importlib
+import json
+import threading
+
+import pytest
+
+from services import CodeGenerationError, CodeGenerationService, GenerationCache
+
+service_module = importlib.import_module("services.code_generation_service")
+
+DEVICES = {"fan": "BOOL", "motion_detected": "BOOL"}
+IR = [{"program": {
+    "name": "Main",
+    "declarations": [{"type": "VAR", "name": "fan", "datatype": "BOOL"},
+                     {"type": "VAR", "name": "motion_detected", "datatype": "BOOL"}],
+    "statements": [{"type": "assignment", "target": "fan", "expression": "motion_detected"}],
+}}]
+
+
+class ScriptedLLM:
+    """Streams `response` for every generation; holds each call until `release` is set."""
+
+    def __init__(self, response=json.dumps(IR)):
+        self.response = response
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    async def astream(self, narrative, *args):
+        self.calls += 1
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        if isinstance(self.response, Exception):
+            raise self.response
+        yield "token", self.response
+        yield "response", self.response
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = ScriptedLLM()
+    monkeypatch.setattr(service_module, "astream_generate_IEC_JSON", llm.astream)
+    monkeypatch.setattr(service_module, "astream_regenerate_IEC_JSON", llm.astream)
+
+    async def aload_device_variables():
+        return dict(DEVICES)
+
+    monkeypatch.setattr(service_module, "aload_device_variables", aload_device_variables)
+    return llm
+
+
+def make_service(**kwargs):
+    return CodeGenerationService(fast_path=False, max_regeneration_attempts=0, **kwargs)
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+# ---------------- Coalescing ----------------
+
+def test_plain_and_streamed_requests_share_one_run(llm):
+    service = make_service()
+    llm.release.clear()
+
+    async def main():
+        plain = asyncio.create_task(service.agenerate("Turn on the fan when motion is detected"))
+        streamed = asyncio.create_task(collect(service.agenerate_stream("turn on the fan  when motion is detected.")))
+        await asyncio.sleep(0.05)
+        llm.release.set()
+        return await plain, await streamed
+
+    code, events = asyncio.run(main())
+    assert llm.calls == 1
+    assert [e["event"] for e in events] == ["token", "validation", "result"]
+    assert events[-1]["data"]["code"] == code and "fan := motion_detected;" in code
+    assert service.stats()["coalesced"] == 1 and service.stats()["in_flight"] == 0
+
+
+def test_sync_callers_on_several_threads_share_one_run(llm):
+    service = make_service()
+    llm.release.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.generate("turn on the fan")))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    while service.stats()["coalesced"] < 3:
+        threading.Event().wait(0.01)
+    llm.release.set()
+    for t in threads:
+        t.join()
+    assert llm.calls == 1 and len(set(results)) == 1 and len(results) == 4
+
+
+def test_every_caller_gets_the_error(llm):
+    service = make_service()
+    llm.response = RuntimeError("model unavailable")
+    llm.release.clear()
+
+    async def main():
+        plain = asyncio.create_task(service.agenerate("turn on the fan"))
+        streamed = asyncio.create_task(collect(service.agenerate_stream("turn on the fan")))
+        await asyncio.sleep(0.05)
+        llm.release.set()
+        with pytest.raises(CodeGenerationError, match="model unavailable"):
+            await plain
+        return await streamed
+
+    events = asyncio.run(main())
+    assert llm.calls == 1
+    assert events[-1] == {"event": "error", "data": {
+        "message": "AI generation failed: model unavailable", "validation_error": False,
+    }}
+
+
+def test_a_cancelled_caller_does_not_stop_the_others(llm):
+    service = make_service()
+    llm.release.clear()
+
+    async def main():
+        leaving = asyncio.create_task(service.agenerate("turn on the fan"))
+        staying = asyncio.create_task(service.agenerate("turn on the fan"))
+        await asyncio.sleep(0.05)
+        leaving.cancel()
+        await asyncio.sleep(0.01)
+        llm.release.set()
+        return await staying
+
+    assert "fan := motion_detected;" in asyncio.run(main())
+    assert llm.calls == 1
+
+
+# ---------------- Generation cache ----------------
+
+VOCABULARY = ["turn", "on", "off", "the", "fan", "when", "motion", "is", "detected", "please", "pump"]
+
+
+def bag_of_words(text):
+    words = text.split()
+    return [float(words.count(w)) for w in VOCABULARY]
+
+
+def test_cache_exact_ttl_lru_and_versions(monkeypatch):
+    cache = GenerationCache(max_entries=2, ttl_seconds=60)
+    cache.put("Turn on the fan.", 1, IR)
+    assert cache.get("turn on  the FAN", 1) is IR
+    assert cache.get("turn on the fan", 0) is None      # older table: never served
+    cache.put("turn off the fan", 0, [])                 # nor stored
+    assert cache.get("turn off the fan", 1) is None
+
+    cache.put("a", 1, 1)
+    cache.put("b", 1, 2)                                 # evicts the least recently used
+    assert cache.get("turn on the fan", 1) is None and cache.get("a", 1) == 1
+
+    assert cache.get("a", 2) is None                     # newer table drops everything
+    cache.put("a", 2, 3)
+    assert cache.get("a", 2) == 3
+    assert cache.stats()["evictions"] == 1
+
+    expired = GenerationCache(ttl_seconds=0)
+    expired.put("a", 1, 1)
+    assert expired.get("a", 1) is None
+
+
+def test_cache_similarity_tier_needs_matching_numbers_and_polarity():
+    cache = GenerationCache(similarity_threshold=0.9, embed=bag_of_words)
+    narrative = "turn on the fan when motion is detected"
+    cache.put(narrative, 1, IR, cache.embed_narrative(narrative))
+
+    def similar(text):
+        return cache.get(text, 1) or cache.get_similar(text, 1, cache.embed_narrative(text))
+
+    assert similar("please turn on the fan when motion is detected") is IR
+    assert similar("turn off the fan when motion is detected") is None
+    assert similar("turn on the pump") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_service_serves_repeats_from_the_cache(llm, monkeypatch):
+    registry = type("Registry", (), {"version": 1})()
+    monkeypatch.setattr(service_module, "device_registry", registry)
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return bag_of_words(text)
+
+    service = make_service(cache=GenerationCache(similarity_threshold=0.9, embed=embed))
+    first = service.generate("turn on the fan when motion is detected")
+    assert llm.calls == 1 and len(embedded) == 1
+
+    # exact hit: no embedding, no LLM call
+    events = asyncio.run(collect(service.agenerate_stream("Turn on the fan when motion is detected.")))
+    assert [e["event"] for e in events] == ["cache_hit", "result"]
+    assert events[-1]["data"]["code"] == first and len(embedded) == 1
+
+    # near-identical narrative: embedded once, served by the similarity tier
+    assert service.generate("please turn on the fan when motion is detected") == first
+    assert llm.calls == 1 and len(embedded) == 2
+
+    # the device table changed: generate again
+    registry.version = 2
+    service.generate("turn on the fan when motion is detected")
+    assert llm.calls == 2
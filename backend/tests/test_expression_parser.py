@@ -0,0 +1,135 @@
+"""
+Expression parser tests: operator precedence, syntax errors, and agreement
+with the regex-splitting validator it replaced.
+
+The expected types and condition results for well-formed expressions were
+produced by the previous validator; malformed expressions must still be
+rejected, now with a message that says what is wrong.
+"""
+
+import re
+
+import pytest
+
+from validator import (
+    Binary, Call, Literal, Name, Unary, ExprSyntaxError,
+    compile_expr, infer_expr_type, validate_condition_expr,
+)
+
+VAR_TYPES = {
+    "temp": "REAL", "count": "INT", "fan": "BOOL", "door": "BOOL", "name": "STRING",
+    "t": "TIME", "arr": "ARRAY[1..5] OF INT", "x": "INT",
+}
+FUNCTIONS = {"ADD1": {"inputs": ["x"], "inputTypes": ["INT"], "returnType": "INT"}}
+FB_DEFS = {}
+
+
+def shape(node) -> str:
+    """Fully parenthesized form of an AST, showing how operators were grouped."""
+    if isinstance(node, Binary):
+        return f"({shape(node.left)} {node.op} {shape(node.right)})"
+    if isinstance(node, Unary):
+        return f"({node.op} {shape(node.operand)})"
+    if isinstance(node, Call):
+        return f"{node.name}({', '.join(shape(a) for a in node.args)})"
+    assert isinstance(node, (Name, Literal))
+    return node.src
+
+
+@pytest.mark.parametrize("expr, grouped", [
+    ("a OR b AND c", "(a OR (b AND c))"),
+    ("a AND b OR c", "((a AND b) OR c)"),
+    ("NOT a AND b", "((NOT a) AND b)"),
+    ("NOT (a OR b)", "(NOT (a OR b))"),
+    ("a + b * c", "(a + (b * c))"),
+    ("a * b + c", "((a * b) + c)"),
+    ("a - b - c", "((a - b) - c)"),
+    ("a / b * c", "((a / b) * c)"),
+    ("(a + b) * c", "((a + b) * c)"),
+    ("a + b > c AND d", "(((a + b) > c) AND d)"),
+    ("a > 1 OR b < 2 AND c = 3", "((a > 1) OR ((b < 2) AND (c = 3)))"),
+    ("x>=-1", "(x >= (- 1))"),
+    ("a && b || !c", "((a AND b) OR (NOT c))"),
+    ("a == 1", "(a = 1)"),
+    ("a != 1", "(a <> 1)"),
+    ("F(a, b + 1) = 2", "(F(a, (b + 1)) = 2)"),
+    ("arr[i + 1].field > 0", "(arr[i + 1].field > 0)"),
+])
+def test_precedence(expr, grouped):
+    assert shape(compile_expr(expr)) == grouped
+
+
+def test_literals_are_typed():
+    node = compile_expr("t > T#5s")
+    assert isinstance(node.right, Literal) and node.right.dtype == "TIME"
+    assert compile_expr("TRUE").dtype == "BOOL"
+
+
+def test_compiled_ast_is_cached():
+    assert compile_expr("count + 2 > 3") is compile_expr("count + 2 > 3")
+
+
+@pytest.mark.parametrize("expr, message", [
+    ("", "Empty expression"),
+    ("temp > 30 OR", "Unexpected token 'end of expression'"),
+    ("temp >", "Unexpected token 'end of expression'"),
+    ("AND fan", "Unexpected token 'AND'"),
+    ("(temp > 3", "Expected ')' but found 'end of expression'"),
+    ("temp > 3)", "Unexpected token ')'"),
+    ("count MOD 2", "Unexpected token 'MOD'"),
+    ("temp $ 3", "Unexpected character '$'"),
+    ("a.", "Expected field name after '.'"),
+    ("a ? b : c", "Ternary operator"),
+])
+def test_syntax_errors(expr, message):
+    with pytest.raises(ExprSyntaxError, match=re.escape(message)):
+        compile_expr(expr)
+
+
+@pytest.mark.parametrize("expr", ["temp > 30 OR", "temp >", "AND fan", "(temp > 3", "temp > 3)", "count MOD 2"])
+def test_malformed_conditions_are_rejected(expr):
+    # The previous validator rejected these too, with a less specific message
+    assert infer_expr_type(expr, VAR_TYPES, FUNCTIONS, FB_DEFS) is None
+    ok, message = validate_condition_expr(expr, VAR_TYPES, FUNCTIONS, FB_DEFS)
+    assert not ok
+    assert message.startswith(f"Invalid expression '{expr}'")
+
+
+@pytest.mark.parametrize("expr, inferred, condition", [
+    ("temp > 30 AND fan", "BOOL", (True, "")),
+    ("fan OR door AND temp > 5", "BOOL", (True, "")),
+    ("NOT fan AND door", "BOOL", (True, "")),
+    ("NOT (fan OR door)", "BOOL", (True, "")),
+    ("fan AND NOT door OR temp < 3", "BOOL", (True, "")),
+    ("count + 2 * 3", "INT", (False, "Condition must be BOOL")),
+    ("(count + 2) * 3", "INT", (False, "Condition must be BOOL")),
+    ("1 + 2 + 3 * 4 - 5", "INT", (False, "Condition must be BOOL")),
+    ("count * temp", "REAL", (False, "Condition must be BOOL")),
+    ("count / 2", "INT", (False, "Condition must be BOOL")),
+    ("count - -1", "INT", (False, "Condition must be BOOL")),
+    ("arr[2] + 1", "INT", (False, "Condition must be BOOL")),
+    ("fan = TRUE", "BOOL", (True, "")),
+    ("count = 1.5", "BOOL", (True, "")),
+    ("name = 'abc'", "BOOL", (True, "")),
+    ("t > T#5s", "BOOL", (True, "")),
+    ("ADD1(count) > 3", "BOOL", (True, "")),
+    ("count >= 10 AND count <= 20", "BOOL", (True, "")),
+    ("fan && door", "BOOL", (True, "")),
+    ("fan || !door", "BOOL", (True, "")),
+    ("temp == 3.0", "BOOL", (True, "")),
+    ("temp != 2", "BOOL", (True, "")),
+    ("temp + name", None, (False, "Condition must be BOOL")),
+    ("count > 2 AND name", None, (False, "Condition must be BOOL")),
+    ("count > 1 > 2", None, (False, "Incompatible types for comparison: BOOL > INT")),
+    ("unknown_var > 1", None, (False, "STRING comparison requires a quoted string literal")),
+    ("a ? b : c", None, (False, "Ternary operator ('?:') not allowed in expressions/conditions")),
+])
+def test_matches_previous_validator(expr, inferred, condition):
+    assert infer_expr_type(expr, VAR_TYPES, FUNCTIONS, FB_DEFS) == inferred
+    assert validate_condition_expr(expr, VAR_TYPES, FUNCTIONS, FB_DEFS) == condition
+
+
+def test_unspaced_operators_parse():
+    # The previous validator could not split these
+    assert validate_condition_expr("x>=-1", VAR_TYPES, FUNCTIONS, FB_DEFS) == (True, "")
+    assert infer_expr_type("x*2+1", VAR_TYPES, FUNCTIONS, FB_DEFS) == "INT"
@@ -0,0 +1,90 @@
+"""
+Fast path tests: narratives each template should answer (with the IR and
+confidence expected), and narratives that must be left to the LLM.
+"""
+
+import pytest
+
+from fast_path import FastPathMatch, match_narrative
+from validator import validate_diagnostics
+
+DEVICES = {
+    "fan": "BOOL", "tv": "BOOL", "alarm": "BOOL", "motion_detected": "BOOL", "Living_Room_Light": "BOOL",
+    "temperature": "REAL", "humidity": "INT", "Fan2": "INT", "pump1": "BOOL", "pump2": "BOOL",
+    "wake_time": "TIME_OF_DAY", "delay": "TIME",
+}
+
+
+def assign(target, expression):
+    return {"type": "assignment", "target": target, "expression": expression}
+
+
+@pytest.mark.parametrize("narrative, template, confidence, statement", [
+    ("turn on the fan", "switch", 1.0, assign("fan", "TRUE")),
+    ("Switch TV off.", "switch", 0.95, assign("tv", "FALSE")),
+    ("turn the alarm on", "switch", 1.0, assign("alarm", "TRUE")),
+    ("deactivate the alarm", "switch", 1.0, assign("alarm", "FALSE")),
+    ("turn on the living room light", "switch", 0.95, assign("Living_Room_Light", "TRUE")),
+    ("switch off the alarn", "switch", 0.8, assign("alarm", "FALSE")),
+    ("set Fan2 to 3", "set", 1.0, assign("Fan2", "3")),
+    ("set wake_time to 7:30", "set", 1.0, assign("wake_time", "TOD#07:30:00")),
+    ("set delay to 0:05", "set", 1.0, assign("delay", "T#0H5M")),
+    ("turn on the tv if motion_detected = true else keep it off", "conditional", 1.0, {
+        "type": "if", "condition": "motion_detected = TRUE",
+        "then": [assign("tv", "TRUE")], "else": [assign("tv", "FALSE")],
+    }),
+    ("keep the fan on if humidity < 40, otherwise turn it off", "conditional", 1.0, {
+        "type": "if", "condition": "humidity < 40",
+        "then": [assign("fan", "TRUE")], "else": [assign("fan", "FALSE")],
+    }),
+    ("if motion_detected turn on tv else off", "conditional", 1.0, {
+        "type": "if", "condition": "motion_detected",
+        "then": [assign("tv", "TRUE")], "else": [assign("tv", "FALSE")],
+    }),
+    ("turn on the fan when temperature is above 30", "conditional", 1.0, {
+        "type": "if", "condition": "temperature > 30", "then": [assign("fan", "TRUE")],
+    }),
+    ("turn off the fan if the temperature is below 18.5", "conditional", 1.0, {
+        "type": "if", "condition": "temperature < 18.5", "then": [assign("fan", "FALSE")],
+    }),
+])
+def test_matches(narrative, template, confidence, statement):
+    matched = match_narrative(narrative, DEVICES)
+    assert isinstance(matched, FastPathMatch)
+    assert (matched.template, matched.confidence) == (template, confidence)
+    prog = matched.intermediate[0]["program"]
+    assert prog["statements"] == [statement]
+    assert validate_diagnostics(matched.intermediate, DEVICES, workers=1) == []
+
+
+def test_declares_only_the_devices_used():
+    matched = match_narrative("turn on the tv if motion_detected else keep it off", DEVICES)
+    prog = matched.intermediate[0]["program"]
+    assert prog["name"] == "TvControl"
+    assert prog["declarations"] == [
+        {"type": "VAR", "name": "tv", "datatype": "BOOL"},
+        {"type": "VAR", "name": "motion_detected", "datatype": "BOOL"},
+    ]
+
+
+@pytest.mark.parametrize("narrative", [
+    "",
+    "make coffee",
+    "turn on the heater",                        # unknown device
+    "turn on the fann",                          # as near to fan as to Fan2
+    "turn on pump3",                             # as near to pump1 as to pump2
+    "turn on teh alarm",                         # "teh alarm" is not a device
+    "turn on Fan2",                              # INT device is not on/off
+    "set tv to 3",                               # BOOL device set to a number
+    "set Fan2 to high",                          # not an INT value
+    "if humidity turn on fan",                   # INT device as a condition
+    "turn on the fan and the tv",                # two actions
+    "turn on the fan if the door is open",       # unknown condition device
+    "turn on the fan" + " please" * 40,          # longer than any template
+])
+def test_leaves_other_narratives_to_the_llm(narrative):
+    assert match_narrative(narrative, DEVICES) is None
+
+
+def test_no_device_table():
+    assert match_narrative("turn on the fan", {}) is None
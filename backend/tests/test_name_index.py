@@ -0,0 +1,152 @@
+"""
+Name index tests: trigram-filtered lookups must return exactly what a
+brute-force scan over every name with a plain Levenshtein distance returns.
+"""
+
+import random
+import threading
+
+import pytest
+
+from name_index import NameIndex, edit_distance, index_for, max_distance_for, name_key, suggest
+
+ROOMS = ["Bedroom", "Kitchen", "Living_Room", "Garage", "Hall", "Office", "Attic"]
+THINGS = ["Fan", "Light", "Heater", "Pump", "Valve", "Door", "Alarm", "Temp"]
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def brute_force(names, query, limit=5, max_distance=None):
+    key = name_key(query)
+    if not key:
+        return []
+    if max_distance is None:
+        max_distance = max_distance_for(key)
+    # Keys whose length differs by more than max_distance cannot be within it
+    distances = {name: levenshtein(key, name_key(name)) for name in names
+                 if abs(len(name_key(name)) - len(key)) <= max_distance}
+    best = min(distances.values(), default=None)
+    if best is None or best > max_distance:
+        return []
+    return [(name, best) for name in sorted(n for n, d in distances.items() if d == best)][:limit]
+
+
+def typo(rng: random.Random, name: str) -> str:
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(name))
+        op = rng.randrange(4)
+        if op == 0:
+            name = name[:i] + name[i + 1:] or name
+        elif op == 1:
+            name = name[:i] + rng.choice("abcxyz_ ") + name[i:]
+        elif op == 2:
+            name = name[:i] + rng.choice("abcxyz") + name[i + 1:]
+        else:
+            name = name[:i] + name[i].swapcase() + name[i + 1:]
+    return name
+
+
+@pytest.fixture(scope="module")
+def names():
+    rng = random.Random(7)
+    generated = {f"{rng.choice(ROOMS)}{rng.randint(1, 30)}_{rng.choice(THINGS)}" for _ in range(500)}
+    return sorted(generated | {"fan", "Fan", "tv", "aaaa", "a"})
+
+
+def test_edit_distance_matches_levenshtein():
+    rng = random.Random(1)
+    alphabet = "abcab_"
+    for _ in range(2000):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert edit_distance(a, b) == levenshtein(a, b), (a, b)
+
+
+def test_lookup_matches_brute_force(names):
+    index = NameIndex(names)
+    rng = random.Random(3)
+    queries = [typo(rng, rng.choice(names)) for _ in range(120)]
+    queries += ["bedroom fan", "KITCHEN-1-light", "xyz", "aaa", "aaaaa", "tv", "t", "fna", ""]
+    for query in queries:
+        assert index.lookup(query) == brute_force(names, query), query
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3, 4])
+def test_lookup_max_distance(names, max_distance):
+    index = NameIndex(names)
+    rng = random.Random(max_distance)
+    for _ in range(50):
+        query = typo(rng, rng.choice(names))
+        expected = brute_force(names, query, limit=3, max_distance=max_distance)
+        assert index.lookup(query, limit=3, max_distance=max_distance) == expected, query
+
+
+def test_lookup_after_sync_matches_brute_force(names):
+    index = NameIndex(names)
+    rng = random.Random(5)
+    current = list(names)
+    for _ in range(5):
+        current = rng.sample(current, len(current) - 60) + [f"New{rng.randint(0, 999)}_Device" for _ in range(30)]
+        index.sync(current)
+        assert len(index) == len(set(current))
+        for _ in range(25):
+            query = typo(rng, rng.choice(current))
+            assert index.lookup(query) == brute_force(set(current), query), query
+
+
+def test_exact_key_ignores_case_and_separators():
+    index = NameIndex(["Living_Room_Light", "fan", "Fan"])
+    assert index.lookup("living room light") == [("Living_Room_Light", 0)]
+    assert index.lookup("FAN") == [("Fan", 0), ("fan", 0)]
+
+
+def test_best():
+    index = NameIndex(["fan", "Fan", "Fan2", "tv", "pump1", "pump2"])
+    assert index.best("Fan") == "Fan"          # case variants: the exact spelling wins
+    assert index.best("FAN") is None           # otherwise ambiguous
+    assert index.best("tvv") == "tv"
+    assert index.best("pump3") is None         # pump1 and pump2 are equally near
+    assert index.best("heater") is None
+
+
+def test_suggest_excludes_the_name_itself():
+    table = {"Fan": "BOOL", "Fan2": "INT", "fan": "BOOL"}
+    assert suggest("Fan", table) == ["fan"]
+    assert suggest("Fann", table) == ["Fan", "Fan2", "fan"]
+
+
+def test_index_for_reuses_and_never_mutates_a_published_index():
+    first = {"pump_1": "BOOL", "pump_2": "BOOL"}
+    second = {"pump_2": "BOOL", "pump_3": "BOOL"}
+    index = index_for(first)
+    assert index_for(first) is index
+    other = index_for(second)
+    assert other is not index
+    assert index.lookup("pump_1") == [("pump_1", 0)]
+    assert other.lookup("pump_1") == [("pump_2", 1), ("pump_3", 1)]
+
+
+def test_index_for_concurrent_tables_return_own_names():
+    tables = [{f"pump_{k}": "BOOL" for k in range(start, start + 100)} for start in (0, 50)]
+    foreign = []
+
+    def look(table):
+        for _ in range(200):
+            for name, _ in index_for(table).lookup("pump_12x") + index_for(table).lookup("pump_140"):
+                if name not in table:
+                    foreign.append(name)
+
+    threads = [threading.Thread(target=look, args=(tables[i % 2],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert foreign == []
@@ -0,0 +1,88 @@
+"""
+Pass 2 fan-out: the shared process pool must give the same diagnostics, in the
+same order, as sequential validation, and stay one warm pool across callers.
+"""
+
+import threading
+
+import pytest
+
+import validator
+from validator import default_workers, validate_diagnostics
+
+DEVICES = {"fan": "BOOL", "temperature": "REAL"}
+
+
+def big_ir(blocks):
+    ir = []
+    for i in range(blocks):
+        statements = [{"type": "assignment", "target": "fan", "expression": "temperature > 30.0"}]
+        if i % 3 == 0:
+            statements.append({"type": "assignment", "target": "fan", "expression": f"missing{i} AND fan"})
+        if i % 5 == 0:
+            statements.append({"type": "assignment", "target": "temperature", "expression": "fan +"})
+        ir.append({"program": {
+            "name": f"P{i}",
+            "declarations": [{"type": "VAR", "name": "fan", "datatype": "BOOL"},
+                             {"type": "VAR", "name": "temperature", "datatype": "REAL"}],
+            "statements": statements,
+        }})
+    return ir
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    def set_cpus(n):
+        monkeypatch.setattr(validator, "usable_cpus", lambda: n)
+    return set_cpus
+
+
+def test_default_workers(cpus, monkeypatch):
+    cpus(8)
+    monkeypatch.setattr(validator, "_pool", None)
+    assert default_workers(validator.PARALLEL_MIN_BLOCKS - 1) == 1
+    assert default_workers(validator.PARALLEL_COLD_MIN_BLOCKS - 1) == 1
+    assert default_workers(validator.PARALLEL_COLD_MIN_BLOCKS) == 8
+
+    monkeypatch.setattr(validator, "_pool", object())
+    assert default_workers(validator.PARALLEL_MIN_BLOCKS) == 8
+    cpus(1)
+    assert default_workers(10_000) == 1
+
+
+def test_parallel_matches_sequential_and_reuses_one_pool(cpus):
+    cpus(2)
+    ir = big_ir(40)
+    expected = validate_diagnostics(ir, DEVICES, workers=1)
+    assert len(expected) == 14 + 8
+
+    assert validate_diagnostics(ir, DEVICES, workers=2) == expected
+    pool = validator._pool
+    assert pool is not None
+
+    # Other worker counts and concurrent callers share the same warm pool
+    results = []
+    threads = [threading.Thread(target=lambda w=w: results.append(validate_diagnostics(ir, DEVICES, workers=w)))
+               for w in (2, 3, 2, 16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [expected] * 4
+    assert validator._pool is pool
+
+
+def test_broken_pool_falls_back_and_is_replaced(monkeypatch):
+    class Broken:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    broken = Broken()
+    monkeypatch.setattr(validator, "_pool", broken)
+    monkeypatch.setattr(validator, "usable_cpus", lambda: 4)
+    ir = big_ir(40)
+    assert validate_diagnostics(ir, DEVICES, workers=4) == validate_diagnostics(ir, DEVICES, workers=1)
+    assert validator._pool is None
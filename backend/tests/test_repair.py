@@ -0,0 +1,136 @@
+"""
+Local repair tests: each deterministic fix on its own, and repaired IR that
+passes validation.
+"""
+
+import copy
+
+from repair import repair_ir, rewrite_expr
+from validator import validate_diagnostics
+
+DEVICES = {
+    "Living_Room_Light": "BOOL", "temperature": "REAL", "Fan2": "INT",
+    "motion_detected": "BOOL", "tv": "BOOL", "pump1": "BOOL", "pump2": "BOOL",
+}
+
+
+def program(declarations, statements):
+    return [{"program": {"name": "P", "declarations": declarations, "statements": statements}}]
+
+
+def var(name, datatype="BOOL"):
+    return {"type": "VAR", "name": name, "datatype": datatype}
+
+
+def assign(target, expression):
+    return {"type": "assignment", "target": target, "expression": expression}
+
+
+def test_repairs_a_broken_program_until_it_validates():
+    ir = program(
+        [var("living room light", "bool"), var("temprature", "INT"), var("Living_Room_Light")],
+        [
+            {"type": "if", "condition": "temprature > 30 && !motion_detected",
+             "then": [assign("living room light", "true")],
+             "else": [assign("TV", "false")]},
+            assign("fan2", "3"),
+        ],
+    )
+    original = copy.deepcopy(ir)
+    assert validate_diagnostics(ir, DEVICES, workers=1)
+
+    repaired, fixes = repair_ir(ir, DEVICES)
+
+    assert ir == original  # the input is not modified
+    assert validate_diagnostics(repaired, DEVICES, workers=1) == []
+    prog = repaired[0]["program"]
+    assert [(d["name"], d["datatype"]) for d in prog["declarations"]] == [
+        ("Living_Room_Light", "BOOL"), ("temperature", "REAL"),
+        ("motion_detected", "BOOL"), ("tv", "BOOL"), ("Fan2", "INT"),
+    ]
+    assert prog["statements"] == [
+        {"type": "if", "condition": "temperature > 30 AND NOT motion_detected",
+         "then": [assign("Living_Room_Light", "TRUE")],
+         "else": [assign("tv", "FALSE")]},
+        assign("Fan2", "3"),
+    ]
+    assert fixes == [
+        "Renamed 'living room light' to device 'Living_Room_Light'",
+        "Set datatype of 'Living_Room_Light' to BOOL (was bool)",
+        "Renamed 'temprature' to device 'temperature'",
+        "Set datatype of 'temperature' to REAL (was INT)",
+        "Removed duplicate declaration of 'Living_Room_Light'",
+        "Declared device 'motion_detected' used as 'motion_detected'",
+        "Declared device 'tv' used as 'TV'",
+        "Declared device 'Fan2' used as 'fan2'",
+    ]
+
+
+def test_renames_references_to_a_declared_name():
+    repaired, fixes = repair_ir(program([var("tv")], [assign("TV", "NOT tv")]), DEVICES)
+    assert repaired[0]["program"]["statements"] == [assign("tv", "NOT tv")]
+    assert fixes == ["Renamed 'TV' to declared 'tv'"]
+
+
+def test_ambiguous_and_unknown_names_are_left_alone():
+    ir = program([var("pump3")], [assign("pump3", "TRUE"), assign("coffee_maker", "TRUE")])
+    repaired, fixes = repair_ir(ir, DEVICES)
+    assert repaired == ir  # pump3 is as near to pump1 as to pump2
+    assert fixes == []
+
+
+def test_valid_program_is_unchanged():
+    ir = program([var("tv")], [assign("tv", "motion_detected AND TRUE")])
+    ir[0]["program"]["declarations"].append(var("motion_detected"))
+    assert repair_ir(ir, DEVICES) == (ir, [])
+
+
+def test_operator_only_changes_are_reported():
+    repaired, fixes = repair_ir(program([var("tv")], [assign("tv", "tv == true || false")]), DEVICES)
+    assert repaired[0]["program"]["statements"] == [assign("tv", "tv = TRUE OR FALSE")]
+    assert fixes == ["Normalized operators and literals to IEC 61131-3 form"]
+
+
+def test_function_block_locals_and_function_names_are_not_devices():
+    ir = [
+        {"functionBlock": {"name": "Debounce", "inputs": [var("In")], "outputs": [var("Out")], "locals": [],
+                           "body": [assign("out", "in")]}},
+        {"program": {"name": "P", "declarations": [var("tv"), var("Db", "Debounce")],
+                     "statements": [assign("tv", "Debounce(tv)")]}},
+    ]
+    repaired, fixes = repair_ir(ir, DEVICES)
+    assert repaired[0]["functionBlock"]["body"] == [assign("Out", "In")]
+    assert repaired[1] == ir[1]
+    assert fixes == ["Renamed 'out' to 'Out' in 'Debounce'", "Renamed 'in' to 'In' in 'Debounce'"]
+
+
+def test_rewrite_expr_keeps_member_fields_and_calls():
+    renames = {"timer": "Timer1", "x": "X"}
+    assert rewrite_expr("timer.Q and x != 3 or MAX(x, 2) == 1", renames.get) == "Timer1.Q AND X <> 3 OR MAX(X, 2) = 1"
+    assert rewrite_expr("(broken", renames.get) == "(broken"
+    assert rewrite_expr(5, renames.get) == 5
+
+
+def test_non_ir_input_is_returned_as_is():
+    assert repair_ir({"NO_DEVICE_FOUND": True}, DEVICES) == ({"NO_DEVICE_FOUND": True}, [])
+    assert repair_ir(program([var("tv")], []), {}) == (program([var("tv")], []), [])
+
+
+def test_rewrite_expr_leaves_string_literals_and_spacing_alone():
+    renames = {"fan": "Fan", "display": "Display"}
+    assert rewrite_expr("display = 'Fan  ON & ready!' && fan", renames.get) == "Display = 'Fan  ON & ready!' AND Fan"
+    assert rewrite_expr('fan  ==  "a || !b"', renames.get) == 'Fan  =  "a || !b"'
+    assert rewrite_expr("!fan&&x!=1", renames.get) == "NOT Fan AND x<>1"
+
+    prog = program([var("Display", "STRING"), var("fan")], [assign("Display", "'Fan  ON & ready!'")])
+    repaired, fixes = repair_ir(prog, {"Fan": "BOOL"})
+    assert repaired == program([var("Display", "STRING"), var("Fan")], [assign("Display", "'Fan  ON & ready!'")])
+    assert fixes
+
+
+def test_spaced_operator_expression_is_not_a_device_name():
+    seen = []
+    resolve = lambda name: seen.append(name)
+    rewrite_expr("pump1 AND pump2", resolve)
+    rewrite_expr("pump1 xor pump2", resolve)
+    assert seen == ["pump1", "pump2", "pump1", "pump2"]
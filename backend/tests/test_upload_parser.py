@@ -0,0 +1,117 @@
+"""
+Upload parser tests: rows must come out the same however the file is split
+into read chunks, and bad rows are reported without stopping the file.
+"""
+
+import io
+import json
+
+import pytest
+
+from services import upload_parser
+from services.upload_parser import RowError, UploadParseError, UploadTooLargeError, iter_rows
+
+VARIABLES = [
+    {"deviceName": "fan", "dataType": "BOOL"},
+    {"deviceName": "temp_1", "dataType": "REAL", "range": "-40..125", "MetaData": "say \"hi\", [x]"},
+    {"deviceName": "count", "dataType": "INT", "MetaData": {"scale": 12345.678e-3, "tags": ["a", "b"]}},
+    1234567,
+    "fan",
+    [1, 2],
+    {"deviceName": "ünïcode", "dataType": "STRING", "MetaData": "}{,]["},
+]
+
+
+def rows(data: bytes, fmt: str, **kwargs):
+    return list(iter_rows(io.BytesIO(data), fmt, **kwargs))
+
+
+@pytest.fixture(params=[1, 2, 3, 5, 7, 16, 64 * 1024])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(upload_parser, "CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_json_array_any_chunk_size(chunk_size, indent):
+    data = json.dumps(VARIABLES, indent=indent, ensure_ascii=False).encode("utf-8")
+    assert rows(data, "json") == list(enumerate(VARIABLES, start=1))
+
+
+def test_json_number_split_across_chunks(chunk_size):
+    # A number ending exactly at a chunk end may continue in the next chunk
+    assert rows(b"[12345678, 9]", "json") == [(1, 12345678), (2, 9)]
+
+
+def test_ndjson_any_chunk_size(chunk_size):
+    data = "\n".join(json.dumps(v, ensure_ascii=False) for v in VARIABLES).encode("utf-8")
+    assert rows(data, "ndjson") == list(enumerate(VARIABLES, start=1))
+
+
+def test_csv_any_chunk_size(chunk_size):
+    data = b'deviceName,dataType,MetaData\nfan,BOOL,"multi\nline, quoted"\n temp ,REAL,\n'
+    assert rows(data, "csv") == [
+        (3, {"deviceName": "fan", "dataType": "BOOL", "MetaData": "multi\nline, quoted"}),
+        (4, {"deviceName": "temp", "dataType": "REAL", "MetaData": ""}),
+    ]
+
+
+def test_empty_json_array():
+    assert rows(b" [ ] ", "json") == []
+
+
+def test_utf8_bom_is_skipped():
+    assert rows(b'\xef\xbb\xbf[{"deviceName": "fan"}]', "json") == [(1, {"deviceName": "fan"})]
+
+
+def test_ndjson_bad_line_is_a_row_error():
+    result = rows(b'{"deviceName": "fan"}\n{bad\n\n"fan"\n', "ndjson")
+    assert result[0] == (1, {"deviceName": "fan"})
+    assert result[1][0] == 2 and isinstance(result[1][1], RowError)
+    assert result[1][1].message.startswith("Invalid JSON")
+    # A string is a value like any other, not an error message
+    assert result[2] == (4, "fan")
+
+
+def test_csv_too_many_columns_is_a_row_error():
+    assert rows(b"deviceName,dataType\nfan,BOOL,extra\ntv,BOOL\n", "csv") == [
+        (2, RowError("Too many columns")),
+        (3, {"deviceName": "tv", "dataType": "BOOL"}),
+    ]
+
+
+def test_broken_json_array_keeps_rows_before_it(chunk_size):
+    parsed = []
+    with pytest.raises(UploadParseError, match="Invalid JSON in item 3"):
+        for row in iter_rows(io.BytesIO(b'[{"a": 1}, 2, {oops}]'), "json"):
+            parsed.append(row)
+    assert parsed == [(1, {"a": 1}), (2, 2)]
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "File is empty"),
+    (b'{"a": 1}', "JSON must be an array"),
+    (b'[{"a": 1}', "JSON array is not closed"),
+    (b'[1 2]', "expected ',' or ']'"),
+    (b'[1] [2]', "Unexpected data after the end"),
+    (b'["\xff"]', "not valid UTF-8"),
+])
+def test_invalid_json_files(data, message):
+    with pytest.raises(UploadParseError, match=message):
+        rows(data, "json")
+
+
+def test_oversized_element(monkeypatch):
+    monkeypatch.setattr(upload_parser, "MAX_ELEMENT_SIZE", 10)
+    with pytest.raises(UploadParseError, match="Item 2 is larger than"):
+        rows(b'[1, "' + b"x" * 100, "json")
+
+
+def test_max_size():
+    with pytest.raises(UploadTooLargeError):
+        rows(json.dumps(VARIABLES).encode(), "json", max_size=20)
+
+
+def test_unknown_format():
+    with pytest.raises(UploadParseError, match="Unsupported upload format"):
+        rows(b"[]", "xml")
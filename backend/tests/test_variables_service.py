@@ -0,0 +1,182 @@
+"""
+Variables service tests against an in-memory collection (see conftest.py).
+"""
+
+import importlib
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from models import Variable
+from services.variables_service import VariablesService, VariablesServiceError, etag_matches
+
+variables_module = importlib.import_module("services.variables_service")
+
+
+@pytest.fixture
+def service():
+    return VariablesService()
+
+
+def add_devices(collection, names, data_type="BOOL"):
+    for name in names:
+        collection.insert(deviceName=name, dataType=data_type, deviceNameKey=name.lower())
+
+
+# ---------------- Paging, projection, ETag ----------------
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('W/"a-1"', True),
+    ('"a-1"', True),
+    ('W/"a-12", W/"a-1"', True),
+    ('W/"a-12"', False),
+    ('W/"a"', False),
+    ("*", True),
+])
+def test_etag_matches_compares_whole_tags(header, expected):
+    assert etag_matches('W/"a-1"', header) is expected
+
+
+def test_cursor_pages_cover_every_match_once(variables_db, service):
+    add_devices(variables_db, [f"Pump{i:02d}" for i in range(25)] + ["fan", "Light"])
+    add_devices(variables_db, ["pump_speed"], "REAL")
+
+    seen, cursor = [], None
+    while True:
+        page = service.query(limit=10, cursor=cursor, prefix="PUMP", data_type="bool")
+        seen.extend(v["deviceName"] for v in page["variables"])
+        assert page["total"] == 25
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"Pump{i:02d}" for i in range(25)]
+
+    assert service.query(limit=5, offset=20, prefix="pump", data_type="BOOL")["variables"][0]["deviceName"] == "Pump20"
+
+
+def test_fields_projection_and_validation(variables_db, service):
+    add_devices(variables_db, ["fan", "Light"])
+    assert service.query(fields=["deviceName"])["variables"] == [{"deviceName": "fan"}, {"deviceName": "Light"}]
+    assert service.query(limit=1, fields=["dataType"])["variables"] == [{"dataType": "BOOL"}]
+    with pytest.raises(ValueError, match="Unknown field"):
+        service.query(fields=["deviceNameKey"])
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        service.query(limit=1, cursor="%%%")
+
+
+def test_etag_follows_the_version_stored_in_the_database(variables_db, service, monkeypatch):
+    first = service.etag("limit=10")
+    assert first == service.etag("limit=10")
+    assert first != service.etag("limit=20")
+
+    # A write by another worker: this process's device registry is not told
+    monkeypatch.setattr(variables_module.device_registry, "invalidate", lambda: None)
+    other = variables_db.database["variables"]
+    assert other is variables_db
+    VariablesService()._changed(other)
+    assert service.etag("limit=10") != first
+
+
+def test_no_etag_without_a_database(monkeypatch, service):
+    monkeypatch.setattr(variables_module, "get_collection", lambda: None)
+    assert service.etag("") is None
+
+
+def test_get_variables_answers_304_until_the_table_changes(variables_db, service):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    add_devices(variables_db, ["fan"])
+    client = TestClient(app)
+    first = client.get("/get-variables", params={"limit": 10})
+    assert first.status_code == 200 and first.json()["variables"] == [{"deviceName": "fan", "dataType": "BOOL"}]
+    etag = first.headers["ETag"]
+
+    assert client.get("/get-variables", params={"limit": 10}, headers={"If-None-Match": etag}).status_code == 304
+    service.upload_from_list([{"deviceName": "Light", "dataType": "BOOL"}])
+    assert client.get("/get-variables", params={"limit": 10}, headers={"If-None-Match": etag}).status_code == 200
+
+
+# ---------------- Bulk writes ----------------
+
+def names(collection):
+    return sorted(doc["deviceName"] for doc in collection.docs)
+
+
+def test_save_all_syncs_in_unordered_batches(variables_db, service, monkeypatch):
+    monkeypatch.setattr(variables_module, "BULK_BATCH_SIZE", 2)
+    for name in ("fan", "Light", "old_pump"):
+        variables_db.insert(deviceName=name, dataType="BOOL", range="", MetaData="", deviceNameKey=name.lower())
+
+    result = service.save_all([
+        Variable(deviceName="FAN", dataType="bool"),
+        Variable(deviceName="Light", dataType="BOOL"),
+        Variable(deviceName="temp", dataType="REAL"),
+    ])
+
+    assert {k: result[k] for k in ("inserted", "updated", "unchanged", "deleted")} == {
+        "inserted": 1, "updated": 1, "unchanged": 1, "deleted": 1,
+    }
+    assert names(variables_db) == ["FAN", "Light", "temp"]
+    assert all(doc["deviceNameKey"] == doc["deviceName"].lower() for doc in variables_db.docs)
+    # one delete + three upserts in batches of two
+    assert variables_db.writes == 2
+
+
+def test_upload_from_list_upserts_case_insensitively(variables_db, service):
+    add_devices(variables_db, ["fan"])
+    result = service.upload_from_list([
+        {"deviceName": " Fan ", "dataType": "BOOL", "_id": "x", "deviceNameKey": "stale"},
+        {"deviceName": "pump", "dataType": "BOOL"},
+        {"deviceName": "PUMP", "dataType": "INT"},
+    ])
+    assert (result["inserted"], result["updated"]) == (1, 1)
+    assert sorted((d["deviceName"], d["dataType"]) for d in variables_db.docs) == [("Fan", "BOOL"), ("PUMP", "INT")]
+
+
+def test_failed_bulk_write_reports_partial_counts_and_still_invalidates(variables_db, service, monkeypatch):
+    def bulk_write(ops, ordered):
+        assert ordered is False
+        raise BulkWriteError({"nUpserted": 1, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                              "writeErrors": [{"index": 1, "errmsg": "duplicate key"}]})
+
+    monkeypatch.setattr(variables_db, "bulk_write", bulk_write)
+    before = service.etag()
+    with pytest.raises(VariablesServiceError, match=r"1 variable\(s\) could not be saved \(1 added"):
+        service.upload_from_list([{"deviceName": "a", "dataType": "BOOL"}, {"deviceName": "b", "dataType": "BOOL"}])
+    assert service.etag() != before
+
+
+# ---------------- Duplicates ----------------
+
+def test_remove_duplicates_keeps_the_oldest_of_each_name(variables_db, service, monkeypatch):
+    monkeypatch.setattr(variables_module, "BULK_BATCH_SIZE", 2)
+    for name in ["fan", "Light", " FAN", "pump", "Fan ", "LIGHT"]:
+        variables_db.insert(deviceName=name, dataType="BOOL")
+    variables_db.insert(deviceName=5, dataType="BOOL")
+
+    report = service.remove_duplicates(dry_run=True)
+    assert report["removed"] == 3
+    assert sorted((g["deviceName"], g["duplicates"]) for g in report["duplicates"]) == [
+        ("Light", ["LIGHT"]), ("fan", [" FAN", "Fan "]),
+    ]
+    assert len(variables_db.docs) == 7
+
+    before = service.etag()
+    result = service.remove_duplicates()
+    assert (result["removed"], result["dry_run"]) == (3, False)
+    assert [doc["deviceName"] for doc in variables_db.docs] == ["fan", "Light", "pump", 5]
+    assert service.etag() != before
+    # the unique index can be built once the duplicates are gone
+    assert variables_module.DEVICE_NAME_KEY_INDEX in variables_db.indexes
+    assert service.remove_duplicates()["removed"] == 0
+
+
+def test_dry_run_report_is_capped_but_the_count_is_exact(variables_db, service, monkeypatch):
+    monkeypatch.setattr(variables_module, "DRY_RUN_REPORT_LIMIT", 2)
+    for i in range(5):
+        variables_db.insert(deviceName=f"d{i}", dataType="BOOL")
+        variables_db.insert(deviceName=f"D{i}", dataType="BOOL")
+    report = service.remove_duplicates(dry_run=True)
+    assert report["removed"] == 5 and len(report["duplicates"]) == 2
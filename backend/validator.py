@@ -7,10 +7,21 @@ Checks syntax, semantics, type compatibility, and device variable matching.
 
 import re
 import json
+import asyncio
 import os
+import pickle
 import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Tuple, Any, Optional
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import List, Dict, Deque, Tuple, Any, Optional, NamedTuple, Union
+
+from name_index import suggest
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -216,6 +227,18 @@ ADD_OPS = ["+", "-"]
 MUL_OPS = ["*", "/"]
 UNARY_OPS = ["NOT", "+", "-"]  
 
+# Binding power of binary operators (higher binds tighter); all are left-associative
+BINARY_PRECEDENCE: Dict[str, int] = {
+    **{op: 1 for op in LOGICAL_OR},
+    **{op: 2 for op in LOGICAL_AND},
+    **{op: 3 for op in COMPARE_OPS},
+    **{op: 4 for op in ADD_OPS},
+    **{op: 5 for op in MUL_OPS},
+}
+
+# Max number of distinct expression strings kept as compiled ASTs
+EXPR_CACHE_SIZE = 4096
+
 
 def normalize_expr(text: str) -> str:
     if text is None:
@@ -239,63 +262,224 @@ def normalize_expr(text: str) -> str:
     e = re.sub(r"\s+", " ", e).strip()
     return e
 
-def strip_parens(expr: str) -> str:
-    e = expr.strip()
-    while e.startswith("(") and e.endswith(")"):
-        depth = 0
-        ok = True
-        for i,ch in enumerate(e):
-            if ch == '(': depth += 1
-            elif ch == ')':
-                depth -= 1
-                if depth == 0 and i != len(e)-1:
-                    ok = False; break
-        if ok: e = e[1:-1].strip()
-        else: break
-    return e
 
+# ---------------- Tokenizer ----------------
+
+RE_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<str>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+      | (?P<typed>[A-Za-z_]\w*\#[A-Za-z0-9_:.+\-]+|\d+\#[0-9A-Fa-f_]+)
+      | (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+      | (?P<ident>[A-Za-z_]\w*)
+      | (?P<op><=|>=|<>|[=<>+\-*/(),\[\].])
+    )""", re.VERBOSE)
+
+WORD_OPS = {"AND", "OR", "NOT"}
 
-def split_top(expr: str, ops: List[str]) -> Optional[Tuple[str, str, str]]:
-    """Split expr at the rightmost top-level operator among ops (token-aware).
-    Returns (left, op, right) or None.
+
+class ExprSyntaxError(ValueError):
+    """Raised when an expression string cannot be parsed."""
+    pass
+
+
+class Token(NamedTuple):
+    kind: str   # "lit", "ident", "op" or "end"
+    value: str
+    start: int
+    end: int
+
+
+def tokenize(e: str) -> List[Token]:
+    """Split a normalized expression into tokens (keywords upper-cased)."""
+    tokens: List[Token] = []
+    pos, n = 0, len(e)
+    while pos < n:
+        m = RE_TOKEN.match(e, pos)
+        if not m:
+            if e[pos:].strip():
+                raise ExprSyntaxError(f"Unexpected character '{e[pos:].lstrip()[0]}'")
+            break
+        kind = m.lastgroup
+        value = m.group(kind)
+        start = m.start(kind)
+        if kind == "ident":
+            U = value.upper()
+            if U in WORD_OPS:
+                kind, value = "op", U
+            elif RE_BOOL.fullmatch(value):
+                kind = "lit"
+        elif kind != "op":
+            kind = "lit"
+        tokens.append(Token(kind, value, start, m.end()))
+        pos = m.end()
+    tokens.append(Token("end", "", n, n))
+    return tokens
+
+
+# ---------------- AST ----------------
+
+@dataclass(frozen=True)
+class Literal:
+    src: str
+    dtype: Optional[str]
+
+
+@dataclass(frozen=True)
+class Name:
+    """Variable reference, possibly with indexing / field access (e.g. arr[1].f)."""
+    src: str
+    base: str
+    path: str
+
+
+@dataclass(frozen=True)
+class Call:
+    src: str
+    name: str
+    args: Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Unary:
+    src: str
+    op: str
+    operand: Any
+
+
+@dataclass(frozen=True)
+class Binary:
+    src: str
+    op: str
+    left: Any
+    right: Any
+
+
+Expr = Union[Literal, Name, Call, Unary, Binary]
+
+
+class ExprParser:
+    """Precedence-climbing parser over the token stream of one expression."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.pos]
+
+    def advance(self) -> Token:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def expect(self, value: str) -> Token:
+        tok = self.advance()
+        if tok.kind != "op" or tok.value != value:
+            raise ExprSyntaxError(f"Expected '{value}' but found '{tok.value or 'end of expression'}'")
+        return tok
+
+    def src(self, start: int) -> str:
+        return self.text[start:self.tokens[self.pos - 1].end]
+
+    def parse(self) -> Expr:
+        if self.peek().kind == "end":
+            raise ExprSyntaxError("Empty expression")
+        node = self.parse_binary(1)
+        tok = self.peek()
+        if tok.kind != "end":
+            raise ExprSyntaxError(f"Unexpected token '{tok.value}'")
+        return node
+
+    def parse_binary(self, min_prec: int) -> Expr:
+        start = self.peek().start
+        left = self.parse_unary()
+        while True:
+            tok = self.peek()
+            prec = BINARY_PRECEDENCE.get(tok.value) if tok.kind == "op" else None
+            if prec is None or prec < min_prec:
+                return left
+            self.advance()
+            right = self.parse_binary(prec + 1)
+            left = Binary(self.src(start), tok.value, left, right)
+
+    def parse_unary(self) -> Expr:
+        tok = self.peek()
+        if tok.kind == "op" and tok.value in UNARY_OPS:
+            self.advance()
+            operand = self.parse_unary()
+            return Unary(self.src(tok.start), tok.value, operand)
+        return self.parse_primary()
+
+    def parse_primary(self) -> Expr:
+        tok = self.advance()
+        if tok.kind == "lit":
+            return Literal(tok.value, literal_type(tok.value))
+        if tok.kind == "op" and tok.value == "(":
+            node = self.parse_binary(1)
+            self.expect(")")
+            # keep the parentheses in src so messages quote the original text
+            return replace(node, src=self.src(tok.start))
+        if tok.kind != "ident":
+            raise ExprSyntaxError(f"Unexpected token '{tok.value or 'end of expression'}'")
+
+        if self.peek().value == "(":
+            self.advance()
+            args: List[Expr] = []
+            if self.peek().value != ")":
+                args.append(self.parse_binary(1))
+                while self.peek().value == ",":
+                    self.advance()
+                    args.append(self.parse_binary(1))
+            self.expect(")")
+            return Call(self.src(tok.start), tok.value, tuple(args))
+
+        while self.peek().kind == "op" and self.peek().value in ("[", "."):
+            if self.advance().value == "[":
+                self.parse_binary(1)
+                while self.peek().value == ",":
+                    self.advance()
+                    self.parse_binary(1)
+                self.expect("]")
+            else:
+                field = self.advance()
+                if field.kind != "ident":
+                    raise ExprSyntaxError(f"Expected field name after '.' in '{self.src(tok.start)}'")
+        path = self.src(tok.start)
+        return Name(path, tok.value, path)
+
+
+@lru_cache(maxsize=EXPR_CACHE_SIZE)
+def _compile_normalized(e_norm: str) -> Tuple[Optional[Expr], str]:
+    """(ast, "") on success, (None, error) on failure; the error is "" for empty input."""
+    if not e_norm:
+        return None, ""
+    try:
+        return ExprParser(e_norm).parse(), ""
+    except ExprSyntaxError as exc:
+        return None, f"Invalid expression '{e_norm}': {exc}"
+
+
+@lru_cache(maxsize=EXPR_CACHE_SIZE)
+def _compile_text(text: str) -> Tuple[Optional[Expr], str]:
+    try:
+        e_norm = normalize_expr(text)
+    except ValueError as exc:
+        return None, str(exc)
+    return _compile_normalized(e_norm)
+
+
+def compile_expr(expr: Any) -> Expr:
     """
-    e = expr
-    depth_p = depth_b = 0
-    i = len(e) - 1
-
-    def is_boundary(idx: int, length: int) -> bool:
-        start = idx - length + 1
-        before = e[start-1] if start-1 >= 0 else ""
-        after = e[idx+1] if idx+1 < len(e) else ""
-        def is_id_char(ch: str) -> bool:
-            return ch.isalnum() or ch == "_"
-        
-        if is_id_char(before):
-            return False
-        
-        if is_id_char(after):
-            return False
-        
-        if before == ':' or after == ':':
-            return False
-        return True
+    Parse an expression into its AST, memoized per distinct expression string.
 
-    while i >= 0:
-        ch = e[i]
-        if ch == ')': depth_p += 1; i -= 1; continue
-        if ch == '(': depth_p -= 1; i -= 1; continue
-        if ch == ']': depth_b += 1; i -= 1; continue
-        if ch == '[': depth_b -= 1; i -= 1; continue
-        if depth_p == 0 and depth_b == 0:
-            for op in sorted(ops, key=len, reverse=True):
-                L = len(op)
-                start = i - L + 1
-                if start >= 0 and e[start:i+1].upper() == op and is_boundary(i, L):
-                    left = e[:start].strip()
-                    right = e[i+1:].strip()
-                    return left, op.strip(), right
-        i -= 1
-    return None
+    Raises:
+        ValueError: If the expression is malformed or uses forbidden operators
+    """
+    node, err = _compile_text("" if expr is None else str(expr))
+    if node is None:
+        raise ExprSyntaxError(err or "Empty expression")
+    return node
 
 
 def peel_array_once(dt: str) -> Optional[str]:
@@ -418,146 +602,116 @@ def resolve_member_type(var_name: str, var_types: Dict[str, str], fb_defs: Dict[
 
 # ---------------- Expression Type Inference ----------------
 
-def infer_expr_type(expr: str, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Optional[str]:
-    try:
-        e_norm = normalize_expr(expr)
-    except ValueError:
+def binary_result_type(op: str, lt: str, rt: str) -> Optional[str]:
+    """Result type of `lt op rt`, or None if the operand types are incompatible."""
+    if op in ("OR", "AND"):
+        return "BOOL" if (lt == "BOOL" and rt == "BOOL") else None
+    if op in COMPARE_OPS:
+        if (is_numeric(lt) and is_numeric(rt)):
+            return "BOOL"
+        fam_l = family_of(lt)
+        fam_r = family_of(rt)
+        
+        if fam_l == fam_r and fam_l in {"STRING","BOOL","TIME","DATE","TIME_OF_DAY","DATE_AND_TIME","CHAR"}:
+            return "BOOL"
         return None
-    e = strip_parens(e_norm)
-    if not e:
+    if op in ("+", "-", "*", "/"):
+        if is_numeric(lt) and is_numeric(rt):
+            if lt in REAL_FAMILY or rt in REAL_FAMILY or lt == "REAL" or rt == "REAL":
+                return "REAL"
+            
+            return "INT"
+        if op == "+" and family_of(lt) == family_of(rt) == "STRING":
+            return "STRING"
         return None
+    return None
 
-    
-    lit = literal_type(e)
-    if lit:
-        return lit
-
-    for ops in (LOGICAL_OR, LOGICAL_AND, COMPARE_OPS, ADD_OPS, MUL_OPS):
-        sp = split_top(e, ops)
-        if sp:
-            L, op, R = sp
-            lt = infer_expr_type(L, var_types, functions, fb_defs)
-            rt = infer_expr_type(R, var_types, functions, fb_defs)
-            if lt is None or rt is None:
-                return None
-            uop = op.upper()
-            if uop in ("OR", "AND"):
-                return "BOOL" if (lt == "BOOL" and rt == "BOOL") else None
-            if uop in ("<=", ">=", "<>", "!", "!=", "=", "<", ">"):
-                if (is_numeric(lt) and is_numeric(rt)):
-                    return "BOOL"
-                fam_l = family_of(lt)
-                fam_r = family_of(rt)
-                
-                if fam_l == fam_r and fam_l in {"STRING","BOOL","TIME","DATE","TIME_OF_DAY","DATE_AND_TIME","CHAR"}:
-                    return "BOOL"
-                return None
-            if uop in ("+", "-", "*", "/"):
-                if is_numeric(lt) and is_numeric(rt):
-                    if lt in REAL_FAMILY or rt in REAL_FAMILY or lt == "REAL" or rt == "REAL":
-                        return "REAL"
-                    
-                    return "INT"
-                if uop == "+" and family_of(lt) == family_of(rt) == "STRING":
-                    return "STRING"
-                return None
 
-    m_not = re.match(r"^(?i:NOT)\b(.*)$", e)
-    if m_not:
-        rest = m_not.group(1).strip()
-        t = infer_expr_type(rest, var_types, functions, fb_defs)
-        return "BOOL" if t == "BOOL" else None
-    
-    if e.startswith("+") or e.startswith("-"):
-        rest = e[1:].strip()
-        t = infer_expr_type(rest, var_types, functions, fb_defs)
+def infer_node_type(node: Expr, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Walk a compiled expression tree and return its IEC type (or None)."""
+    if isinstance(node, Literal):
+        return node.dtype
+
+    if isinstance(node, Binary):
+        lt = infer_node_type(node.left, var_types, functions, fb_defs)
+        if lt is None:
+            return None
+        rt = infer_node_type(node.right, var_types, functions, fb_defs)
+        if rt is None:
+            return None
+        return binary_result_type(node.op, lt, rt)
+
+    if isinstance(node, Unary):
+        t = infer_node_type(node.operand, var_types, functions, fb_defs)
+        if node.op == "NOT":
+            return "BOOL" if t == "BOOL" else None
         return t if (t is not None and is_numeric(t)) else None
 
-    
-    mfunc = re.match(rf"^({IDENT})\((.*)\)$", e)
-    if mfunc:
-        fname = mfunc.group(1)
-        if fname in functions:
-            return functions[fname].get("returnType")
+    if isinstance(node, Call):
+        if node.name in functions:
+            return functions[node.name].get("returnType")
         
         return None
 
-    
-    mvar = re.match(rf"^{IDENT}(?:\[[^\]]*\]|\.[A-Za-z_][A-Za-z0-9_]*)*\s*$", e)
-    if mvar:
-        t = resolve_member_type(e, var_types, fb_defs)
+    if isinstance(node, Name):
+        t = resolve_member_type(node.path, var_types, fb_defs)
         
         if t: return t
-        base = base_var_name(e)
-        if base in var_types:
-            return var_types[base]
+        if node.base in var_types:
+            return var_types[node.base]
         
-        if BARE_WORD_AS_STRING:
-            if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", e) and base not in var_types:
-                return "STRING"
-        return None
-
-    if BARE_WORD_AS_STRING:
-        if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", e):
+        if BARE_WORD_AS_STRING and node.path == node.base:
             return "STRING"
+        return None
 
     return None
 
+
+def infer_expr_type(expr: str, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    try:
+        node = compile_expr(expr)
+    except ValueError:
+        return None
+    return infer_node_type(node, var_types, functions, fb_defs)
+
 # ---------------- Condition Validator (comparisons and BOOL rules) ----------------
 
 def _is_time_family(f: str) -> bool:
     return f in {"TIME","DATE","TIME_OF_DAY","DATE_AND_TIME"}
 
 
-def validate_condition_expr(expr: str, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Tuple[bool, str]:
-    """
-    Validate that expr is a BOOL, with strict comparison rules:
-     - Comparisons (=, <>, <, >, <=, >=) must yield BOOL.
-     - TIME/DATE/TOD/DT comparisons require both sides to be the same family; if a literal is used, it must be the matching typed literal (e.g., T#... for TIME).
-     - INT comparisons may use integer or real literals (e.g., 10, 18, 18.00).
-     - REAL comparisons allow decimals (e.g., 18.0, 0.5).
-     - STRING comparisons require quoted strings.
-     - Reject invalid mixed-type comparisons (e.g., TIME = 18.00).
-    """
-    try:
-        e_norm = normalize_expr(expr)
-    except ValueError as exc:
-        return False, str(exc)
+def node_literal_type(node: Expr) -> Optional[str]:
+    """Literal type of a (possibly signed) literal node, else None."""
+    if isinstance(node, Literal):
+        return node.dtype
+    if isinstance(node, Unary) and node.op in ADD_OPS and isinstance(node.operand, Literal):
+        return node.operand.dtype if node.operand.dtype in ("INT", "REAL") else None
+    return None
 
-    e = strip_parens(e_norm)
 
-    sp = split_top(e, LOGICAL_OR)
-    if sp:
-        l, _, r = sp
-        ok, msg = validate_condition_expr(l, var_types, functions, fb_defs)
+def check_condition_node(node: Expr, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Tuple[bool, str]:
+    """Apply the validate_condition_expr rules to a compiled expression tree."""
+    if isinstance(node, Binary) and node.op in ("OR", "AND"):
+        ok, msg = check_condition_node(node.left, var_types, functions, fb_defs)
         if not ok: return False, msg
-        ok, msg = validate_condition_expr(r, var_types, functions, fb_defs)
-        if not ok: return False, msg
-        return True, ""
-    sp = split_top(e, LOGICAL_AND)
-    if sp:
-        l, _, r = sp
-        ok, msg = validate_condition_expr(l, var_types, functions, fb_defs)
-        if not ok: return False, msg
-        ok, msg = validate_condition_expr(r, var_types, functions, fb_defs)
+        ok, msg = check_condition_node(node.right, var_types, functions, fb_defs)
         if not ok: return False, msg
         return True, ""
 
-    sp = split_top(e, COMPARE_OPS)
-    if sp:
-        L, op, R = sp
-        lt = infer_expr_type(L, var_types, functions, fb_defs)
-        rt = infer_expr_type(R, var_types, functions, fb_defs)
+    if isinstance(node, Binary) and node.op in COMPARE_OPS:
+        L, op, R = node.left, node.op, node.right
+        lt = infer_node_type(L, var_types, functions, fb_defs)
+        rt = infer_node_type(R, var_types, functions, fb_defs)
         if lt is None or rt is None:
-            return False, f"Cannot resolve types in comparison '{L} {op} {R}'"
+            return False, f"Cannot resolve types in comparison '{L.src} {op} {R.src}'"
 
         fam_l = family_of(lt)
         fam_r = family_of(rt)
 
         if _is_time_family(fam_l) or _is_time_family(fam_r):
             if fam_l != fam_r:
-                l_lit = literal_type(strip_parens(L))
-                r_lit = literal_type(strip_parens(R))
+                l_lit = node_literal_type(L)
+                r_lit = node_literal_type(R)
                 
                 if _is_time_family(fam_l) and (r_lit is None or family_of(r_lit) != fam_l):
                     return False, f"{fam_l} comparison requires a {fam_l} literal (e.g., T#1S) or {fam_l}-typed expression"
@@ -567,8 +721,8 @@ def validate_condition_expr(expr: str, var_types: Dict[str, str], functions: Dic
             return True, ""
 
         if fam_l == "STRING" or fam_r == "STRING":
-            l_lit = literal_type(strip_parens(L))
-            r_lit = literal_type(strip_parens(R))
+            l_lit = node_literal_type(L)
+            r_lit = node_literal_type(R)
             if (l_lit and family_of(l_lit) != "STRING") or (r_lit and family_of(r_lit) != "STRING"):
                 return False, "STRING comparison requires a quoted string literal"
             if fam_l == fam_r == "STRING":
@@ -586,11 +740,28 @@ def validate_condition_expr(expr: str, var_types: Dict[str, str], functions: Dic
         return False, f"Incompatible types for comparison: {lt} {op} {rt}"
 
     
-    t = infer_expr_type(e, var_types, functions, fb_defs)
+    t = infer_node_type(node, var_types, functions, fb_defs)
     if t == "BOOL":
         return True, ""
     return False, "Condition must be BOOL"
 
+
+def validate_condition_expr(expr: str, var_types: Dict[str, str], functions: Dict[str, Dict[str, Any]], fb_defs: Dict[str, Dict[str, Any]]) -> Tuple[bool, str]:
+    """
+    Validate that expr is a BOOL, with strict comparison rules:
+     - Comparisons (=, <>, <, >, <=, >=) must yield BOOL.
+     - TIME/DATE/TOD/DT comparisons require both sides to be the same family; if a literal is used, it must be the matching typed literal (e.g., T#... for TIME).
+     - INT comparisons may use integer or real literals (e.g., 10, 18, 18.00).
+     - REAL comparisons allow decimals (e.g., 18.0, 0.5).
+     - STRING comparisons require quoted strings.
+     - Reject invalid mixed-type comparisons (e.g., TIME = 18.00).
+    """
+    node, err = _compile_text("" if expr is None else str(expr))
+    if node is None:
+        return False, err or "Condition must be BOOL"
+
+    return check_condition_node(node, var_types, functions, fb_defs)
+
 # ---------------- Statement Checker ----------------
 
 def expected_type_from_target(target: str, var_types: Dict[str, str], fb_defs: Dict[str, Dict[str, Any]]) -> Optional[str]:
@@ -598,57 +769,131 @@ def expected_type_from_target(target: str, var_types: Dict[str, str], fb_defs: D
     return resolve_member_type(target, var_types, fb_defs)
 
 
-def stmtChecker(stmt: dict,
-                vars_in_scope: set,
-                functions: Dict[str, Dict[str, Any]],
-                fb_defs: Dict[str, Dict[str, Any]],
-                var_types: Dict[str, str]) -> Tuple[bool, str]:
+def json_pointer(base: str, *parts: Any) -> str:
+    """Extend a JSON pointer (RFC 6901) with further keys / indexes."""
+    for p in parts:
+        base += "/" + str(p).replace("~", "~0").replace("/", "~1")
+    return base
+
+
+def did_you_mean(name: str, device_vars: Dict[str, str]) -> str:
+    """' (did you mean ...?)' hint listing the device names nearest to `name`, or ''."""
+    close = suggest(name, device_vars)
+    if not close:
+        return ""
+    return " (did you mean " + " or ".join(f"'{n}'" for n in close) + "?)"
+
+
+def collect_pin_errors(inst: str,
+                       fb_label: str,
+                       stmt: dict,
+                       path: str,
+                       pin_inputs: Dict[str, Optional[str]],
+                       pin_outputs: Dict[str, Optional[str]],
+                       inst_is_var: bool,
+                       vars_in_scope: set,
+                       functions: Dict[str, Dict[str, Any]],
+                       fb_defs: Dict[str, Dict[str, Any]],
+                       var_types: Dict[str, str],
+                       errors: List[Dict[str, str]]) -> None:
+    """Check fbCall input/output mappings against a pin -> type table (type may be None)."""
+    for k, v in stmt.get("inputs", {}).items():
+        pin_path = json_pointer(path, "inputs", k)
+        if k not in pin_inputs:
+            errors.append({"path": pin_path, "message": f"fbCall '{inst}': unknown input '{k}' for FB '{fb_label}'"})
+            continue
+        
+        etype = pin_inputs[k]
+        if etype:
+            at = infer_expr_type(v, var_types, functions, fb_defs)
+            if at is None:
+                base = base_var_name(v)
+                if base not in vars_in_scope and not literal_type(v):
+                    errors.append({"path": pin_path, "message": f"fbCall '{inst}': input '{k}' maps to undeclared '{v}'"})
+            else:
+                if not type_assignable(etype, at):
+                    errors.append({"path": pin_path, "message": f"fbCall '{inst}': input '{k}' expects {etype}, got {at}"})
+    
+    for k, v in stmt.get("outputs", {}).items():
+        pin_path = json_pointer(path, "outputs", k)
+        if k not in pin_outputs:
+            errors.append({"path": pin_path, "message": f"fbCall '{inst}': unknown output '{k}' for FB '{fb_label}'"})
+            continue
+        base = base_var_name(v)
+        
+        if base not in vars_in_scope:
+            
+            if not (inst_is_var and base == inst):
+                errors.append({"path": pin_path, "message": f"fbCall '{inst}': output '{k}' maps to undeclared '{v}'"})
+                continue
+        
+        otype = pin_outputs[k]
+        if otype:
+            t_target = resolve_member_type(v, var_types, fb_defs)
+            if t_target is None:
+                errors.append({"path": pin_path, "message": f"fbCall '{inst}': cannot resolve output target '{v}'"})
+            elif not type_assignable(t_target, otype):
+                errors.append({"path": pin_path, "message": f"fbCall '{inst}': output '{k}' of type {otype} not assignable to {t_target}"})
+
+
+def collect_stmt_errors(stmt: dict,
+                        path: str,
+                        vars_in_scope: set,
+                        functions: Dict[str, Dict[str, Any]],
+                        fb_defs: Dict[str, Dict[str, Any]],
+                        var_types: Dict[str, str],
+                        errors: List[Dict[str, str]]) -> None:
+    """
+    Check one statement (and its nested statements), appending every problem
+    found to `errors` as {"path": <JSON pointer>, "message": <text>}.
+    """
+    def fail(message: str, *parts: Any) -> None:
+        errors.append({"path": json_pointer(path, *parts), "message": message})
+
+    def check_body(key: str, scope: set) -> None:
+        for i, s in enumerate(stmt.get(key, []) or []):
+            collect_stmt_errors(s, json_pointer(path, key, i), scope, functions, fb_defs, var_types, errors)
+
     typ = stmt.get("type")
 
     if typ == "assignment":
         target = stmt.get("target")
         if not target:
-            return False, "Assignment missing target"
+            return fail("Assignment missing target")
         base = base_var_name(target)
         if base not in vars_in_scope:
-            return False, f"Variable {target} not declared"
+            return fail(f"Variable {target} not declared", "target")
         expected = expected_type_from_target(target, var_types, fb_defs)
         if expected is None:
-            return False, f"Cannot resolve target type for '{target}'"
+            return fail(f"Cannot resolve target type for '{target}'", "target")
         expr = stmt.get("expression")
         if expr is None:
-            return False, "Assignment missing expression"
+            return fail("Assignment missing expression")
         et = infer_expr_type(expr, var_types, functions, fb_defs)
         if et is None:
-            return False, f"Unresolvable expression type for '{expr}'"
+            return fail(f"Unresolvable expression type for '{expr}'", "expression")
         if not type_assignable(expected, et):
-            return False, f"Type mismatch: expected {expected}, got {et} in expression '{expr}'"
-        return True, ""
+            return fail(f"Type mismatch: expected {expected}, got {et} in expression '{expr}'", "expression")
+        return
 
     if typ == "if":
         ok, msg = validate_condition_expr(stmt.get("condition", ""), var_types, functions, fb_defs)
         if not ok:
-            return False, msg
-        for s in stmt.get("then", []):
-            ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        for s in stmt.get("else", []):
-            ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        return True, ""
+            fail(msg, "condition")
+        check_body("then", vars_in_scope)
+        check_body("else", vars_in_scope)
+        return
 
     if typ == "case":
         sel_t = infer_expr_type(stmt.get("selector", ""), var_types, functions, fb_defs)
         if sel_t is None:
-            return False, "Case selector has unknown type"
-        for c in stmt.get("cases", []):
-            for s in c.get("statements", []):
-                ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-                if not ok: return ok, msg
-        for s in stmt.get("else", []):
-            ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        return True, ""
+            fail("Case selector has unknown type", "selector")
+        for ci, c in enumerate(stmt.get("cases", [])):
+            for i, s in enumerate(c.get("statements", [])):
+                collect_stmt_errors(s, json_pointer(path, "cases", ci, "statements", i),
+                                    vars_in_scope, functions, fb_defs, var_types, errors)
+        check_body("else", vars_in_scope)
+        return
 
     if typ == "for":
         it = stmt.get("iterator")
@@ -657,49 +902,43 @@ def stmtChecker(stmt: dict,
             loop_scope.add(it)
             if it not in var_types:
                 var_types[it] = "INT"
-        for s in stmt.get("body", []):
-            ok, msg = stmtChecker(s, loop_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        return True, ""
+        check_body("body", loop_scope)
+        return
 
     if typ == "while":
         ok, msg = validate_condition_expr(stmt.get("condition", ""), var_types, functions, fb_defs)
         if not ok:
-            return False, msg
-        for s in stmt.get("body", []):
-            ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        return True, ""
+            fail(msg, "condition")
+        check_body("body", vars_in_scope)
+        return
 
     if typ == "repeat":
         ok, msg = validate_condition_expr(stmt.get("until", ""), var_types, functions, fb_defs)
         if not ok:
-            return False, msg
-        for s in stmt.get("body", []):
-            ok, msg = stmtChecker(s, vars_in_scope, functions, fb_defs, var_types)
-            if not ok: return ok, msg
-        return True, ""
+            fail(msg, "until")
+        check_body("body", vars_in_scope)
+        return
 
     if typ == "functionCall":
         fname = stmt.get("name")
         args = stmt.get("arguments", [])
         if fname not in functions:
-            return False, f"Function '{fname}' not defined"
+            return fail(f"Function '{fname}' not defined", "name")
         expected = functions[fname]["inputs"]
         if len(args) != len(expected):
-            return False, f"Function '{fname}' arg count mismatch (got {len(args)}, expected {len(expected)})"
+            return fail(f"Function '{fname}' arg count mismatch (got {len(args)}, expected {len(expected)})", "arguments")
         
         in_types = functions[fname].get("inputTypes", [])
-        for a, et in zip(args, in_types):
+        for i, (a, et) in enumerate(zip(args, in_types)):
             at = infer_expr_type(a, var_types, functions, fb_defs)
             if at is None:
                 base = base_var_name(a)
                 if base not in var_types and not literal_type(a):
-                    return False, f"Function '{fname}' arg '{a}' not declared"
+                    fail(f"Function '{fname}' arg '{a}' not declared", "arguments", i)
             else:
                 if not type_assignable(et, at):
-                    return False, f"Function '{fname}' arg type mismatch: expected {et}, got {at}"
-        return True, ""
+                    fail(f"Function '{fname}' arg type mismatch: expected {et}, got {at}", "arguments", i)
+        return
 
     if typ == "fbCall":
         inst = stmt.get("name")
@@ -711,123 +950,94 @@ def stmtChecker(stmt: dict,
             fb_name = inst 
             inst_type = None
         else:
-            return False, f"fbCall instance '{inst}' is not declared and no FB type named '{inst}' found"
+            return fail(f"fbCall instance '{inst}' is not declared and no FB type named '{inst}' found", "name")
 
         U = uc(fb_name) if fb_name else uc(inst_type or "")
 
 
         if fb_name in fb_defs:
             sig = fb_defs[fb_name]
-            
-            for k, v in stmt.get("inputs", {}).items():
-                if k not in sig["inputs"]:
-                    return False, f"fbCall '{inst}': unknown input '{k}' for FB '{fb_name}'"
-                
-                etype = sig["inputTypes"].get(k)
-                if etype:
-                    at = infer_expr_type(v, var_types, functions, fb_defs)
-                    if at is None:
-                        base = base_var_name(v)
-                        if base not in vars_in_scope and not literal_type(v):
-                            return False, f"fbCall '{inst}': input '{k}' maps to undeclared '{v}'"
-                    else:
-                        if not type_assignable(etype, at):
-                            return False, f"fbCall '{inst}': input '{k}' expects {etype}, got {at}"
-            
-            for k, v in stmt.get("outputs", {}).items():
-                if k not in sig["outputs"]:
-                    return False, f"fbCall '{inst}': unknown output '{k}' for FB '{fb_name}'"
-                base = base_var_name(v)
-                
-                if base not in vars_in_scope:
-                    
-                    if not (inst_is_var and base == inst):
-                        return False, f"fbCall '{inst}': output '{k}' maps to undeclared '{v}'"
-                
-                otype = sig["outputTypes"].get(k)
-                if otype:
-                    t_target = resolve_member_type(v, var_types, fb_defs)
-                    if t_target is None:
-                        return False, f"fbCall '{inst}': cannot resolve output target '{v}'"
-                    if not type_assignable(t_target, otype):
-                        return False, f"fbCall '{inst}': output '{k}' of type {otype} not assignable to {t_target}"
-            return True, ""
+            collect_pin_errors(inst, fb_name, stmt, path,
+                               {k: sig["inputTypes"].get(k) for k in sig["inputs"]},
+                               {k: sig["outputTypes"].get(k) for k in sig["outputs"]},
+                               inst_is_var, vars_in_scope, functions, fb_defs, var_types, errors)
+            return
 
         if U in FB_PIN_TYPES:
             pins = FB_PIN_TYPES[U]
-            for k, v in stmt.get("inputs", {}).items():
-                if k not in pins["inputs"]:
-                    return False, f"fbCall '{inst}': unknown input '{k}' for FB '{inst_type or fb_name}'"
-                etype = pins["inputs"][k]
-                at = infer_expr_type(v, var_types, functions, fb_defs)
-                if at is None:
-                    base = base_var_name(v)
-                    if base not in vars_in_scope and not literal_type(v):
-                        return False, f"fbCall '{inst}': input '{k}' maps to undeclared '{v}'"
-                else:
-                    if not type_assignable(etype, at):
-                        return False, f"fbCall '{inst}': input '{k}' expects {etype}, got {at}"
-            for k, v in stmt.get("outputs", {}).items():
-                if k not in pins["outputs"]:
-                    return False, f"fbCall '{inst}': unknown output '{k}' for FB '{inst_type or fb_name}'"
-                otype = pins["outputs"][k]
-                base = base_var_name(v)
-                if base not in vars_in_scope:
-                    return False, f"fbCall '{inst}': output '{k}' maps to undeclared '{v}'"
-                t_target = resolve_member_type(v, var_types, fb_defs)
-                if t_target is None:
-                    return False, f"fbCall '{inst}': cannot resolve output target '{v}'"
-                if not type_assignable(t_target, otype):
-                    return False, f"fbCall '{inst}': output '{k}' of type {otype} not assignable to {t_target}"
-            return True, ""
+            # built-in pins are always typed, and outputs must map to declared variables
+            collect_pin_errors(inst, inst_type or fb_name, stmt, path,
+                               pins["inputs"], pins["outputs"],
+                               False, vars_in_scope, functions, fb_defs, var_types, errors)
+            return
 
         for k, v in stmt.get("inputs", {}).items():
             if not literal_type(v):
                 base = base_var_name(v)
                 if base not in vars_in_scope:
-                    return False, f"fbCall '{inst}': input '{k}' maps to undeclared '{v}'"
+                    fail(f"fbCall '{inst}': input '{k}' maps to undeclared '{v}'", "inputs", k)
         for k, v in stmt.get("outputs", {}).items():
             base = base_var_name(v)
             if base not in vars_in_scope:
-                return False, f"fbCall '{inst}': output '{k}' maps to undeclared '{v}'"
-        return True, ""
+                fail(f"fbCall '{inst}': output '{k}' maps to undeclared '{v}'", "outputs", k)
+        return
 
     if typ == "return":
-        return True, ""
+        return
+    return
+
+
+def stmtChecker(stmt: dict,
+                vars_in_scope: set,
+                functions: Dict[str, Dict[str, Any]],
+                fb_defs: Dict[str, Dict[str, Any]],
+                var_types: Dict[str, str]) -> Tuple[bool, str]:
+    errors: List[Dict[str, str]] = []
+    collect_stmt_errors(stmt, "", vars_in_scope, functions, fb_defs, var_types, errors)
+    if errors:
+        return False, errors[0]["message"]
     return True, ""
 
 
+DEFAULT_VARIABLES_FILE = Path(__file__).parent.parent / "AI_Integration" / "kb" / "templates" / "variables.json"
+
+# path -> (mtime, parsed table), so a variables file is only re-read when it changes
+_file_vars_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+
 def load_device_variables() -> Dict[str, str]:
     """
     Load device variables from the database (preferred) or local JSON file (fallback).
+
+    The database table is served from the process-wide device registry, which is
+    only reloaded after the variables collection changes.
     
     Returns:
         Dictionary mapping device names to their data types
     """
-    vars_from_db: Dict[str, str] = {}
-    
-    # Try to load from database first
+    # Try the database-backed registry first
     try:
-        from core import get_collection
-        collection = get_collection()
-        if collection is not None:
-            # Load from database
-            cursor = collection.find({}, {"deviceName": 1, "dataType": 1, "_id": 0})
-            for item in cursor:
-                name = item.get("deviceName")
-                datatype = item.get("dataType")
-                if name and datatype:
-                    vars_from_db[name.strip()] = datatype.upper()
-            
-            if vars_from_db:
-                logger.info(f"Loaded {len(vars_from_db)} device variables from database")
-                return vars_from_db
+        from core import device_registry
+        vars_from_db = device_registry.get_all()
+        if vars_from_db:
+            return vars_from_db
     except Exception as e:
         logger.warning(f"Could not load from database, falling back to file: {e}")
     
-    # Fallback: Load from local JSON file
-    script_dir = Path(__file__).parent
-    file_path = script_dir.parent / "AI_Integration" / "kb" / "templates" / "variables.json"
+    return load_device_variables_from_file()
+
+
+def load_device_variables_from_file(file_path: Optional[Path] = None) -> Dict[str, str]:
+    """
+    Load device variables from a local JSON file (list of {deviceName, dataType, ...}).
+
+    Args:
+        file_path: Variables file; defaults to the AI knowledge-base copy
+
+    Returns:
+        Dictionary mapping device names to their data types ({} on error)
+    """
+    file_path = Path(file_path or DEFAULT_VARIABLES_FILE)
     
     vars_from_file: Dict[str, str] = {}
 
@@ -835,6 +1045,11 @@ def load_device_variables() -> Dict[str, str]:
         if not file_path.exists():
             logger.error(f"Variables file not found: {file_path}")
             return {}
+
+        mtime = file_path.stat().st_mtime
+        cached = _file_vars_cache.get(str(file_path))
+        if cached and cached[0] == mtime:
+            return cached[1]
             
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -852,6 +1067,7 @@ def load_device_variables() -> Dict[str, str]:
                 vars_from_file[name.strip()] = datatype.upper()
 
         logger.info(f"Loaded {len(vars_from_file)} device variables from file")
+        _file_vars_cache[str(file_path)] = (mtime, vars_from_file)
 
     except FileNotFoundError as e:
         logger.error(f"Variables file not found: {e}")
@@ -866,25 +1082,267 @@ def load_device_variables() -> Dict[str, str]:
     return vars_from_file
 
 
-def validator(intermediate: List[Dict[str, Any]]) -> Tuple[bool, str]:
+async def aload_device_variables() -> Dict[str, str]:
+    """Async load_device_variables(): never blocks the event loop on MongoDB or file I/O."""
+    try:
+        from core import device_registry
+        vars_from_db = await device_registry.aget_all()
+        if vars_from_db:
+            return vars_from_db
+    except Exception as e:
+        logger.warning(f"Could not load from database, falling back to file: {e}")
+
+    return await asyncio.to_thread(load_device_variables_from_file)
+
+
+# ====================== Pass 2 fan-out ======================
+
+# Pass 2 is spread over a process pool only for IRs with at least this many blocks;
+# below that, process start-up and pickling cost more than they save.
+PARALLEL_MIN_BLOCKS = 32
+# Spawning the pool costs an interpreter start per worker, so by default it is
+# only started for an IR this large; once it is warm, PARALLEL_MIN_BLOCKS applies.
+PARALLEL_COLD_MIN_BLOCKS = 128
+# Blocks per task sent to a worker process
+PARALLEL_CHUNK_SIZE = 8
+
+# One pool per process, sized by usable_cpus() and kept warm; callers asking
+# for fewer workers limit how many chunks they have in flight instead
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SignatureTables:
+    """Pass 1 results needed to validate any block (picklable for worker processes)."""
+    functions: Dict[str, Dict[str, Any]]
+    fb_defs: Dict[str, Dict[str, Any]]
+    known_types: frozenset
+    device_vars: Dict[str, str]
+
+
+def usable_cpus() -> int:
+    """CPUs this process may run on (respects affinity / container CPU sets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
 
-    device_vars = load_device_variables()
+def default_workers(blocks: int) -> int:
+    """
+    Pass 2 processes for an IR of `blocks` blocks when the caller does not choose.
+
+    Sequential for small IRs and on single-CPU hosts, where worker processes
+    only add spawn and pickling cost; a cold pool needs a larger IR to pay off.
+    """
+    cpus = usable_cpus()
+    if cpus <= 1 or blocks < PARALLEL_MIN_BLOCKS:
+        return 1
+    if _pool is None and blocks < PARALLEL_COLD_MIN_BLOCKS:
+        return 1
+    return cpus
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared worker pool, so repeated validations reuse warm processes (and their caches)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a multi-threaded server process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=usable_cpus(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool (unless another thread already replaced it); the next use starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _validate_chunk(chunk: List[Tuple[int, Dict[str, Any]]], tables: SignatureTables) -> List[List[Dict[str, str]]]:
+    return [_validate_block(bi, block, tables) for bi, block in chunk]
+
+
+def _validate_blocks(intermediate: List[Dict[str, Any]], tables: SignatureTables,
+                     workers: Optional[int] = None) -> List[List[Dict[str, str]]]:
+    """
+    Run Pass 2 on every block; returns each block's errors in block order.
+
+    At most `workers` chunks are in flight at a time on the shared pool.
+    Falls back to sequential validation if the pool cannot be used.
+    """
+    if workers is None:
+        workers = default_workers(len(intermediate))
+    workers = min(workers, usable_cpus(), -(-len(intermediate) // PARALLEL_CHUNK_SIZE))
+
+    if workers > 1:
+        blocks = list(enumerate(intermediate))
+        chunks = [blocks[i:i + PARALLEL_CHUNK_SIZE] for i in range(0, len(blocks), PARALLEL_CHUNK_SIZE)]
+        pool = _get_pool()
+        in_flight: Deque[Future] = deque()
+        results: List[List[Dict[str, str]]] = []
+        try:
+            # Collected in submission order, so the merged result is deterministic
+            for chunk in chunks:
+                if len(in_flight) >= workers:
+                    results.extend(in_flight.popleft().result())
+                in_flight.append(pool.submit(_validate_chunk, chunk, tables))
+            while in_flight:
+                results.extend(in_flight.popleft().result())
+            return results
+        except (OSError, RuntimeError, BrokenProcessPool, pickle.PicklingError) as e:
+            # RuntimeError: the pool was shut down by another thread's _discard_pool()
+            logger.warning(f"Parallel validation unavailable, validating sequentially: {e}")
+            for future in in_flight:
+                future.cancel()
+            _discard_pool(pool)
+
+    return [_validate_block(bi, block, tables) for bi, block in enumerate(intermediate)]
+
+
+def _validate_block(bi: int, block: Dict[str, Any], tables: SignatureTables) -> List[Dict[str, str]]:
+    """Pass 2 for one block; depends only on the block and the Pass 1 tables."""
+    errors: List[Dict[str, str]] = []
+    functions, fb_defs = tables.functions, tables.fb_defs
+    known_types, device_vars = tables.known_types, tables.device_vars
+
+    def fail(message: str, path: str = "") -> None:
+        errors.append({"path": path, "message": message})
+
+    blockType = list(block.keys())[0]
+    block_path = json_pointer("", bi, blockType)
+    if blockType not in ("function", "functionBlock", "program"):
+        fail(f"Invalid block type: {blockType}", block_path)
+        return errors
+
+    if blockType == "function":
+        f = block["function"]
+        if f.get("name") not in functions:
+            return errors  # already reported in pass 1
+        for di, dt in enumerate([*f.get("inputs", []), {"datatype": f.get("returnType")}]):
+            ok, msg = validate_datatype(dt["datatype"], known_types)
+            if not ok:
+                dt_path = (json_pointer(block_path, "inputs", di, "datatype")
+                           if di < len(f.get("inputs", [])) else json_pointer(block_path, "returnType"))
+                fail(f"Function '{f['name']}' type error: {msg}", dt_path)
+
+        scope = {i["name"] for i in f.get("inputs", [])}
+        var_types = {i["name"]: i["datatype"] for i in f.get("inputs", [])}
+
+        for si, s in enumerate(f.get("body", [])):
+            stmt_path = json_pointer(block_path, "body", si)
+            if s.get("type") == "return":
+                t = infer_expr_type(s.get("expression", ""), var_types, functions, fb_defs)
+                if t is None or not type_assignable(f.get("returnType"), t):
+                    fail(f"Return type mismatch: expected {f.get('returnType')}, got {t}",
+                         json_pointer(stmt_path, "expression"))
+            else:
+                collect_stmt_errors(s, stmt_path, scope, functions, fb_defs, var_types, errors)
+
+    elif blockType == "functionBlock":
+        fb = block["functionBlock"]
+        if fb.get("name") not in fb_defs:
+            return errors  # already reported in pass 1
+        for arr, label in (("inputs", "input"), ("outputs", "output"), ("locals", "local")):
+            for ii, item in enumerate(fb.get(arr, [])):
+                ok, msg = validate_datatype(item["datatype"], known_types)
+                if not ok:
+                    fail(f"FunctionBlock '{fb['name']}' {label} '{item['name']}': {msg}",
+                         json_pointer(block_path, arr, ii, "datatype"))
+
+        scope = set([*(n for n in fb_defs[fb["name"]]["inputs"]),
+                     *(n for n in fb_defs[fb["name"]]["outputs"]),
+                     *(n for n in fb_defs[fb["name"]]["locals"])])
+
+        var_types = {}
+        for arr in ("inputs", "outputs", "locals"):
+            for item in fb.get(arr, []):
+                var_types[item["name"]] = item["datatype"]
+
+        for si, s in enumerate(fb.get("body", [])):
+            collect_stmt_errors(s, json_pointer(block_path, "body", si), scope, functions, fb_defs, var_types, errors)
+
+    elif blockType == "program":
+        prog = block["program"]
+        if "declarations" not in prog:
+            fail(f"Program '{prog.get('name','<unnamed>')}' missing declarations", block_path)
+            return errors
+
+        scope: set = set()
+        var_types: Dict[str, str] = {}
+        for di, d in enumerate(prog.get("declarations", [])):
+            vname, vtype = d["name"], d["datatype"]
+            decl_path = json_pointer(block_path, "declarations", di)
+
+            ok, msg = validate_datatype(vtype, known_types)
+            if not ok:
+                fail(f"Program '{prog['name']}' declaration '{vname}': {msg}", json_pointer(decl_path, "datatype"))
+            elif vname not in device_vars:
+                fail(f"Variable '{vname}' not found in device specifications{did_you_mean(vname, device_vars)}",
+                     json_pointer(decl_path, "name"))
+            elif device_vars[vname] != vtype.upper():
+                fail(f"Type mismatch for '{vname}': DB has {device_vars[vname]}, JSON declares {vtype}",
+                     json_pointer(decl_path, "datatype"))
+
+            # keep checking the statements against the best-known type to avoid cascades
+            scope.add(vname)
+            var_types[vname] = device_vars.get(vname, vtype)
+
+        for si, s in enumerate(prog.get("statements", [])):
+            collect_stmt_errors(s, json_pointer(block_path, "statements", si), scope, functions, fb_defs, var_types, errors)
+
+    return errors
+
+
+def validate_diagnostics(intermediate: List[Dict[str, Any]],
+                         device_vars: Optional[Dict[str, str]] = None,
+                         workers: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    Validate the whole intermediate representation in one pass.
+
+    Unlike `validator`, this does not stop at the first problem: every error is
+    collected together with a JSON pointer to the offending node.
+
+    Args:
+        intermediate: List of program/function/functionBlock blocks
+        device_vars: Device name -> datatype table; loaded via
+            load_device_variables() when omitted
+        workers: Processes for Pass 2 (1 forces sequential validation); by
+            default see `default_workers()`
+
+    Returns:
+        List of {"path": "/0/program/statements/1/condition", "message": "..."};
+        empty if the IR is valid
+    """
+    errors: List[Dict[str, str]] = []
+
+    def fail(message: str, path: str = "") -> None:
+        errors.append({"path": path, "message": message})
+
+    if device_vars is None:
+        device_vars = load_device_variables()
     if not device_vars:
-        return False, "No device variables found in DB. Cannot validate."
+        fail("No device variables found in DB. Cannot validate.")
+        return errors
 
     functions: Dict[str, Dict[str, Any]] = {}
     fb_defs: Dict[str, Dict[str, Any]] = {}
     known_types = set(BASE_SCALAR_TYPES) | set(BUILTIN_FB_TYPES)
 
     # ---------------- Pass 1: Collects signatures (functions + FBs + add FB names to known_types) ----------------
-    for block in intermediate:
+    for bi, block in enumerate(intermediate):
         key = list(block.keys())[0]
 
         if key == "function":
             f = block["function"]
             fname = f.get("name")
             if not fname or not f.get("returnType"):
-                return False, "Function missing name/returnType"
+                fail("Function missing name/returnType", json_pointer("", bi, "function"))
+                continue
             input_names = [i["name"] for i in f.get("inputs", [])]
             input_types = [i["datatype"] for i in f.get("inputs", [])]
             functions[fname] = {"inputs": input_names, "inputTypes": input_types, "returnType": f["returnType"]}
@@ -893,7 +1351,8 @@ def validator(intermediate: List[Dict[str, Any]]) -> Tuple[bool, str]:
             fb = block["functionBlock"]
             fbname = fb.get("name")
             if not fbname:
-                return False, "FunctionBlock missing name"
+                fail("FunctionBlock missing name", json_pointer("", bi, "functionBlock"))
+                continue
             fb_defs[fbname] = {
                 "inputs": [i["name"] for i in fb.get("inputs", [])],
                 "outputs": [o["name"] for o in fb.get("outputs", [])],
@@ -903,80 +1362,25 @@ def validator(intermediate: List[Dict[str, Any]]) -> Tuple[bool, str]:
             }
             known_types.add(fbname)
 
-    # ---------------- Pass 2: Validates blocks ----------------
-    for block in intermediate:
-        blockType = list(block.keys())[0]
-        if blockType not in ("function", "functionBlock", "program"):
-            return False, f"Invalid block type: {blockType}"
-
-        if blockType == "function":
-            f = block["function"]
-            for dt in [*f.get("inputs", []), {"datatype": f.get("returnType")}]:
-                ok, msg = validate_datatype(dt["datatype"], known_types)
-                if not ok:
-                    return False, f"Function '{f['name']}' type error: {msg}"
-
-            scope = {i["name"] for i in f.get("inputs", [])}
-            var_types = {i["name"]: i["datatype"] for i in f.get("inputs", [])}
-
-            for s in f.get("body", []):
-                if s.get("type") == "return":
-                    t = infer_expr_type(s.get("expression", ""), var_types, functions, fb_defs)
-                    if t is None or not type_assignable(f.get("returnType"), t):
-                        return False, f"Return type mismatch: expected {f.get('returnType')}, got {t}"
-                else:
-                    ok, msg = stmtChecker(s, scope, functions, fb_defs, var_types)
-                    if not ok:
-                        return False, msg
-
-        elif blockType == "functionBlock":
-            fb = block["functionBlock"]
-            for arr, label in (("inputs", "input"), ("outputs", "output"), ("locals", "local")):
-                for item in fb.get(arr, []):
-                    ok, msg = validate_datatype(item["datatype"], known_types)
-                    if not ok:
-                        return False, f"FunctionBlock '{fb['name']}' {label} '{item['name']}': {msg}"
-
-            scope = set([*(n for n in fb_defs[fb["name"]]["inputs"]),
-                         *(n for n in fb_defs[fb["name"]]["outputs"]),
-                         *(n for n in fb_defs[fb["name"]]["locals"])])
-
-            var_types = {}
-            for arr in ("inputs", "outputs", "locals"):
-                for item in fb.get(arr, []):
-                    var_types[item["name"]] = item["datatype"]
-
-            for s in fb.get("body", []):
-                ok, msg = stmtChecker(s, scope, functions, fb_defs, var_types)
-                if not ok:
-                    return False, msg
-
-        elif blockType == "program":
-            prog = block["program"]
-            if "declarations" not in prog:
-                return False, f"Program '{prog.get('name','<unnamed>')}' missing declarations"
-
-            scope: set = set()
-            var_types: Dict[str, str] = {}
-            for d in prog.get("declarations", []):
-                vname, vtype = d["name"], d["datatype"]
+    # ---------------- Pass 2: Validates blocks (independent given the Pass 1 tables) ----------------
+    tables = SignatureTables(functions, fb_defs, frozenset(known_types), device_vars)
+    for block_errors in _validate_blocks(intermediate, tables, workers):
+        errors.extend(block_errors)
 
-                ok, msg = validate_datatype(vtype, known_types)
-                if not ok:
-                    return False, f"Program '{prog['name']}' declaration '{vname}': {msg}"
-
-                if vname not in device_vars:
-                    return False, f"Variable '{vname}' not found in device specifications"
+    return errors
 
-                if device_vars[vname] != vtype.upper():
-                    return False, f"Type mismatch for '{vname}': DB has {device_vars[vname]}, JSON declares {vtype}"
 
-                scope.add(vname)
-                var_types[vname] = device_vars[vname]
+def format_diagnostics(diagnostics: List[Dict[str, str]]) -> str:
+    """Render diagnostics as one numbered line per error (for logs / LLM prompts)."""
+    return "\n".join(
+        f"{i}. {d['path'] or '/'}: {d['message']}" for i, d in enumerate(diagnostics, 1)
+    )
 
-            for s in prog.get("statements", []):
-                ok, msg = stmtChecker(s, scope, functions, fb_defs, var_types)
-                if not ok:
-                    return False, msg
 
-    return True, "Build Success✅"
\ No newline at end of file
+def validator(intermediate: List[Dict[str, Any]],
+              device_vars: Optional[Dict[str, str]] = None) -> Tuple[bool, str]:
+    """Fail-fast wrapper around validate_diagnostics: (ok, first error message)."""
+    errors = validate_diagnostics(intermediate, device_vars)
+    if errors:
+        return False, errors[0]["message"]
+    return True, "Build Success✅"
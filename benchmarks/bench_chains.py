@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: per-request overhead of the retrieve + stream generation path.
+
+Compares the old behaviour (prompt template parsed on every request) with the
+prompts prebuilt by initialize(), both driven through `astream_answer` as the
+server runs them. A fake chat model and an in-memory retriever are used so only
+LangChain overhead is measured - no Groq or embedding calls are made.
+
+Usage:
+    python benchmarks/bench_chains.py [--requests 500]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../AI_Integration')))
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+
+from chains import astream_answer, generate_query
+from Prompts import Generate_System_Instruction
+
+DEVICE_DOC = '[{"deviceName": "Fan", "dataType": "INT", "range": "1-5", "MetaData": "On hall"}]'
+
+
+class StaticRetriever(BaseRetriever):
+    """Retriever that always returns the same document."""
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [Document(page_content=DEVICE_DOC)]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [Document(page_content=DEVICE_DOC)]
+
+
+async def drain(events) -> None:
+    async for _ in events:
+        pass
+
+
+def time_per_call(fn, n: int) -> float:
+    """Average wall time of fn() in microseconds."""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def time_per_stream(make_events, n: int) -> float:
+    """Average wall time of draining make_events() in microseconds."""
+    async def run():
+        start = time.perf_counter()
+        for _ in range(n):
+            await drain(make_events())
+        return (time.perf_counter() - start) / n * 1e6
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500, help="Requests to simulate per case")
+    args = parser.parse_args()
+
+    llm = FakeListChatModel(responses=["[]"])
+    retriever = StaticRetriever()
+    query = generate_query("turn on the fan if motion detected")
+
+    prebuilt = ChatPromptTemplate.from_template(Generate_System_Instruction)
+
+    build_only = time_per_call(
+        lambda: ChatPromptTemplate.from_template(Generate_System_Instruction), args.requests
+    )
+    per_request = time_per_stream(
+        lambda: astream_answer(llm, retriever, ChatPromptTemplate.from_template(Generate_System_Instruction), query),
+        args.requests,
+    )
+    reused = time_per_stream(lambda: astream_answer(llm, retriever, prebuilt, query), args.requests)
+
+    print(f"requests simulated      : {args.requests}")
+    print(f"prompt parsing only     : {build_only:9.1f} us/request")
+    print(f"before (parse + stream) : {per_request:9.1f} us/request")
+    print(f"after  (prebuilt prompt): {reused:9.1f} us/request")
+    print(f"saved per request       : {per_request - reused:9.1f} us ({(1 - reused / per_request) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
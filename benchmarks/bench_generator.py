@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: ST generation time for deeply nested IF/FOR statements.
+
+Compares the old emitter (every nested block converted to a list, then
+re-indented and copied once per enclosing level) with the single-buffer
+STWriter emitter. The old emitter is re-implemented here for the statement
+types used in the benchmark; both outputs are checked to be identical.
+
+With the single-buffer emitter the time per output byte stays flat as
+nesting gets deeper; with list re-copying it grows with depth.
+
+Usage:
+    python benchmarks/bench_generator.py [--depths 5,10,20,40] [--width 3] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from generator import convert_statement, indent_lines
+
+
+def nested_ir(depth: int, width: int) -> Dict[str, Any]:
+    """IF and FOR blocks nested `depth` deep, each with `width` assignments."""
+    body: List[Dict[str, Any]] = []
+    for level in reversed(range(depth)):
+        stmts = [
+            {"type": "assignment", "target": f"x{level}_{i}", "expression": f"x{level}_{i} + {i}"}
+            for i in range(width)
+        ] + body
+        if level % 2:
+            body = [{"type": "for", "iterator": f"i{level}", "from": 1, "to": 10, "body": stmts}]
+        else:
+            body = [{"type": "if", "condition": f"c{level}", "then": stmts, "else": stmts[:1]}]
+    return body[0]
+
+
+def legacy_convert(stmt: Dict[str, Any], level: int = 0) -> List[str]:
+    """Previous list-concatenating emitter (assignment / if / for only)."""
+    t = stmt["type"]
+    if t == "assignment":
+        return [f"{stmt['target']} := {stmt['expression']};"]
+    if t == "for":
+        lines = [f"FOR {stmt['iterator']} := {stmt['from']} TO {stmt['to']} DO"]
+        for s in stmt["body"]:
+            lines += indent_lines(legacy_convert(s, level+1), level+1)
+        lines.append("END_FOR;")
+        return lines
+    lines = [f"IF {stmt['condition']} THEN"]
+    for s in stmt["then"]:
+        lines += indent_lines(legacy_convert(s, level+1), level+1)
+    lines.append("ELSE")
+    for s in stmt["else"]:
+        lines += indent_lines(legacy_convert(s, level+1), level+1)
+    lines.append("END_IF;")
+    return lines
+
+
+def best_time(fn, repeat: int) -> float:
+    """Best wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--depths", default="5,10,20,40", help="Comma-separated nesting depths")
+    parser.add_argument("--width", type=int, default=3, help="Assignments per block")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'depth':>5} {'lines':>7} {'KB':>8} {'before ms':>10} {'after ms':>9} "
+          f"{'before ns/B':>12} {'after ns/B':>11}")
+    for depth in (int(d) for d in args.depths.split(",")):
+        stmt = nested_ir(depth, args.width)
+        lines = convert_statement(stmt)
+        if lines != legacy_convert(stmt):
+            raise SystemExit(f"Output differs from the previous emitter at depth {depth}")
+        size = len("\n".join(lines))
+
+        before = best_time(lambda: "\n".join(legacy_convert(stmt)), args.repeat)
+        after = best_time(lambda: "\n".join(convert_statement(stmt)), args.repeat)
+        print(f"{depth:>5} {len(lines):>7} {size / 1024:>8.1f} {before:>10.2f} {after:>9.2f} "
+              f"{before * 1e6 / size:>12.2f} {after * 1e6 / size:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
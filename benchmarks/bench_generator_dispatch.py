@@ -0,0 +1,168 @@
+"""
+Micro-benchmark: per-statement cost of literal handling and statement dispatch.
+
+Compares the previous generator hot path (string regex patterns compiled-or-
+looked-up on every value, statement type resolved by an if/elif chain) with
+precompiled patterns, the per-literal cache and the STATEMENT_EMITTERS
+registry. The previous behaviour is restored by patching the generator
+module; both outputs are checked to be identical. With --profile the hottest
+functions of each run are printed (cProfile, sorted by own time).
+
+Usage:
+    python benchmarks/bench_generator_dispatch.py [--statements 20000] [--repeat 5] [--profile]
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+import generator
+
+LITERALS = ["T#5s", "TOD#08:00:00", "Motor_1", "Tank.Level", "Valve[2]", "Level > 80", "ready", "Start Pump"]
+
+
+def flat_ir(statements: int) -> Dict[str, Any]:
+    """Program with a typical mix of assignments, IFs, CASEs and FB calls."""
+    body: List[Dict[str, Any]] = []
+    for i in range(statements):
+        kind = i % 4
+        lit = LITERALS[i % len(LITERALS)]
+        if kind == 0:
+            body.append({"type": "assignment", "target": f"x{i % 50}", "expression": f"x{i % 50} + 1"})
+        elif kind == 1:
+            body.append({"type": "if", "condition": f"Level{i % 10} > 80", "then": [
+                {"type": "assignment", "target": "Pump", "expression": "TRUE"}
+            ]})
+        elif kind == 2:
+            body.append({"type": "case", "selector": "Mode", "cases": [
+                {"value": 1, "statements": [{"type": "exit"}]},
+                {"value": lit, "statements": [{"type": "continue"}]},
+            ]})
+        else:
+            body.append({"type": "fbCall", "name": f"T{i % 20}", "inputs": {"IN": True, "PT": lit, "Tag": lit}})
+    return {"program": {"name": "Bench", "declarations": [], "statements": body}}
+
+
+def legacy_is_identifier(s: str) -> bool:
+    return re.match(r'^[A-Za-z_]\w*(?:[\.\[][\w\]\.]+)*$', s) is not None
+
+
+def legacy_value_to_st(val: Any) -> str:
+    if val is None:
+        return "NULL"
+    if isinstance(val, bool):
+        return generator.st_bool(val)
+    if isinstance(val, (int, float)):
+        return str(val)
+    if isinstance(val, str):
+        if val.startswith("T#") or val.startswith("TIME#"):
+            return val
+        if val.startswith("D#") or val.startswith("DATE#"):
+            return val
+        if val.startswith("DT#") or val.startswith("DATE_AND_TIME#"):
+            return val
+        if val.startswith("TOD#") or val.startswith("TIME_OF_DAY#"):
+            return val
+        if legacy_is_identifier(val):
+            return val
+        if re.search(r'[\s\+\-\*\/\(\)]', val):
+            return val
+        return f'"{val}"'
+    return json.dumps(val)
+
+
+def legacy_emit_statement(out, stmt, level=0, indent=0):
+    t = stmt.get("type")
+    if t == "assignment":
+        generator.emit_assignment(out, stmt, level, indent)
+    elif t == "if":
+        generator.emit_if(out, stmt, level, indent)
+    elif t == "case":
+        generator.emit_case(out, stmt, level, indent)
+    elif t == "for":
+        generator.emit_for(out, stmt, level, indent)
+    elif t == "while":
+        generator.emit_while(out, stmt, level, indent)
+    elif t == "repeat":
+        generator.emit_repeat(out, stmt, level, indent)
+    elif t == "functionCall":
+        generator.emit_function_call(out, stmt, level, indent)
+    elif t == "fbCall":
+        generator.emit_fb_call(out, stmt, level, indent)
+    elif t == "return":
+        generator.emit_return(out, stmt, level, indent)
+    elif t == "exit":
+        generator.emit_exit(out, stmt, level, indent)
+    elif t == "continue":
+        generator.emit_continue(out, stmt, level, indent)
+    else:
+        out.line(f"(* Unsupported statement type: {t} *)", indent)
+
+
+@contextmanager
+def legacy_hot_path():
+    """Temporarily restore the previous literal handling and dispatch."""
+    saved = generator.value_to_st, generator.emit_statement
+    generator.value_to_st, generator.emit_statement = legacy_value_to_st, legacy_emit_statement
+    try:
+        yield
+    finally:
+        generator.value_to_st, generator.emit_statement = saved
+
+
+def best_time(fn, repeat: int) -> float:
+    """Best wall time of fn() in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_profile(title: str, fn, top: int = 8):
+    profiler = cProfile.Profile()
+    profiler.runcall(fn)
+    print(f"\n--- {title} ---")
+    pstats.Stats(profiler).sort_stats("tottime").print_stats(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--statements", type=int, default=20000, help="Top-level statements in the program")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (best is reported)")
+    parser.add_argument("--profile", action="store_true", help="Print the hottest functions of each run")
+    args = parser.parse_args()
+
+    data = flat_ir(args.statements)
+    run = lambda: generator.generator(data)
+
+    with legacy_hot_path():
+        expected = run()
+        before = best_time(run, args.repeat)
+    if run() != expected:
+        raise SystemExit("Output differs from the previous hot path")
+    after = best_time(run, args.repeat)
+
+    print(f"statements              : {args.statements}")
+    print(f"before (regex + if/elif): {before / args.statements * 1e6:7.2f} us/statement")
+    print(f"after  (cached + table) : {after / args.statements * 1e6:7.2f} us/statement")
+    print(f"saved per statement     : {(1 - after / before) * 100:6.0f}%")
+
+    if args.profile:
+        with legacy_hot_path():
+            print_profile("before", run)
+        print_profile("after", run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Benchmark suite: validation and generation time and peak memory on synthetic IR.
+
+Every case is an IRShape (see synthetic_ir.py) stressing one dimension:
+statement count, nesting depth, expression length, number of FBs/functions
+and device table size. For each case the suite reports
+
+    validate ms / generate ms - best wall time of validate_diagnostics() (one
+                                process) and generator(), with the expression
+                                and literal caches cleared before every run
+    validate KB / generate KB - peak traced allocation of one run (tracemalloc)
+
+and compares them with a saved baseline. A metric above its baseline by more
+than its threshold (--time-threshold for timings, --threshold for memory) is a
+regression and the suite exits with status 1. Memory is deterministic; timings
+vary by tens of percent between runs on a shared machine even with the best of
+--repeat runs, hence the wider default time threshold. Timings are scaled by a
+fixed pure-Python calibration workload, timed in turn with every case on both
+runs, which absorbs most of the difference between machines and slow phases
+of a busy one; for small thresholds still compare before and after a change
+on the same machine, with a higher --repeat.
+
+Usage:
+    python benchmarks/bench_suite.py                      # compare with baselines.json
+    python benchmarks/bench_suite.py --save               # record a new baseline
+    python benchmarks/bench_suite.py --cases deep_nesting,long_expressions --time-threshold 0.2 --repeat 30
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+import generator
+import validator
+from synthetic_ir import IRShape, synthesize, count_statements
+
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+# Allowed growth over the baseline before a metric counts as a regression:
+# memory is deterministic, timings are noisy (best of DEFAULT_REPEAT runs)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_TIME_THRESHOLD = 0.4
+DEFAULT_REPEAT = 15
+# Time differences below this are noise, whatever the ratio
+MIN_DELTA_MS = 1.0
+
+CASES: Dict[str, IRShape] = {
+    "typical": IRShape(),
+    "many_statements": IRShape(statements=5000, depth=1),
+    "deep_nesting": IRShape(statements=10, depth=9),
+    "long_expressions": IRShape(statements=300, expr_terms=40),
+    "many_blocks": IRShape(statements=40, fbs=60, functions=60, programs=40),
+    "large_device_table": IRShape(devices=200000),
+}
+
+METRICS = ("validate_ms", "generate_ms", "validate_kb", "generate_kb")
+
+
+def clear_caches():
+    """Forget memoized expressions and literals so every run starts cold."""
+    validator._compile_text.cache_clear()
+    validator._compile_normalized.cache_clear()
+    generator.string_to_st.cache_clear()
+
+
+def calibration_workload():
+    """Fixed dict/string workload, used to scale timings between machines and runs."""
+    table: Dict[str, int] = {}
+    for i in range(50000):
+        key = f"dev_{i % 997}"
+        table[key] = table.get(key, 0) + len(key.upper())
+
+
+def best_times(fns: Dict[str, Callable[[], Any]], repeat: int) -> Dict[str, float]:
+    """
+    Best wall time of every function in milliseconds, caches cleared before each run.
+
+    The functions are run in turn, `repeat` rounds, so a slow phase of a busy
+    machine slows all of them (including the calibration workload) alike.
+    """
+    best = {name: float("inf") for name in fns}
+    for _ in range(repeat):
+        for name, fn in fns.items():
+            clear_caches()
+            gc.collect()
+            start = time.perf_counter()
+            fn()
+            best[name] = min(best[name], time.perf_counter() - start)
+    return {name: seconds * 1e3 for name, seconds in best.items()}
+
+
+def peak_kb(fn: Callable[[], Any]) -> float:
+    """Peak memory allocated while running fn(), in KB."""
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_case(shape: IRShape, repeat: int) -> Dict[str, Any]:
+    ir, device_vars = synthesize(shape)
+    validate = lambda: validator.validate_diagnostics(ir, device_vars, workers=1)
+    generate = lambda: generator.generator(ir)
+
+    errors = validate()
+    if errors:
+        raise SystemExit(f"Synthetic IR for {shape} is invalid: {errors[0]}")
+
+    times = best_times({"calibration": calibration_workload, "validate": validate, "generate": generate}, repeat)
+    return {
+        "statements": count_statements(ir),
+        "calibration_ms": round(times["calibration"], 3),
+        "validate_ms": round(times["validate"], 3),
+        "generate_ms": round(times["generate"], 3),
+        "validate_kb": round(peak_kb(validate), 1),
+        "generate_kb": round(peak_kb(generate), 1),
+    }
+
+
+def compare(name: str, current: Dict[str, Any], base: Dict[str, Any], threshold: float,
+            scale: float = 1.0, time_threshold: float = DEFAULT_TIME_THRESHOLD) -> List[str]:
+    """
+    Regression messages for one case (empty if within thresholds).
+
+    Baseline timings are multiplied by `scale` (the case's calibration time
+    over the baseline's) and compared with `time_threshold`; memory metrics
+    are compared with `threshold`.
+    """
+    problems = []
+    for metric in METRICS:
+        old, new = base.get(metric), current[metric]
+        if not old:
+            continue
+        allowed = threshold
+        if metric.endswith("_ms"):
+            old = round(old * scale, 3)
+            allowed = time_threshold
+            if new - old < MIN_DELTA_MS:
+                continue
+        if new > old * (1 + allowed):
+            problems.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return problems
+
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: Dict[str, Dict[str, Any]]):
+    # Every case carries its own calibration time, so cases not re-measured stay comparable
+    cases = load_baseline(path).get("cases", {})
+    cases.update(results)
+    baseline = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "cases": cases,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def format_delta(current: float, old: Any, scale: float = 1.0) -> str:
+    if not old:
+        return ""
+    return f"{(current / (old * scale) - 1) * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated case names")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per case (best is reported)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed memory growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help="Allowed slowdown over the (calibrated) baseline (0.4 = 40%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise SystemExit(f"Unknown case(s): {', '.join(unknown)} (available: {', '.join(CASES)})")
+
+    # The generator logs every block; keep the table readable
+    logging.disable(logging.INFO)
+
+    baseline = load_baseline(args.baseline).get("cases", {})
+
+    results: Dict[str, Dict[str, Any]] = {}
+    regressions: List[str] = []
+
+    print(f"{'case':<20} {'stmts':>7} {'validate ms':>12} {'generate ms':>12} "
+          f"{'validate KB':>12} {'generate KB':>12}")
+    for name in names:
+        shape = CASES[name]
+        current = {"shape": shape.describe(), **run_case(shape, args.repeat)}
+        results[name] = current
+
+        base = baseline.get(name, {})
+        if base and base.get("shape") != current["shape"]:
+            print(f"{name}: shape changed since the baseline was saved, not compared")
+            base = {}
+        print(f"{name:<20} {current['statements']:>7} "
+              + " ".join(f"{current[m]:>12}" for m in METRICS))
+        if base:
+            scale = current["calibration_ms"] / base["calibration_ms"] if base.get("calibration_ms") else 1.0
+            print(f"{f'  vs baseline (x{scale:.2f})':<28} "
+                  + " ".join(f"{format_delta(current[m], base.get(m), scale if m.endswith('_ms') else 1.0):>12}"
+                             for m in METRICS))
+            regressions += compare(name, current, base, args.threshold, scale, args.time_threshold)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+    elif regressions:
+        print(f"\nRegressions (thresholds: time {args.time_threshold * 100:.0f}%, memory {args.threshold * 100:.0f}%):")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    else:
+        print(f"\nNo regressions (thresholds: time {args.time_threshold * 100:.0f}%, memory {args.threshold * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
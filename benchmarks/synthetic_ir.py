@@ -0,0 +1,179 @@
+"""
+Synthetic intermediate JSON for validator / generator benchmarks.
+
+`synthesize(shape)` builds a valid IR of controllable size and shape together
+with the device table it validates against, so the validator walks every
+statement instead of stopping at the first error. The output is deterministic
+for a given shape (seeded RNG), which keeps timings comparable between runs.
+"""
+
+import random
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+
+# Device datatypes, cycled over the device table
+DEVICE_TYPES = ("INT", "BOOL", "REAL")
+# Device variables declared per program (the rest of the table is only looked up)
+MAX_DECLARED = 64
+
+
+@dataclass(frozen=True)
+class IRShape:
+    """Size and shape knobs of a synthetic IR."""
+    statements: int = 200      # top-level statements per program
+    depth: int = 2             # nesting depth of IF/FOR/WHILE blocks
+    expr_terms: int = 4        # operands per expression
+    fbs: int = 2               # user function blocks (each instantiated and called)
+    functions: int = 2         # user functions (called inside expressions)
+    devices: int = 100         # device table size
+    programs: int = 1          # program blocks
+    seed: int = 0
+
+    def describe(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _Builder:
+    def __init__(self, shape: IRShape):
+        self.shape = shape
+        self.rng = random.Random(shape.seed)
+        self.devices: Dict[str, str] = {
+            f"dev_{i}": DEVICE_TYPES[i % len(DEVICE_TYPES)] for i in range(max(shape.devices, len(DEVICE_TYPES)))
+        }
+        declared = list(self.devices)[:max(MAX_DECLARED, len(DEVICE_TYPES))]
+        self.ints = [n for n in declared if self.devices[n] == "INT"]
+        self.bools = [n for n in declared if self.devices[n] == "BOOL"]
+        self.reals = [n for n in declared if self.devices[n] == "REAL"]
+        self.declared = declared
+        self.fb_names = [f"FB_{k}" for k in range(shape.fbs)]
+        self.fn_names = [f"F_{k}" for k in range(shape.functions)]
+        # FB instances are program variables too, so they live in the device table
+        for k, fb in enumerate(self.fb_names):
+            self.devices[f"inst_{k}"] = fb
+
+    # ---------------- expressions ----------------
+
+    def int_expr(self, terms: int) -> str:
+        parts = []
+        for _ in range(max(terms, 1)):
+            roll = self.rng.random()
+            if self.fn_names and roll < 0.15:
+                a, b = self.rng.sample(self.ints, 2) if len(self.ints) > 1 else (self.ints[0], self.ints[0])
+                parts.append(f"{self.rng.choice(self.fn_names)}({a}, {b})")
+            elif roll < 0.3:
+                parts.append(str(self.rng.randint(1, 500)))
+            else:
+                parts.append(self.rng.choice(self.ints))
+        expr = parts[0]
+        for p in parts[1:]:
+            expr += f" {self.rng.choice('+-*')} {p}"
+        return expr
+
+    def condition(self, terms: int) -> str:
+        left = self.int_expr(max(terms - 1, 1))
+        cond = f"{left} {self.rng.choice(['>', '<', '>=', '<=', '=', '<>'])} {self.rng.randint(0, 1000)}"
+        if terms > 2:
+            cond += f" {self.rng.choice(['AND', 'OR'])} {self.rng.choice(self.bools)}"
+        return cond
+
+    # ---------------- statements ----------------
+
+    def assignment(self) -> Dict[str, Any]:
+        if self.reals and self.rng.random() < 0.2:
+            return {"type": "assignment", "target": self.rng.choice(self.reals),
+                    "expression": f"{self.rng.choice(self.reals)} * {self.rng.randint(1, 9)}.5"}
+        return {"type": "assignment", "target": self.rng.choice(self.ints),
+                "expression": self.int_expr(self.shape.expr_terms)}
+
+    def fb_call(self) -> Dict[str, Any]:
+        k = self.rng.randrange(len(self.fb_names))
+        return {"type": "fbCall", "name": f"inst_{k}",
+                "inputs": {"IN1": self.int_expr(self.shape.expr_terms), "EN": self.rng.choice(self.bools)},
+                "outputs": {"OUT": self.rng.choice(self.ints)}}
+
+    def leaf(self) -> Dict[str, Any]:
+        if self.fb_names and self.rng.random() < 0.2:
+            return self.fb_call()
+        return self.assignment()
+
+    def statement(self, depth: int) -> Dict[str, Any]:
+        if depth <= 0:
+            return self.leaf()
+        body = [self.statement(depth - 1) for _ in range(2)]
+        kind = self.rng.choice(("if", "for", "while", "case"))
+        terms = self.shape.expr_terms
+        if kind == "if":
+            return {"type": "if", "condition": self.condition(terms), "then": body, "else": [self.leaf()]}
+        if kind == "for":
+            return {"type": "for", "iterator": f"i{depth}", "from": 1, "to": self.rng.randint(2, 20), "body": body}
+        if kind == "while":
+            return {"type": "while", "condition": self.condition(terms), "body": body}
+        return {"type": "case", "selector": self.rng.choice(self.ints),
+                "cases": [{"value": 1, "statements": body[:1]}, {"value": 2, "statements": body[1:]}],
+                "else": [self.leaf()]}
+
+    # ---------------- blocks ----------------
+
+    def function(self, name: str) -> Dict[str, Any]:
+        return {"function": {
+            "name": name, "returnType": "INT",
+            "inputs": [{"name": "a", "datatype": "INT"}, {"name": "b", "datatype": "INT"}],
+            "body": [{"type": "return", "expression": "a * 2 + b - 1"}],
+        }}
+
+    def function_block(self, name: str) -> Dict[str, Any]:
+        return {"functionBlock": {
+            "name": name,
+            "inputs": [{"name": "IN1", "datatype": "INT"}, {"name": "EN", "datatype": "BOOL"}],
+            "outputs": [{"name": "OUT", "datatype": "INT"}],
+            "locals": [{"name": "acc", "datatype": "INT"}],
+            "body": [
+                {"type": "assignment", "target": "acc", "expression": "acc + IN1"},
+                {"type": "if", "condition": "EN AND acc > 100", "then": [
+                    {"type": "assignment", "target": "OUT", "expression": "acc"},
+                    {"type": "assignment", "target": "acc", "expression": "0"},
+                ]},
+            ],
+        }}
+
+    def program(self, index: int) -> Dict[str, Any]:
+        declarations = [{"name": n, "datatype": self.devices[n]} for n in self.declared]
+        declarations += [{"name": f"inst_{k}", "datatype": fb} for k, fb in enumerate(self.fb_names)]
+        statements = [self.statement(self.rng.randint(0, self.shape.depth)) for _ in range(self.shape.statements)]
+        return {"program": {"name": f"Synthetic{index}", "declarations": declarations, "statements": statements}}
+
+    def build(self) -> List[Dict[str, Any]]:
+        blocks = [self.function(n) for n in self.fn_names]
+        blocks += [self.function_block(n) for n in self.fb_names]
+        blocks += [self.program(i) for i in range(self.shape.programs)]
+        return blocks
+
+
+def synthesize(shape: IRShape) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Build a synthetic IR.
+
+    Returns:
+        (list of function / functionBlock / program blocks, device name -> datatype table)
+    """
+    builder = _Builder(shape)
+    return builder.build(), builder.devices
+
+
+def count_statements(blocks: List[Dict[str, Any]]) -> int:
+    """Total statements, nested ones included."""
+    def walk(stmts: List[Dict[str, Any]]) -> int:
+        total = 0
+        for s in stmts:
+            total += 1
+            for key in ("then", "else", "body"):
+                total += walk(s.get(key) or [])
+            for c in s.get("cases", []):
+                total += walk(c.get("statements", []))
+        return total
+
+    total = 0
+    for block in blocks:
+        obj = next(iter(block.values()))
+        total += walk(obj.get("statements") or obj.get("body") or [])
+    return total
@@ -11,7 +11,15 @@ import CodeDisplay from './CodeDisplay';
 
 export function CodeGenerator() {
   const [narrativeText, setNarrativeText] = useState('');
-  const { generatedCode, isLoading, error, generate, clearError } = useCodeGeneration();
+  const {
+    generatedCode,
+    isLoading,
+    error,
+    stage,
+    streamingText,
+    generate,
+    clearError,
+  } = useCodeGeneration();
 
   const handleGenerate = useCallback(async () => {
     await generate(narrativeText);
@@ -50,7 +58,16 @@ export function CodeGenerator() {
 
       <div className="code-output-section">
         {isLoading && (
-          <LoadingSpinner message="Generating code, please wait..." />
+          <LoadingSpinner message={stage || 'Generating code, please wait...'} />
+        )}
+
+        {isLoading && streamingText && (
+          <div className="code-box stream-preview" aria-live="off">
+            <h2 className="code-title">Model output</h2>
+            <pre className="code-block">
+              <code>{streamingText}</code>
+            </pre>
+          </div>
         )}
 
         {error && !isLoading && (
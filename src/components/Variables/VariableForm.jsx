@@ -5,6 +5,7 @@
 
 import React, { useState, useCallback } from 'react';
 import { IEC_DATA_TYPES, VALIDATION } from '../../config/constants';
+import { suggestVariables } from '../../services/variablesService';
 
 const INITIAL_FORM_STATE = {
   deviceName: '',
@@ -15,6 +16,8 @@ const INITIAL_FORM_STATE = {
 
 export function VariableForm({ onAdd, onError }) {
   const [formData, setFormData] = useState(INITIAL_FORM_STATE);
+  // Existing devices whose names are close to the one being added
+  const [similar, setSimilar] = useState([]);
 
   const handleChange = useCallback((e) => {
     const { name, value } = e.target;
@@ -24,6 +27,18 @@ export function VariableForm({ onAdd, onError }) {
   const handleBlur = useCallback((e) => {
     const { name, value } = e.target;
     setFormData(prev => ({ ...prev, [name]: value.trim() }));
+
+    if (name === 'deviceName') {
+      const trimmed = value.trim();
+      if (!trimmed) {
+        setSimilar([]);
+        return;
+      }
+      // Only a hint: ignore failures (e.g. database offline)
+      suggestVariables(trimmed)
+        .then(found => setSimilar(found.map(item => item.deviceName).filter(n => n !== trimmed)))
+        .catch(() => setSimilar([]));
+    }
   }, []);
 
   const handleSubmit = useCallback((e) => {
@@ -48,6 +63,7 @@ export function VariableForm({ onAdd, onError }) {
 
     if (result?.success) {
       setFormData(INITIAL_FORM_STATE);
+      setSimilar([]);
     } else if (result?.error) {
       onError?.(result.error);
     }
@@ -106,6 +122,11 @@ export function VariableForm({ onAdd, onError }) {
           Add Variable
         </button>
       </form>
+      {similar.length > 0 && (
+        <p className="similar-devices" role="status">
+          Similar existing devices: {similar.join(', ')}
+        </p>
+      )}
     </div>
   );
 }
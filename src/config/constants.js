@@ -8,10 +8,12 @@ export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:80
 // API Endpoints
 export const API_ENDPOINTS = {
   GENERATE_CODE: '/generate-code',
+  GENERATE_CODE_STREAM: '/generate-code/stream',
   GET_VARIABLES: '/get-variables',
   SAVE_VARIABLES: '/save-variables',
   UPLOAD_VARIABLES: '/upload-variables-json',
   REMOVE_DUPLICATES: '/remove-duplicates',
+  SUGGEST_VARIABLES: '/variables/suggest',
   HEALTH: '/',
 };
 
@@ -19,7 +21,7 @@ export const API_ENDPOINTS = {
 export const TIMEOUTS = {
   DEFAULT: 30000,
   CODE_GENERATION: 60000,
-  FILE_UPLOAD: 30000,
+  FILE_UPLOAD: 120000,
 };
 
 // IEC 61131-3 Data Types
@@ -4,9 +4,34 @@
  */
 
 import { useState, useCallback } from 'react';
-import { generateCode } from '../services/codeGenerationService';
+import { generateCodeStream } from '../services/codeGenerationService';
 import { ApiError } from '../services/apiClient';
 
+/**
+ * Human-readable progress message for a pipeline stage event
+ * (returns null for events that do not change the stage)
+ */
+function describeStage(event, data) {
+  switch (event) {
+    case 'fast_path':
+      return 'Matched a simple command, building Structured Text...';
+    case 'cache_hit':
+      return 'Found a previous result for this request...';
+    case 'retrieval':
+      return `Found ${data.documents} relevant device${data.documents === 1 ? '' : 's'}, generating...`;
+    case 'repair':
+      return `Fixed ${data.fixes.length} issue${data.fixes.length === 1 ? '' : 's'} locally, re-validating...`;
+    case 'validation':
+      return data.valid
+        ? 'Validation passed, building Structured Text...'
+        : `Validation found ${data.errors.length} issue${data.errors.length === 1 ? '' : 's'}`;
+    case 'regeneration':
+      return `Fixing issues (attempt ${data.attempt} of ${data.max_attempts})...`;
+    default:
+      return null;
+  }
+}
+
 /**
  * Custom hook for code generation functionality
  * @returns {Object} Code generation state and methods
@@ -15,6 +40,8 @@ export function useCodeGeneration() {
   const [generatedCode, setGeneratedCode] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [stage, setStage] = useState('');
+  const [streamingText, setStreamingText] = useState('');
 
   const generate = useCallback(async (narrative) => {
     if (!narrative?.trim()) {
@@ -24,10 +51,23 @@ export function useCodeGeneration() {
 
     setGeneratedCode('');
     setError(null);
+    setStage('');
+    setStreamingText('');
     setIsLoading(true);
 
+    const handleEvent = (event, data) => {
+      const message = describeStage(event, data);
+      if (message) setStage(message);
+      
+      if (event === 'regeneration') {
+        setStreamingText('');
+      } else if (event === 'token') {
+        setStreamingText((text) => text + data.text);
+      }
+    };
+
     try {
-      const result = await generateCode(narrative);
+      const result = await generateCodeStream(narrative, handleEvent);
       
       if (result.error) {
         setError(result.error);
@@ -51,6 +91,8 @@ export function useCodeGeneration() {
       
     } finally {
       setIsLoading(false);
+      setStage('');
+      setStreamingText('');
     }
   }, []);
 
@@ -66,12 +108,16 @@ export function useCodeGeneration() {
     setGeneratedCode('');
     setError(null);
     setIsLoading(false);
+    setStage('');
+    setStreamingText('');
   }, []);
 
   return {
     generatedCode,
     isLoading,
     error,
+    stage,
+    streamingText,
     generate,
     clearError,
     clearCode,
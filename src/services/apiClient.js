@@ -49,6 +49,28 @@ async function handleResponse(response) {
   return response.json();
 }
 
+/**
+ * Map fetch/abort failures to ApiError
+ */
+function toApiError(error) {
+  if (error.name === 'AbortError') {
+    return new ApiError('Request timed out. Please try again.', 408);
+  }
+  
+  if (error instanceof ApiError) {
+    return error;
+  }
+  
+  if (error.message === 'Failed to fetch') {
+    return new ApiError(
+      'Unable to connect to the server. Please ensure the backend is running.',
+      0
+    );
+  }
+  
+  return new ApiError(error.message || 'An unexpected error occurred', 500);
+}
+
 /**
  * Base fetch wrapper with error handling and timeout
  */
@@ -70,22 +92,111 @@ async function request(endpoint, options = {}) {
   } catch (error) {
     clearTimeout(timeoutId);
     
-    if (error.name === 'AbortError') {
-      throw new ApiError('Request timed out. Please try again.', 408);
+    throw toApiError(error);
+  }
+}
+
+/**
+ * GET with If-None-Match; resolves to { notModified: true } on 304,
+ * otherwise { data, etag }
+ */
+async function conditionalGet(endpoint, etag, options = {}) {
+  const { timeout = TIMEOUTS.DEFAULT, ...fetchOptions } = options;
+  const { controller, timeoutId } = createTimeoutController(timeout);
+  
+  const url = `${API_BASE_URL}${endpoint}`;
+  
+  try {
+    const response = await fetch(url, {
+      method: 'GET',
+      headers: etag ? { 'If-None-Match': etag } : {},
+      // Validation is handled here, keep the browser cache out of it
+      cache: 'no-store',
+      ...fetchOptions,
+      signal: controller.signal,
+    });
+    
+    clearTimeout(timeoutId);
+    
+    if (response.status === 304) {
+      return { notModified: true };
     }
     
-    if (error instanceof ApiError) {
-      throw error;
+    const data = await handleResponse(response);
+    return { data, etag: response.headers.get('ETag') };
+    
+  } catch (error) {
+    clearTimeout(timeoutId);
+    throw toApiError(error);
+  }
+}
+
+/**
+ * Parse one Server-Sent Events frame into { event, data }
+ */
+function parseSseFrame(frame) {
+  let event = 'message';
+  const dataLines = [];
+  
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trimStart());
     }
+  }
+  
+  if (dataLines.length === 0) return null;
+  return { event, data: JSON.parse(dataLines.join('\n')) };
+}
+
+/**
+ * POST a JSON body and read a Server-Sent Events response,
+ * calling onEvent(event, data) for every frame as it arrives
+ */
+async function streamEvents(endpoint, data, onEvent, options = {}) {
+  const { timeout = TIMEOUTS.DEFAULT, ...fetchOptions } = options;
+  const { controller, timeoutId } = createTimeoutController(timeout);
+  
+  const url = `${API_BASE_URL}${endpoint}`;
+  
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify(data),
+      ...fetchOptions,
+      signal: controller.signal,
+    });
     
-    if (error.message === 'Failed to fetch') {
-      throw new ApiError(
-        'Unable to connect to the server. Please ensure the backend is running.',
-        0
-      );
+    if (!response.ok) {
+      await handleResponse(response);
     }
     
-    throw new ApiError(error.message || 'An unexpected error occurred', 500);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const frame = parseSseFrame(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        if (frame) onEvent(frame.event, frame.data);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+    
+    clearTimeout(timeoutId);
+    
+  } catch (error) {
+    clearTimeout(timeoutId);
+    
+    throw toApiError(error);
   }
 }
 
@@ -102,6 +213,12 @@ export const apiClient = {
       ...options,
     }),
 
+  /**
+   * Conditional GET request (ETag / If-None-Match)
+   */
+  getIfNoneMatch: (endpoint, etag, options = {}) =>
+    conditionalGet(endpoint, etag, options),
+
   /**
    * POST request with JSON body
    */
@@ -123,6 +240,12 @@ export const apiClient = {
       ...options,
     }),
 
+  /**
+   * POST request with JSON body, streaming a Server-Sent Events response
+   */
+  postStream: (endpoint, data, onEvent, options = {}) =>
+    streamEvents(endpoint, data, onEvent, options),
+
   /**
    * DELETE request
    */
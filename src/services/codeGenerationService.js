@@ -34,6 +34,36 @@ export async function generateCode(narrative) {
   };
 }
 
+/**
+ * Generate IEC 61131-3 code, reporting pipeline progress as it happens
+ * @param {string} narrative - Natural language description
+ * @param {(event: string, data: Object) => void} onEvent - Called for every stage event
+ *   (retrieval, token, validation, regeneration, cache_hit, result, error)
+ * @returns {Promise<{code: string} | {error: string}>}
+ */
+export async function generateCodeStream(narrative, onEvent = () => {}) {
+  let outcome = null;
+  
+  await apiClient.postStream(
+    API_ENDPOINTS.GENERATE_CODE_STREAM,
+    { narrative: narrative.trim() },
+    (event, data) => {
+      if (event === 'result') {
+        outcome = { code: data.code };
+      } else if (event === 'error') {
+        outcome = { error: data.message };
+      }
+      onEvent(event, data);
+    },
+    { timeout: TIMEOUTS.CODE_GENERATION }
+  );
+  
+  return outcome || {
+    error: 'The server response did not contain the expected code data.',
+  };
+}
+
 export default {
   generateCode,
+  generateCodeStream,
 };
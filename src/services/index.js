@@ -3,10 +3,12 @@
  */
 
 export { apiClient, ApiError } from './apiClient';
-export { generateCode } from './codeGenerationService';
+export { generateCode, generateCodeStream } from './codeGenerationService';
 export { 
   fetchVariables, 
+  fetchVariablesPage,
   saveVariables, 
   uploadVariablesFile, 
-  removeDuplicates 
+  removeDuplicates,
+  suggestVariables 
 } from './variablesService';
@@ -6,20 +6,52 @@
 import apiClient from './apiClient';
 import { API_ENDPOINTS, TIMEOUTS } from '../config/constants';
 
+// Last full variables list and its ETag, reused while the server answers 304
+let variablesCache = { etag: null, variables: null };
+
 /**
  * Fetch all variables from the database
+ * Re-downloads only when the table changed since the last fetch (ETag).
  * @returns {Promise<Array>} List of variables
  */
 export async function fetchVariables() {
-  const data = await apiClient.get(API_ENDPOINTS.GET_VARIABLES);
+  const etag = variablesCache.variables ? variablesCache.etag : null;
+  const result = await apiClient.getIfNoneMatch(API_ENDPOINTS.GET_VARIABLES, etag);
+  
+  if (result.notModified) {
+    return variablesCache.variables;
+  }
   
+  const { data } = result;
   if (!data.variables || !Array.isArray(data.variables)) {
     throw new Error('Invalid response format from server');
   }
   
+  variablesCache = { etag: result.etag, variables: data.variables };
   return data.variables;
 }
 
+/**
+ * Fetch one page of variables
+ * @param {Object} [params]
+ * @param {number} [params.limit=100] - Page size (max 1000)
+ * @param {string} [params.cursor] - nextCursor of the previous page
+ * @param {string} [params.prefix] - Device name prefix (case-insensitive)
+ * @param {string} [params.dataType] - Data type filter
+ * @param {string[]} [params.fields] - Fields to return
+ * @returns {Promise<{variables: Array, nextCursor: string|null, total: number}>}
+ */
+export async function fetchVariablesPage({ limit = 100, cursor, prefix, dataType, fields } = {}) {
+  const query = new URLSearchParams({ limit: String(limit) });
+  if (cursor) query.set('cursor', cursor);
+  if (prefix) query.set('prefix', prefix);
+  if (dataType) query.set('dataType', dataType);
+  if (fields?.length) query.set('fields', fields.join(','));
+  
+  const data = await apiClient.get(`${API_ENDPOINTS.GET_VARIABLES}?${query}`);
+  return { variables: data.variables, nextCursor: data.next_cursor, total: data.total };
+}
+
 /**
  * Save variables to the database
  * @param {Array} variables - List of variables to save
@@ -37,9 +69,10 @@ export async function saveVariables(variables) {
 }
 
 /**
- * Upload variables from a JSON file
- * @param {File} file - JSON file to upload
- * @returns {Promise<{status: string, message: string}>}
+ * Upload variables from a file (.json array, .ndjson/.jsonl or .csv with a header row)
+ * Invalid rows are skipped and reported instead of failing the whole upload.
+ * @param {File} file - File to upload
+ * @returns {Promise<{status: 'ok'|'partial', message: string, inserted: number, updated: number, rejected: number, errors: Array<{row: number, message: string}>}>}
  */
 export async function uploadVariablesFile(file) {
   const formData = new FormData();
@@ -54,15 +87,33 @@ export async function uploadVariablesFile(file) {
 
 /**
  * Remove duplicate variables from the database
- * @returns {Promise<{status: string, message: string}>}
+ * @param {Object} [options]
+ * @param {boolean} [options.dryRun=false] - Only report what would be removed
+ * @returns {Promise<{status: string, message: string, removed: number, duplicates?: Array}>}
+ */
+export async function removeDuplicates({ dryRun = false } = {}) {
+  const query = dryRun ? '?dry_run=true' : '';
+  return apiClient.delete(`${API_ENDPOINTS.REMOVE_DUPLICATES}${query}`);
+}
+
+/**
+ * Suggest existing device names close to a (possibly misspelled) name
+ * Case, spaces and underscores are ignored and a few typos are allowed.
+ * @param {string} name - Name as typed
+ * @param {number} [limit=5] - Max suggestions (max 20)
+ * @returns {Promise<Array<{deviceName: string, dataType: string, distance: number}>>}
  */
-export async function removeDuplicates() {
-  return apiClient.delete(API_ENDPOINTS.REMOVE_DUPLICATES);
+export async function suggestVariables(name, limit = 5) {
+  const query = new URLSearchParams({ q: name, limit: String(limit) });
+  const data = await apiClient.get(`${API_ENDPOINTS.SUGGEST_VARIABLES}?${query}`);
+  return data.suggestions || [];
 }
 
 export default {
   fetchVariables,
+  fetchVariablesPage,
   saveVariables,
   uploadVariablesFile,
   removeDuplicates,
+  suggestVariables,
 };